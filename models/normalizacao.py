@@ -192,14 +192,13 @@ class Normalizacao(db.Model, BaseMixin):
     def enriquecer(self):
         """Enriquece os dados com informações adicionais"""
         from models import Adquirente
+        from services.cache_adquirentes import resolvedor_adquirentes
         
         if self.adquirente_nome and not self.adquirente_id:
-            adquirente = Adquirente.query.filter(
-                db.func.lower(Adquirente.nome) == self.adquirente_nome.lower()
-            ).first()
+            adquirente_id = resolvedor_adquirentes.resolver(self.adquirente_nome, ignorar_negativo=True)
             
-            if adquirente:
-                self.adquirente_id = adquirente.id
+            if adquirente_id:
+                self.adquirente_id = adquirente_id
             else:
                 nova_adquirente = Adquirente(
                     nome=self.adquirente_nome[:100],
@@ -2,7 +2,12 @@
 
 from flask import Blueprint, request, jsonify, g
 from utils.auth_middleware import login_required, empresa_required
-from services.conciliacao import executar_conciliacao
+from services.conciliacao import (
+    executar_conciliacao,
+    executar_conciliacao_incremental,
+    iniciar_conciliacao_em_background
+)
+from services.job_service import obter_job, job_interrompido, atualizar_job, serializar_job
 from models import db, MovAdquirente, MovBanco, Conciliacao, LogAuditoria
 from sqlalchemy.orm import joinedload
 from sqlalchemy import func, case
@@ -14,6 +19,12 @@ logger = logging.getLogger(__name__)
 
 bp_conc = Blueprint("conciliacao_api", __name__, url_prefix="/api/v1/conciliacao")
 
+
+def _eh_inteiro(valor):
+    # bool é subclasse de int no Python, mas true/false não são IDs
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
 # ============================================================
 # 1️⃣ PROCESSAR CONCILIAÇÃO AUTOMÁTICA
 # ============================================================
@@ -31,19 +42,47 @@ def api_processar_conciliacao():
     
     ✅ JSON opcional:
         - tipo_pagamento: 'pix', 'cartao', 'boleto', ou null para todos
+        - arquivo_id / normalizacao_ids: concilia só o lote recém-importado
+          (modo incremental, sem recarregar todo o histórico em aberto)
     """
     empresa_id = g.user.empresa_id
     
     # Obter parâmetros opcionais
     data = request.get_json(silent=True) or {}
     tipo_pagamento = data.get('tipo_pagamento')
+    arquivo_id = data.get('arquivo_id')
+    normalizacao_ids = data.get('normalizacao_ids')
+    
+    # IDs vão direto para IN (...): só inteiros ("123" viraria ['1', '2', '3'])
+    if arquivo_id is not None and not _eh_inteiro(arquivo_id):
+        return jsonify({
+            "status": "error",
+            "message": "arquivo_id deve ser um número inteiro"
+        }), 400
+    if normalizacao_ids is not None and (
+        not isinstance(normalizacao_ids, list)
+        or not all(_eh_inteiro(i) for i in normalizacao_ids)
+    ):
+        return jsonify({
+            "status": "error",
+            "message": "normalizacao_ids deve ser uma lista de números inteiros"
+        }), 400
     
     try:
-        resultado = executar_conciliacao(
-            empresa_id=empresa_id,
-            usuario_id=g.user.id,
-            tipo_pagamento=tipo_pagamento
-        )
+        if arquivo_id or normalizacao_ids:
+            resultado = executar_conciliacao_incremental(
+                empresa_id=empresa_id,
+                arquivo_id=arquivo_id,
+                normalizacao_ids=normalizacao_ids,
+                usuario_id=g.user.id,
+                tipo_pagamento=tipo_pagamento
+            )
+        else:
+            resultado = executar_conciliacao(
+                empresa_id=empresa_id,
+                usuario_id=g.user.id,
+                tipo_pagamento=tipo_pagamento
+            )
         
         # Log de auditoria (isolado para não afetar resposta)
         try:
@@ -70,6 +109,12 @@ def api_processar_conciliacao():
             "timestamp": datetime.now(timezone.utc).isoformat()
         }), 200
         
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
     except TimeoutError:
         logger.warning(f"⏱️ Timeout na conciliação: empresa={empresa_id}")
         return jsonify({
@@ -86,6 +131,78 @@ def api_processar_conciliacao():
         }), 500
 
 
+# ============================================================
+# 1️⃣.1 PROCESSAR EM BACKGROUND (JOB + POLLING)
+# ============================================================
+@bp_conc.route("/jobs", methods=["POST"])
+@login_required
+@empresa_required
+def api_iniciar_job_conciliacao():
+    """
+    Enfileira a conciliação automática em background e retorna o job_id.
+    Sem limite de tempo: o progresso é acompanhado via GET /jobs/<job_id>.
+    
+    ✅ JSON opcional:
+        - tipo_pagamento: 'pix', 'cartao', 'boleto', ou null para todos
+    """
+    empresa_id = g.user.empresa_id
+    data = request.get_json(silent=True) or {}
+    tipo_pagamento = data.get('tipo_pagamento')
+    
+    try:
+        job = iniciar_conciliacao_em_background(
+            empresa_id=empresa_id,
+            usuario_id=g.user.id,
+            tipo_pagamento=tipo_pagamento,
+            ip=request.remote_addr
+        )
+        
+        return jsonify({
+            "status": "success",
+            "message": "Conciliação enfileirada",
+            "job_id": job["id"],
+            "job": serializar_job(job),
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao enfileirar conciliação: empresa={empresa_id}, erro={str(e)}", exc_info=True)
+        return jsonify({
+            "status": "error",
+            "message": "Erro ao iniciar conciliação. Tente novamente."
+        }), 500
+
+
+@bp_conc.route("/jobs/<job_id>", methods=["GET"])
+@login_required
+@empresa_required
+def api_status_job_conciliacao(job_id):
+    """
+    Retorna status/progresso de um job de conciliação da empresa.
+    
+    ✅ Campos: status, fase, processados, total, percentual, eta_segundos,
+       parcial (contadores até agora) e resultado (quando concluído)
+    """
+    empresa_id = g.user.empresa_id
+    job = obter_job(job_id, empresa_id=empresa_id)
+    
+    if not job or job.get("tipo") != "conciliacao":
+        return jsonify({
+            "status": "error",
+            "message": "Job não encontrado"
+        }), 404
+    
+    # Worker reiniciado no meio da execução → o job não vai mais avançar
+    if job_interrompido(job):
+        job = atualizar_job(job["id"], status="interrompido", fase="interrompido") or job
+    
+    return jsonify({
+        "status": "success",
+        "job": serializar_job(job),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }), 200
+
+
 # ============================================================
 # 2️⃣ STATUS GERAL (OTIMIZADO + FILTRO POR TIPO)
 # ============================================================
@@ -5,6 +5,8 @@ from flask import Blueprint, jsonify, g, request, render_template
 from models import db, Normalizacao  # ✅ Adicionado 'db' que faltava
 from flask import abort  # ✅ Adicionado 'abort' que faltava
 from utils.auth_middleware import login_required, empresa_required
+from services.cache_adquirentes import resolvedor_adquirentes
+from services.classificador_financeiro import classificador
 from sqlalchemy import func
 import logging
 
@@ -92,7 +94,9 @@ def estatisticas_normalizacao():
                 "valor_total": float(s.valor_total) if s.valor_total else 0
             }
             for s in stats
-        ]
+        ],
+        "cache_adquirentes": resolvedor_adquirentes.stats,
+        "cache_classificador": classificador.get_stats()["cache"]
     })
 
 
@@ -2,10 +2,10 @@
 
 from flask import Blueprint, render_template, request, jsonify, session, g, current_app, abort, url_for
 from utils.auth_middleware import login_required, empresa_required
-from services.importer import process_uploaded_files
+from services.importer import process_uploaded_files, iniciar_importacao_em_background, resumir_upload
+from services.job_service import obter_job, job_interrompido, atualizar_job, serializar_job
 from services.importer_db import listar_arquivos_importados, buscar_arquivo_por_id
 from datetime import datetime, timezone
-from decimal import Decimal, InvalidOperation
 import logging
 import time
 
@@ -113,46 +113,56 @@ def upload_arquivos():
         if size > MAX_FILE_SIZE:
             return jsonify({"ok": False, "message": f"Arquivo '{file.filename}' excede 10MB"}), 400
 
+    # Modo assíncrono (?async=1 ou modo=async): grava os arquivos, responde
+    # com o job na hora e o andamento sai em GET /operacoes/upload/jobs/<id>
+    if request.args.get("async") == "1" or request.form.get("modo") == "async":
+        try:
+            job = iniciar_importacao_em_background(
+                [f for f in files if f.filename], empresa_id, usuario_id
+            )
+        except Exception as e:
+            logger.error(f"❌ Erro ao enfileirar upload: {str(e)}", exc_info=True)
+            return jsonify({"ok": False, "message": f"Erro interno: {str(e)}"}), 500
+
+        return jsonify({
+            "ok": True,
+            "message": "Importação iniciada. Acompanhe o andamento pelo job.",
+            "job_id": job["id"],
+            "status_url": url_for("operacoes.status_importacao", job_id=job["id"]),
+            "job": serializar_job(job),
+        }), 202
+
     try:
         resultados = process_uploaded_files(files, empresa_id, usuario_id)
     except Exception as e:
         logger.error(f"❌ Erro ao processar upload: {str(e)}", exc_info=True)
         return jsonify({"ok": False, "message": f"Erro interno: {str(e)}"}), 500
 
-    # Resumo
-    arquivos_sucesso = [r for r in resultados if r.get("ok")]
-    total_arquivos = len(arquivos_sucesso)
-    qtde_vendas = sum(r.get("linhas", 0) for r in arquivos_sucesso if r.get("tipo") == "venda")
-    qtde_recebimentos = sum(r.get("linhas", 0) for r in arquivos_sucesso if r.get("tipo") == "recebimento")
-    
-    total_valor_vendas = Decimal("0")
-    total_valor_recebimentos = Decimal("0")
-    
-    for r in arquivos_sucesso:
-        if r.get("tipo") == "venda":
-            for reg in r.get('registros', []):
-                try:
-                    valor = reg.get('valor_bruto') or reg.get('valor') or 0
-                    total_valor_vendas += Decimal(str(valor))
-                except: pass
-        elif r.get("tipo") == "recebimento":
-            for reg in r.get('registros', []):
-                try:
-                    valor = reg.get('valor') or 0
-                    total_valor_recebimentos += Decimal(str(valor))
-                except: pass
-
     return jsonify({
         "ok": True,
         "message": "Arquivos processados com sucesso.",
-        "total_arquivos": total_arquivos,
-        "qtde_vendas": qtde_vendas,
-        "qtde_recebimentos": qtde_recebimentos,
-        "total_vendas": str(total_valor_vendas),
-        "total_recebimentos": str(total_valor_recebimentos),
-        "result": resultados
+        **resumir_upload(resultados)
     })
 
+@operacoes_bp.route("/upload/jobs/<job_id>", methods=["GET"])
+@login_required
+@empresa_required
+def status_importacao(job_id):
+    """
+    Andamento de uma importação assíncrona da empresa: status do job e,
+    por arquivo, fase, linhas, duplicados, erros e tempos.
+    """
+    job = obter_job(job_id, empresa_id=g.user.empresa_id)
+
+    if not job or job.get("tipo") != "importacao":
+        return jsonify({"ok": False, "message": "Importação não encontrada."}), 404
+
+    # Worker reiniciado no meio da execução → o job não vai mais avançar
+    if job_interrompido(job):
+        job = atualizar_job(job["id"], status="interrompido", fase="interrompido") or job
+
+    return jsonify({"ok": True, "job": serializar_job(job)})
+
 @operacoes_bp.route("/conciliacao", methods=["GET"])
 @login_required
 @empresa_required
@@ -189,96 +199,36 @@ def arquivos_importados_page():
 @login_required
 @empresa_required
 def arquivo_detalhe_page(arquivo_id):
-    """Página de detalhes de um arquivo importado"""
-    logger.info(f"🔍 ════════════════════════════════════════════════════════════")
+    """Página de detalhes de um arquivo importado (registros paginados)"""
     logger.info(f"🔍 Acessando arquivo_id={arquivo_id} por usuario_id={g.user.id}, empresa_id={g.user.empresa_id}")
-    logger.info(f"🔍 ════════════════════════════════════════════════════════════")
     
     try:
         empresa_id = g.user.empresa_id
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = min(max(1, request.args.get('per_page', 200, type=int)), 500)
         
-        # ✅ Buscar arquivo com tratamento para objeto SQLAlchemy
-        logger.info(f"🔍 Buscando arquivo {arquivo_id} no banco...")
-        arquivo = buscar_arquivo_por_id(arquivo_id, empresa_id)
+        # ✅ Só a página pedida é descriptografada; totais vêm do resumo gravado
+        arquivo = buscar_arquivo_por_id(arquivo_id, empresa_id, pagina=page, por_pagina=per_page)
         
         if not arquivo:
             logger.warning(f"❌ Arquivo {arquivo_id} NÃO ENCONTRADO para empresa {empresa_id}")
             abort(404)
         
-        # ✅ Normalizar acesso a atributos (objeto SQLAlchemy ou dict)
-        logger.info(f"✅ Arquivo encontrado")
-        
-        # Helper para acessar atributos de forma segura
-        def get_attr(obj, key, default=None):
-            """Acessa atributo de objeto SQLAlchemy ou chave de dict"""
-            if hasattr(obj, 'get'):
-                return obj.get(key, default)  # É um dict
-            return getattr(obj, key, default)  # É um objeto SQLAlchemy
+        resumo = arquivo["resumo"]
+        paginacao = arquivo["paginacao"]
         
-        nome_arquivo = get_attr(arquivo, 'nome_arquivo', 'Desconhecido')
-        tipo_arquivo = get_attr(arquivo, 'tipo', 'desconhecido')
-        status_arquivo = get_attr(arquivo, 'status', 'unknown')
-        conteudo_json = get_attr(arquivo, 'conteudo_json')
-        total_registros = get_attr(arquivo, 'total_registros', 0)
-        total_valor = get_attr(arquivo, 'total_valor', 0)
-        
-        logger.info(f"📄 Arquivo: {nome_arquivo} | Tipo: {tipo_arquivo} | Status: {status_arquivo}")
-        
-        # ✅ Descriptografar conteúdo com tratamento de erro
-        registros = []
-        if conteudo_json:
-            try:
-                logger.info(f"🔐 Tentando descriptografar conteúdo...")
-                from services.importer_db import descriptografar_conteudo
-                registros = descriptografar_conteudo(conteudo_json)
-                logger.info(f"✅ Conteúdo descriptografado: {len(registros)} registros")
-            except Exception as e:
-                logger.error(f"❌ Erro ao descriptografar: {str(e)}", exc_info=True)
-                flash("⚠️ Não foi possível carregar o conteúdo do arquivo.", "warning")
-                registros = []
-        else:
-            logger.warning(f"⚠️ Arquivo {arquivo_id} não tem conteudo_json")
-        
-        # ✅ Calcular totais para o template
-        total_entradas = Decimal("0")
-        total_saidas = Decimal("0")
-        
-        for reg in registros:
-            try:
-                valor = Decimal(str(reg.get('valor', 0)))
-                if valor > 0:
-                    total_entradas += valor
-                else:
-                    total_saidas += abs(valor)
-            except Exception as e:
-                logger.debug(f"⚠️ Erro ao processar registro: {str(e)}")
-                continue
-        
-        # ✅ Calcular totais por categoria
-        categorias = {}
-        for reg in registros:
-            try:
-                cat = reg.get('categoria', 'outros')
-                valor = Decimal(str(reg.get('valor', 0)))
-                if cat not in categorias:
-                    categorias[cat] = Decimal("0")
-                categorias[cat] += valor
-            except:
-                continue
-        
-        # ✅ Calcular totais por tipo_pagamento
-        tipos_pagamento = {}
-        for reg in registros:
-            try:
-                tipo = reg.get('tipo_pagamento', 'outros')
-                valor = Decimal(str(reg.get('valor', 0)))
-                if tipo not in tipos_pagamento:
-                    tipos_pagamento[tipo] = Decimal("0")
-                tipos_pagamento[tipo] += valor
-            except:
-                continue
+        logger.info(
+            f"📄 Arquivo: {arquivo['nome_arquivo']} | Tipo: {arquivo['tipo']} | "
+            f"página {paginacao['pagina']}/{paginacao['paginas']} ({len(arquivo['registros'])} registros)"
+        )
         
-        logger.info(f"✅ Dados calculados: {len(registros)} registros, R$ {total_entradas + total_saidas} total")
+        # ✅ Função auxiliar para construir URLs de paginação
+        def build_pagination_url(page_num):
+            """Constrói URL de paginação mantendo parâmetros atuais"""
+            params = request.args.to_dict()
+            params['page'] = page_num
+            params = {k: v for k, v in params.items() if v}
+            return url_for('operacoes.arquivo_detalhe_page', arquivo_id=arquivo_id, **params)
         
         # ✅ Verificar se template existe antes de renderizar
         template_name = "arquivo_detalhe.html"
@@ -286,20 +236,20 @@ def arquivo_detalhe_page(arquivo_id):
             logger.error(f"❌ Template {template_name} NÃO ENCONTRADO")
             return f"Erro: Template '{template_name}' não encontrado", 500
         
-        logger.info(f"🎨 Renderizando template {template_name}")
-        
         return render_template(
             template_name, 
             arquivo=arquivo,
-            arquivo_nome=nome_arquivo,
-            arquivo_tipo=tipo_arquivo,
-            arquivo_status=status_arquivo,
-            registros=registros,
-            total_entradas=total_entradas,
-            total_saidas=total_saidas,
-            total_registros=len(registros),
-            categorias=categorias,
-            tipos_pagamento=tipos_pagamento
+            arquivo_nome=arquivo["nome_arquivo"],
+            arquivo_tipo=arquivo["tipo"],
+            arquivo_status=arquivo["status"],
+            registros=arquivo["registros"],
+            total_entradas=resumo["total_entradas"],
+            total_saidas=resumo["total_saidas"],
+            total_registros=paginacao["total"],
+            categorias=resumo["categorias"],
+            tipos_pagamento=resumo["tipos_pagamento"],
+            paginacao=paginacao,
+            build_pagination_url=build_pagination_url
         )
         
     except Exception as e:
@@ -313,6 +263,27 @@ def arquivo_detalhe_page(arquivo_id):
             raise
         return render_template("errors/500.html", error_message="Erro ao carregar arquivo"), 500
 
+@operacoes_bp.route("/api/arquivo/<int:arquivo_id>/registros", methods=["GET"])
+@login_required
+@empresa_required
+def arquivo_registros_api(arquivo_id):
+    """Metadados + página N dos registros de um arquivo importado"""
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(max(1, request.args.get('per_page', 200, type=int)), 500)
+    
+    arquivo = buscar_arquivo_por_id(arquivo_id, g.user.empresa_id, pagina=page, por_pagina=per_page)
+    if not arquivo:
+        return jsonify({"ok": False, "message": "Arquivo não encontrado."}), 404
+    
+    resumo = arquivo.pop("resumo")
+    arquivo["resumo"] = {
+        "total_entradas": str(resumo["total_entradas"]),
+        "total_saidas": str(resumo["total_saidas"]),
+        "categorias": {str(k): str(v) for k, v in resumo["categorias"].items()},
+        "tipos_pagamento": {str(k): str(v) for k, v in resumo["tipos_pagamento"].items()},
+    }
+    return jsonify({"ok": True, "arquivo": arquivo})
+
 @operacoes_bp.route("/api/ultimos-uploads", methods=["GET"])
 @login_required
 @empresa_required
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# scripts/benchmark_aliases.py
+# Benchmark + regressão: AliasesFinanceiros.normalizar compilado x original
+#
+# Uso:
+#   python scripts/benchmark_aliases.py
+#   python scripts/benchmark_aliases.py --corpus outro_corpus.txt -n 200000
+#
+# Lê o corpus de descrições reais (scripts/dados/descricoes_extrato.txt),
+# confere que a versão compilada devolve exatamente o mesmo texto que a
+# original (também em minúsculas e com um alias adicionado em runtime) e mede
+# a latência média por chamada.
+#   original  → 8 re.sub com padrão em string + varredura de todos os aliases
+#   compilado → regex compiladas no __init__ + alternação única dos aliases
+#               como pré-filtro
+#
+# Resultado de referência (Python 3.11, 167 descrições, 200k chamadas, melhor de 3):
+#   ✅ 1,006 normalizações idênticas (167 descrições do corpus)
+#      original    11.50µs/chamada
+#      compilado    8.01µs/chamada   (30% menos)
+# O que sobra são as 8 substituições em si; juntá-las mudaria a saída em
+# casos de borda (a ordem importa), então ficam separadas.
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.aliases_financeiros import AliasesFinanceiros
+
+CORPUS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "descricoes_extrato.txt")
+
+
+class AliasesOriginal(AliasesFinanceiros):
+    """normalizar() como era antes da compilação (referência)"""
+
+    def normalizar(self, descricao):
+        if not descricao:
+            return ""
+        descricao = descricao.upper().strip()
+        for pattern, replacement in self.PADROES_LIMPEZA:
+            descricao = re.sub(pattern, replacement, descricao)
+        descricao = descricao.strip()
+        for alias, valor in self.aliases.items():
+            if alias in descricao:
+                descricao = descricao.replace(alias, valor)
+                break
+        return descricao
+
+
+def carregar_corpus(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return [linha.rstrip("\n") for linha in f if linha.strip() and not linha.startswith("#")]
+
+
+def medir(normalizar, descricoes, chamadas, repeticoes):
+    """µs por chamada (melhor de `repeticoes`)"""
+    sequencia = (descricoes * (chamadas // len(descricoes) + 1))[:chamadas]
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for descricao in sequencia:
+            normalizar(descricao)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor / chamadas * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalização de descrições: original x compilada")
+    parser.add_argument("--corpus", default=CORPUS_PADRAO, help="Arquivo com uma descrição por linha")
+    parser.add_argument("-n", type=int, default=200_000, help="Chamadas por medição")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Medições por versão (vale a melhor)")
+    args = parser.parse_args()
+
+    descricoes = carregar_corpus(args.corpus)
+    original, compilado = AliasesOriginal(), AliasesFinanceiros()
+
+    # Regressão: saída idêntica, inclusive com alias novo em runtime
+    variantes = descricoes + [d.lower() for d in descricoes] + [f"  {d}  " for d in descricoes] + ["", None]
+    divergentes = [d for d in variantes if original.normalizar(d) != compilado.normalizar(d)]
+    original.adicionar_alias("SEM PARAR", "SEMPARAR")
+    compilado.adicionar_alias("SEM PARAR", "SEMPARAR")
+    divergentes += [d for d in variantes if original.normalizar(d) != compilado.normalizar(d)]
+    if divergentes:
+        for d in divergentes[:10]:
+            print(f"❌ {d!r}: {original.normalizar(d)!r} != {compilado.normalizar(d)!r}")
+        sys.exit(1)
+    print(f"✅ {len(variantes) * 2:,} normalizações idênticas ({len(descricoes)} descrições do corpus)")
+
+    antes = medir(original.normalizar, descricoes, args.n, args.repeticoes)
+    depois = medir(compilado.normalizar, descricoes, args.n, args.repeticoes)
+    print(f"   original   {antes:6.2f}µs/chamada")
+    print(f"   compilado  {depois:6.2f}µs/chamada   ({(1 - depois / antes) * 100:.0f}% menos)")
+
+
+if __name__ == "__main__":
+    main()
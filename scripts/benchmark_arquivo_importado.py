@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# scripts/benchmark_arquivo_importado.py
+# Benchmark: tamanho e custo de leitura do conteúdo de arquivos importados
+#
+# Uso:
+#   python scripts/benchmark_arquivo_importado.py              # 20k registros
+#   python scripts/benchmark_arquivo_importado.py -n 100000 --bloco 1000
+#
+# Compara o formato legado (JSON inteiro num único token Fernet) com o formato
+# em blocos NCZ1 (services/conteudo_importado.py: zlib + Fernet por bloco):
+#   - bytes na coluna conteudo_json
+#   - tamanho do arquivo SQLite em disco com --arquivos cópias gravadas
+#   - prévia (primeira página do detalhe do arquivo, 50 registros, via
+#     buscar_arquivo_por_id) e leitura completa
+#
+# Resultado de referência (Python 3.11, SQLite em arquivo, 20k registros,
+# 10 arquivos, blocos de 500; zstd não está instalado aqui, então zlib nível 6):
+#   legado   coluna 5,150.2KB  disco 51.1MB  prévia 116.2ms  completo 79.5ms
+#   NCZ1     coluna   509.3KB  disco  5.8MB  prévia   3.8ms  completo 47.1ms
+#   redução  coluna 90.1%  disco 88.8%  prévia 31x mais rápida
+# A prévia do NCZ1 não cresce com o arquivo (cabeçalho, resumo e o bloco da
+# página); a do legado é a leitura completa mais o resumo de todos os registros.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet
+
+os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+
+from flask import Flask
+from sqlalchemy.exc import SAWarning
+
+from models import db, ArquivoImportado, Empresa, Usuario
+import services.conteudo_importado as conteudo_importado
+from services.importer_db import descriptografar_conteudo, buscar_arquivo_por_id
+from utils.chaves_criptografia import gerenciador_chaves
+
+DESCRICOES = ["VENDA CARTAO VISA", "VENDA MASTERCARD CREDITO", "PIX RECEBIDO", "TARIFA PACOTE", "VENDA ELO DEBITO"]
+CATEGORIAS = ["venda_cartao", "pix", "tarifa", "transferencia"]
+PAGAMENTOS = ["credito", "debito", "pix", "boleto"]
+
+
+def gerar_registros(n, seed=42):
+    rnd = random.Random(seed)
+    inicio = date(2024, 1, 1)
+    return [{
+        "data": (inicio + timedelta(days=rnd.randint(0, 364))).isoformat(),
+        "descricao": f"{rnd.choice(DESCRICOES)} {rnd.randint(1000, 9999)}",
+        "valor": str(Decimal(rnd.randint(-50_000, 500_000)) / 100),
+        "categoria": rnd.choice(CATEGORIAS),
+        "tipo_pagamento": rnd.choice(PAGAMENTOS),
+        "nsu": str(10_000_000 + i),
+        "adquirente": "Flow",
+        "bandeira": rnd.choice(["VISA", "MASTERCARD", "ELO"]),
+    } for i in range(n)]
+
+
+def legado(registros):
+    """Formato anterior: um único token Fernet com o JSON inteiro"""
+    import json
+    return gerenciador_chaves.fernet().encrypt(json.dumps(registros, ensure_ascii=False, default=str).encode()).decode()
+
+
+def medir(funcao, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def rodar(conteudo, arquivos, repeticoes):
+    app = Flask(__name__)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "bench.db")
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{caminho}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(Empresa(nome="Benchmark", documento="00000000000191", email="bench@local"))
+            db.session.flush()
+            db.session.add(Usuario(nome="Bench", email="bench@local", senha_hash="x", empresa_id=1))
+            for i in range(arquivos):
+                db.session.add(ArquivoImportado(
+                    empresa_id=1, usuario_id=1, nome_arquivo=f"extrato_{i}.csv", tipo_arquivo="venda",
+                    hash_arquivo=f"{i:064d}", conteudo_json=conteudo, status="processado",
+                ))
+            db.session.commit()
+
+            def completo():
+                db.session.expire_all()
+                descriptografar_conteudo(db.session.get(ArquivoImportado, 1).conteudo_json)
+
+            def previa():
+                db.session.expire_all()
+                buscar_arquivo_por_id(1, 1, pagina=1, por_pagina=50)
+
+            tempo_previa = medir(previa, repeticoes)
+            tempo_completo = medir(completo, repeticoes)
+            db.session.remove()
+            db.engine.dispose()
+
+        disco = os.path.getsize(caminho)
+    return disco, tempo_previa, tempo_completo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do formato de conteúdo importado")
+    parser.add_argument("-n", type=int, default=20_000, help="Registros por arquivo")
+    parser.add_argument("--arquivos", type=int, default=10, help="Arquivos gravados no SQLite")
+    parser.add_argument("--bloco", type=int, default=conteudo_importado.REGISTROS_POR_BLOCO, help="Registros por bloco")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Leituras por medição (vale a melhor)")
+    args = parser.parse_args()
+
+    # Decimal no SQLite gera SAWarning a cada consulta
+    warnings.filterwarnings("ignore", category=SAWarning)
+
+    registros = gerar_registros(args.n)
+    formatos = {
+        "legado": legado(registros),
+        "NCZ1": conteudo_importado.empacotar(registros, fernet=gerenciador_chaves.fernet(), por_bloco=args.bloco),
+    }
+    assert descriptografar_conteudo(formatos["NCZ1"]) == registros
+
+    print(f"📊 {args.n:,} registros, {args.arquivos} arquivos, blocos de {args.bloco}")
+    medidas = {}
+    for nome, conteudo in formatos.items():
+        disco, tempo_previa, tempo_completo = rodar(conteudo, args.arquivos, args.repeticoes)
+        medidas[nome] = (len(conteudo), disco, tempo_previa)
+        print(f"   {nome:<8} coluna {len(conteudo) / 1024:9,.1f}KB  disco {disco / 1024 / 1024:6.1f}MB  "
+              f"prévia {tempo_previa * 1000:6.1f}ms  completo {tempo_completo * 1000:6.1f}ms")
+
+    coluna_l, disco_l, previa_l = medidas["legado"]
+    coluna_n, disco_n, previa_n = medidas["NCZ1"]
+    print(f"   redução  coluna {(1 - coluna_n / coluna_l) * 100:.1f}%  disco {(1 - disco_n / disco_l) * 100:.1f}%  "
+          f"prévia {previa_l / previa_n:.0f}x mais rápida")
+
+
+if __name__ == "__main__":
+    main()
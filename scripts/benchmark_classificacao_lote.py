@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# scripts/benchmark_classificacao_lote.py
+# Benchmark: classificador.classificar linha a linha x classificar_lote
+#
+# Uso:
+#   python scripts/benchmark_classificacao_lote.py               # 50k transações
+#   python scripts/benchmark_classificacao_lote.py -n 200000 --lote 1000
+#
+# Classifica o mesmo extrato sintético (o de benchmark_cache_classificador:
+# descrições de scripts/dados/descricoes_extrato.txt com frequência tipo
+# Zipf e valores variados) de três formas, com o cache do classificador
+# vazio (primeiro arquivo depois do deploy) e cheio (arquivos seguintes):
+#   linha a linha → [classificar(d, v, t) for ...] (como antes)
+#   lote N        → classificar_lote em fatias de N (utils.parsers.normalizar_linhas)
+#   lote inteiro  → uma chamada com o extrato todo
+# Vale o melhor tempo de --repeticoes rodadas; os resultados são conferidos
+# contra os da versão linha a linha.
+#
+# Resultado de referência (Python 3.11, 50k transações, CLASSIFICADOR_CACHE=memoria):
+#   cache vazio:
+#      linha a linha   0.511s      97,754 tx/s    1.0x
+#      lote 500        0.148s     337,983 tx/s    3.5x
+#      lote inteiro    0.024s   2,063,062 tx/s   21.1x
+#   cache cheio:
+#      linha a linha   0.507s      98,629 tx/s    1.0x
+#      lote 500        0.146s     343,380 tx/s    3.5x
+#      lote inteiro    0.024s   2,044,215 tx/s   20.7x
+# Com 167 descrições distintas o cache enche nas primeiras centenas de
+# linhas, então vazio e cheio quase não diferem: o que o lote economiza é
+# o custo fixo por linha (aliases, consulta ao cache, score e montagem do
+# resultado), que passa a ser pago por descrição distinta.
+
+import argparse
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Só o LRU do processo: o SQLite compartilhado mediria disco, não o lote
+os.environ.setdefault("CLASSIFICADOR_CACHE", "memoria")
+
+from benchmark_cache_classificador import gerar_transacoes
+from services.cache_classificador import CacheClassificador
+from services.classificador_financeiro import ClassificadorFinanceiro
+
+
+def linha_a_linha(classificador, transacoes, _):
+    return [classificador.classificar(d, v, t) for d, v, t in transacoes]
+
+
+def em_lotes(classificador, transacoes, tamanho):
+    resultados = []
+    for inicio in range(0, len(transacoes), tamanho):
+        resultados.extend(classificador.classificar_lote(transacoes[inicio:inicio + tamanho]))
+    return resultados
+
+
+def medir(funcao, transacoes, tamanho, cache_cheio, repeticoes):
+    melhor = None
+    for _ in range(max(1, repeticoes)):
+        classificador = ClassificadorFinanceiro()
+        classificador.cache = CacheClassificador()
+        if cache_cheio:
+            funcao(classificador, transacoes, tamanho)
+        inicio = time.perf_counter()
+        resultados = funcao(classificador, transacoes, tamanho)
+        tempo = time.perf_counter() - inicio
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classificação linha a linha x em lote")
+    parser.add_argument("-n", type=int, default=50_000, help="Transações")
+    parser.add_argument("--lote", type=int, default=500, help="Tamanho da fatia do modo em lotes")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções por modo (vale a melhor)")
+    args = parser.parse_args()
+
+    transacoes = gerar_transacoes(args.n, seed=7)
+    distintas = len({d for d, _, _ in transacoes})
+    print(f"📊 {args.n:,} transações ({distintas} descrições distintas)")
+
+    modos = [
+        ("linha a linha", linha_a_linha, None),
+        (f"lote {args.lote}", em_lotes, args.lote),
+        ("lote inteiro", em_lotes, args.n),
+    ]
+    for cache_cheio in (False, True):
+        print(f"   cache {'cheio' if cache_cheio else 'vazio'}:")
+        referencia = None
+        base = None
+        for nome, funcao, tamanho in modos:
+            tempo, resultados = medir(funcao, transacoes, tamanho, cache_cheio, args.repeticoes)
+            if referencia is None:
+                referencia, base = resultados, tempo
+            elif resultados != referencia:
+                raise SystemExit(f"❌ {nome}: resultados diferentes da classificação linha a linha")
+            print(f"      {nome:<14} {tempo:6.3f}s  {args.n / tempo:>10,.0f} tx/s  {base / tempo:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# scripts/benchmark_conciliacao_vetorizada.py
+# Benchmark: utils.concilia.conciliar x utils.concilia_vetorizada.conciliar_vetorizado
+#
+# Uso:
+#   python scripts/benchmark_conciliacao_vetorizada.py                 # 100k x 100k (só vetorizado)
+#   python scripts/benchmark_conciliacao_vetorizada.py -n 2000 --comparar
+#
+# Gera vendas/recebimentos sintéticos (1 ano de datas, ~80% com NSU
+# correspondente, ~10% depósitos agrupando 2-4 vendas) e mede o tempo.
+# Com --comparar, roda também a versão escalar e confere a paridade.
+
+import argparse
+import copy
+import logging
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.concilia import conciliar
+from utils.concilia_vetorizada import conciliar_vetorizado, NUMPY_DISPONIVEL
+
+logging.basicConfig(level=logging.WARNING)
+
+ADQUIRENTES = ["CIELO", "REDE", "GETNET", "STONE", None]
+
+
+def gerar_dados(n, seed=42):
+    rnd = random.Random(seed)
+    inicio = date(2024, 1, 1)
+
+    vendas = []
+    for i in range(n):
+        d = inicio + timedelta(days=rnd.randint(0, 364))
+        vendas.append({
+            "tipo": "venda",
+            "nsu": str(10_000_000 + i),
+            "data": d.strftime("%d/%m/%Y"),
+            "valor": Decimal(rnd.randint(500, 500_000)) / 100,
+            "bandeira": "VISA",
+            "adquirente": rnd.choice(ADQUIRENTES),
+            "tipo_pagamento": "cartao",
+            "fonte": "vendas.csv",
+        })
+
+    recebimentos = []
+    while len(recebimentos) < n:
+        sorteio = rnd.random()
+        if sorteio < 0.8:
+            # Recebimento individual com NSU da venda
+            v = rnd.choice(vendas)
+            valor = v["valor"] if rnd.random() < 0.9 else v["valor"] - Decimal("0.03")
+            recebimentos.append({
+                "nsu": v["nsu"], "data": v["data"], "valor": valor,
+                "adquirente": v["adquirente"], "descricao": "CREDITO", "fonte": "extrato.ofx",
+            })
+        elif sorteio < 0.9:
+            # Depósito agrupando vendas do mesmo dia (NSU do lote)
+            base = rnd.choice(vendas)
+            grupo = [base] + [v for v in rnd.sample(vendas, 50) if v["data"] == base["data"]][:3]
+            recebimentos.append({
+                "nsu": f"L{len(recebimentos)}", "data": base["data"],
+                "valor": sum((v["valor"] for v in grupo), Decimal("0")),
+                "adquirente": base["adquirente"], "descricao": "LOTE", "fonte": "extrato.ofx",
+            })
+        else:
+            d = inicio + timedelta(days=rnd.randint(0, 364))
+            recebimentos.append({
+                "nsu": None, "data": d.isoformat(),
+                "valor": Decimal(rnd.randint(500, 500_000)) / 100,
+                "adquirente": None, "descricao": "TED", "fonte": "extrato.ofx",
+            })
+
+    return vendas, recebimentos
+
+
+def medir(func, vendas, recebimentos):
+    inicio = time.perf_counter()
+    resultado = func(vendas, recebimentos)
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do motor vetorizado de conciliação")
+    parser.add_argument("-n", type=int, default=100_000, help="Quantidade de vendas e de recebimentos")
+    parser.add_argument("--comparar", action="store_true", help="Roda também conciliar() e confere paridade")
+    args = parser.parse_args()
+
+    if not NUMPY_DISPONIVEL:
+        print("⚠️ NumPy não instalado: conciliar_vetorizado() delega para conciliar()")
+
+    vendas, recebimentos = gerar_dados(args.n)
+    print(f"📊 {len(vendas)} vendas x {len(recebimentos)} recebimentos")
+
+    t_vet, r_vet = medir(conciliar_vetorizado, copy.deepcopy(vendas), copy.deepcopy(recebimentos))
+    print(f"⚡ vetorizado: {t_vet:.2f}s ({args.n / t_vet:,.0f} vendas/s) - "
+          f"ok={r_vet['resumo']['qtd_conciliados_ok']}, "
+          f"multivendas_otimizadas={r_vet['resumo']['qtd_multivendas_otimizadas']}")
+
+    if args.comparar:
+        t_esc, r_esc = medir(conciliar, copy.deepcopy(vendas), copy.deepcopy(recebimentos))
+        print(f"🐢 escalar:    {t_esc:.2f}s ({args.n / t_esc:,.0f} vendas/s)")
+        print(f"🚀 speedup: {t_esc / t_vet:.1f}x - paridade: {'✅ OK' if r_esc == r_vet else '❌ DIVERGENTE'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# scripts/benchmark_parser_excel.py
+# Benchmark: leitura de planilhas com utils.parsers.iterar_excel_generic
+#
+# Uso:
+#   python scripts/benchmark_parser_excel.py                 # 10k, 50k e 200k linhas
+#   python scripts/benchmark_parser_excel.py -n 20000 --sem-normalizar
+#
+# Gera planilhas .xlsx sintéticas no formato de extrato de adquirente (duas
+# linhas de título antes do cabeçalho) e mede linhas/s e pico de memória
+# (tracemalloc, em execução separada) do leitor em streaming. Para comparar,
+# mede também a leitura antiga: list(sheet.rows) materializando as células.
+#
+# Resultado de referência (Python 3.11, openpyxl 3.1, --sem-normalizar):
+#    10k linhas:  list(sheet.rows)  5.5k linhas/s, pico  12.3MB | streaming  6.0k linhas/s, pico  1.6MB
+#    50k linhas:  list(sheet.rows)  4.8k linhas/s, pico  60.4MB | streaming  5.6k linhas/s, pico  4.8MB
+#   200k linhas:  list(sheet.rows)  4.9k linhas/s, pico 240.8MB | streaming  8.1k linhas/s, pico 16.8MB
+# O que ainda cresce no streaming é a tabela de sharedStrings, que o openpyxl
+# carrega inteira ao abrir (aqui, NSU e descrição são únicos por linha).
+
+import argparse
+import io
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook, load_workbook
+
+import utils.parsers as parsers
+
+logging.basicConfig(level=logging.WARNING)
+
+ADQUIRENTES = ["CIELO", "REDE", "GETNET", "STONE"]
+BANDEIRAS = ["VISA", "MASTERCARD", "ELO", "PIX"]
+
+
+def gerar_xlsx(n, seed=42):
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Vendas")
+    ws.append(["Extrato de vendas - período 01/01/2024 a 31/12/2024"])
+    ws.append([])
+    ws.append(["data_venda", "nsu", "adquirente", "bandeira", "valor_bruto", "valor_liquido", "descricao"])
+    inicio = date(2024, 1, 1)
+    for i in range(n):
+        bruto = rnd.randint(500, 500_000) / 100
+        ws.append([
+            inicio + timedelta(days=rnd.randint(0, 364)),
+            str(10_000_000 + i),
+            rnd.choice(ADQUIRENTES),
+            rnd.choice(BANDEIRAS),
+            bruto,
+            round(bruto * 0.97, 2),
+            f"VENDA CARTAO {i}",
+        ])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def leitura_materializada(stream, filename=None):
+    """Leitura anterior (list(sheet.rows)), com a mesma detecção de cabeçalho"""
+    wb = load_workbook(filename=io.BytesIO(stream.read()), data_only=True, keep_links=False, read_only=True)
+    rows = list(wb.active.rows)
+    pontuacoes = [parsers._pontuar_cabecalho([c.value for c in r]) for r in rows[:parsers.LINHAS_BUSCA_CABECALHO]]
+    idx = pontuacoes.index(max(pontuacoes))
+    headers = [str(c.value).strip() if c.value is not None else "" for c in rows[idx]]
+    for row in rows[idx + 1:]:
+        row_dict = {headers[j]: c.value for j, c in enumerate(row)
+                    if j < len(headers) and headers[j] and c.value is not None}
+        if row_dict:
+            yield parsers.normalize_row(row_dict)
+    wb.close()
+
+
+def medir(func, conteudo):
+    """Tempo e pico de memória em execuções separadas (tracemalloc distorce o tempo)"""
+    inicio = time.perf_counter()
+    total = sum(1 for _ in func(io.BytesIO(conteudo), "benchmark.xlsx"))
+    tempo = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    for _ in func(io.BytesIO(conteudo), "benchmark.xlsx"):
+        pass
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return tempo, pico, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do parser Excel em streaming")
+    parser.add_argument("-n", type=int, action="append", help="Linhas (pode repetir)")
+    parser.add_argument("--sem-normalizar", action="store_true", help="Mede só a leitura da planilha")
+    args = parser.parse_args()
+
+    if args.sem_normalizar:
+        parsers.normalize_row = lambda r: r
+        parsers.normalizar_linhas = lambda linhas: linhas
+
+    # Aquece o classificador (carga preguiçosa fora da medição)
+    parsers.normalize_row({"valor": "1", "descricao": "aquecimento"})
+
+    for n in args.n or [10_000, 50_000, 200_000]:
+        conteudo = gerar_xlsx(n)
+        print(f"📊 {n:,} linhas ({len(conteudo) / 1024 / 1024:.1f}MB)")
+
+        for nome, func in (("list(sheet.rows)", leitura_materializada),
+                           ("iterar_excel_generic", parsers.iterar_excel_generic)):
+            tempo, pico, total = medir(func, conteudo)
+            print(f"   {nome:<21} {tempo:7.2f}s  {n / tempo:>10,.0f} linhas/s  "
+                  f"pico {pico / 1024 / 1024:7.1f}MB  ({total} registros)")
+
+
+if __name__ == "__main__":
+    main()
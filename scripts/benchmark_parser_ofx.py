@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# scripts/benchmark_parser_ofx.py
+# Benchmark: utils.parsers.parse_ofx_generic x utils.parsers.iterar_ofx_generic
+#
+# Uso:
+#   python scripts/benchmark_parser_ofx.py                    # 1k, 10k e 100k transações
+#   python scripts/benchmark_parser_ofx.py -n 5000 --sem-normalizar
+#
+# Gera extratos OFX sintéticos (SGML, tags folha sem fechamento, como os
+# bancos costumam exportar) e mede tempo e pico de memória (tracemalloc)
+# de cada parser. Com --sem-normalizar, a normalização (normalize_row e
+# normalizar_linhas) é trocada pela identidade para medir só a tokenização.
+#
+# O limite MAX_FILE_SIZE é desligado durante o benchmark: 100k transações
+# geram ~25MB e parse_ofx_generic recusaria o arquivo.
+
+import argparse
+import io
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.parsers as parsers
+
+logging.basicConfig(level=logging.WARNING)
+
+MEMOS = ["PIX RECEBIDO", "TED CIELO SA", "CRED REDE VISA", "DEP GETNET", "TARIFA PACOTE", "PAGTO BOLETO"]
+
+
+def gerar_ofx(n, seed=42):
+    rnd = random.Random(seed)
+    partes = [
+        "OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\nENCODING:USASCII\nCHARSET:1252\n\n"
+        "<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>BRL\n"
+        "<BANKACCTFROM><BANKID>001<BRANCHID>1234<ACCTID>56789-0<ACCTTYPE>CHECKING</BANKACCTFROM>\n"
+        "<BANKTRANLIST><DTSTART>20240101<DTEND>20241231\n"
+    ]
+    for i in range(n):
+        credito = rnd.random() < 0.7
+        valor = rnd.randint(100, 500_000) / 100
+        partes.append(
+            "<STMTTRN>\n"
+            f"<TRNTYPE>{'CREDIT' if credito else 'DEBIT'}\n"
+            f"<DTPOSTED>2024{rnd.randint(1, 12):02d}{rnd.randint(1, 28):02d}120000[-3:BRT]\n"
+            f"<TRNAMT>{'' if credito else '-'}{valor:.2f}\n"
+            f"<FITID>{20240000000 + i}\n"
+            f"<CHECKNUM>{i}\n"
+            f"<MEMO>{rnd.choice(MEMOS)} {rnd.randint(1000, 9999)}\n"
+            "</STMTTRN>\n"
+        )
+    partes.append("</BANKTRANLIST><LEDGERBAL><BALAMT>0.00<DTASOF>20241231</LEDGERBAL>"
+                  "</STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+    return "".join(partes).encode("latin-1")
+
+
+def medir(func, conteudo):
+    """Tempo e pico de memória em execuções separadas (tracemalloc distorce o tempo)"""
+    inicio = time.perf_counter()
+    total = sum(1 for _ in func(io.BytesIO(conteudo), "benchmark.ofx"))
+    tempo = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    for _ in func(io.BytesIO(conteudo), "benchmark.ofx"):
+        pass
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return tempo, pico, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do parser OFX em streaming")
+    parser.add_argument("-n", type=int, action="append", help="Transações (pode repetir)")
+    parser.add_argument("--sem-normalizar", action="store_true", help="Mede só a tokenização")
+    args = parser.parse_args()
+
+    parsers.MAX_FILE_SIZE = float("inf")
+    if args.sem_normalizar:
+        parsers.normalize_row = lambda r: r
+        parsers.normalizar_linhas = lambda linhas: linhas
+
+    # Aquece o classificador (carga preguiçosa fora da medição)
+    parsers.normalize_row({"valor": "1", "descricao": "aquecimento"})
+
+    for n in args.n or [1_000, 10_000, 100_000]:
+        conteudo = gerar_ofx(n)
+        print(f"📊 {n:,} transações ({len(conteudo) / 1024 / 1024:.1f}MB)")
+
+        t_atual, m_atual, r_atual = medir(parsers.parse_ofx_generic, conteudo)
+        t_stream, m_stream, r_stream = medir(parsers.iterar_ofx_generic, conteudo)
+
+        print(f"   parse_ofx_generic:  {t_atual:7.2f}s  {n / t_atual:>10,.0f} tx/s  "
+              f"pico {m_atual / 1024 / 1024:7.1f}MB  ({r_atual} registros)")
+        print(f"   iterar_ofx_generic: {t_stream:7.2f}s  {n / t_stream:>10,.0f} tx/s  "
+              f"pico {m_stream / 1024 / 1024:7.1f}MB  ({r_stream} registros)")
+        print(f"   🚀 speedup {t_atual / t_stream:.1f}x, memória {m_atual / max(m_stream, 1):.1f}x menor")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 # services/aliases_financeiros.py
 # Normalização de descrições antes da classificação
 
+import hashlib
+import json
 import re
 import logging
 from typing import Dict
@@ -42,6 +44,23 @@ class AliasesFinanceiros:
         if aliases_adicionais:
             self.aliases.update(aliases_adicionais)
 
+        # Regex compiladas uma vez (re.sub com string paga a busca no cache
+        # do módulo re a cada chamada)
+        self._limpeza = [(re.compile(pattern), replacement) for pattern, replacement in self.PADROES_LIMPEZA]
+        self._compilar_aliases()
+
+    def _compilar_aliases(self) -> None:
+        """
+        Alternação única com todos os aliases, usada como pré-filtro: a
+        maioria das descrições não tem alias e sai com uma só busca em C.
+        """
+        if self.aliases:
+            self._regex_aliases = re.compile("|".join(map(re.escape, self.aliases)))
+        else:
+            self._regex_aliases = None
+        # Entra na versão do cache de classificação (alias novo muda resultados)
+        self.versao = hashlib.sha1(json.dumps(self.aliases, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
     def normalizar(self, descricao: str) -> str:
         """
         Normaliza uma descrição financeira.
@@ -60,12 +79,16 @@ class AliasesFinanceiros:
         descricao = descricao.upper().strip()
 
         # Aplicar padrões de limpeza
-        for pattern, replacement in self.PADROES_LIMPEZA:
-            descricao = re.sub(pattern, replacement, descricao)
+        for regex, replacement in self._limpeza:
+            descricao = regex.sub(replacement, descricao)
 
         descricao = descricao.strip()
 
-        # Aplicar aliases (substituição direta)
+        if self._regex_aliases is None or not self._regex_aliases.search(descricao):
+            return descricao
+
+        # Aplicar aliases (substituição direta; vale o primeiro na ordem do
+        # dict, não o primeiro no texto, por isso o laço depois do filtro)
         for alias, valor in self.aliases.items():
             if alias in descricao:
                 descricao = descricao.replace(alias, valor)
@@ -76,6 +99,7 @@ class AliasesFinanceiros:
     def adicionar_alias(self, original: str, substituto: str) -> None:
         """Adiciona um novo alias em runtime."""
         self.aliases[original.upper()] = substituto.upper()
+        self._compilar_aliases()
         logger.info(f"✅ Alias adicionado: {original} → {substituto}")
 
 
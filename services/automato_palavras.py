@@ -0,0 +1,85 @@
+# services/automato_palavras.py
+# Autômato Aho-Corasick para achar várias palavras-chave numa única passada
+
+from collections import deque
+from typing import Iterable, List, Set
+
+
+class AutomatoPalavras:
+    """
+    Aho-Corasick sobre as palavras-chave das regras.
+
+    Construído uma vez a partir da lista de padrões; encontrar() percorre o
+    texto uma única vez e devolve os índices de todos os padrões que
+    aparecem nele (inclusive sobrepostos, ex.: "AUTO POSTO" e "POSTO").
+
+    As transições são completadas na construção (DFA), então a busca é só um
+    dict.get por caractere, sem seguir links de falha. Caracteres que não
+    aparecem em nenhum padrão voltam à raiz.
+    """
+
+    def __init__(self, padroes: Iterable[str]):
+        self.padroes: List[str] = list(padroes)
+        self._transicoes: List[dict] = [{}]
+        self._saidas: List[frozenset] = []
+        self._sempre: frozenset = frozenset()
+        self._construir()
+
+    def _construir(self) -> None:
+        transicoes = self._transicoes
+        saidas: List[Set[int]] = [set()]
+
+        # 1. Trie
+        for indice, padrao in enumerate(self.padroes):
+            estado = 0
+            for caractere in padrao:
+                proximo = transicoes[estado].get(caractere)
+                if proximo is None:
+                    proximo = len(transicoes)
+                    transicoes[estado][caractere] = proximo
+                    transicoes.append({})
+                    saidas.append(set())
+                estado = proximo
+            saidas[estado].add(indice)
+
+        # Padrão vazio está contido em qualquer texto
+        self._sempre = frozenset(saidas[0])
+
+        # 2. Links de falha em largura, completando as transições (DFA)
+        alfabeto = {c for padrao in self.padroes for c in padrao}
+        falha = [0] * len(transicoes)
+        fila = deque()
+        for estado in transicoes[0].values():
+            fila.append(estado)
+
+        while fila:
+            estado = fila.popleft()
+            saidas[estado] |= saidas[falha[estado]]
+            filhos = transicoes[estado]
+            destinos_falha = transicoes[falha[estado]]
+            for caractere in alfabeto:
+                filho = filhos.get(caractere)
+                if filho is not None:
+                    falha[filho] = destinos_falha.get(caractere, 0)
+                    fila.append(filho)
+                else:
+                    destino = destinos_falha.get(caractere, 0)
+                    if destino:
+                        filhos[caractere] = destino
+
+        self._saidas = [frozenset(s) for s in saidas]
+
+    def encontrar(self, texto: str) -> Set[int]:
+        """Índices (em self.padroes) de todos os padrões contidos no texto"""
+        transicoes = self._transicoes
+        saidas = self._saidas
+        encontrados = set(self._sempre)
+        estado = 0
+        for caractere in texto:
+            estado = transicoes[estado].get(caractere, 0)
+            if saidas[estado]:
+                encontrados |= saidas[estado]
+        return encontrados
+
+    def __len__(self) -> int:
+        return len(self.padroes)
@@ -0,0 +1,197 @@
+# services/cache_adquirentes.py
+# Cache de resolução nome → id de adquirentes (por processo)
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from models import db, Adquirente
+
+logger = logging.getLogger(__name__)
+
+TTL_CACHE = 600       # Segundos até recarregar a tabela inteira
+TTL_NEGATIVO = 60     # Segundos que um "não existe" vale (outro worker pode criar)
+
+_CHAVE_SESSAO = "adquirentes_pendentes"
+
+
+class ResolvedorAdquirentes:
+    """
+    Resolve nome de adquirente → id sem ir ao banco a cada linha.
+
+    - Aquecido com uma única consulta (a tabela de adquirentes é pequena)
+    - Cache negativo com TTL curto para nomes inexistentes (quem cria a
+      adquirente ignora esse cache e consulta o banco antes)
+    - Adquirentes criadas/alteradas pelo ORM são vistas na própria transação
+      (session.info) e entram no cache só após o commit; rollback descarta
+    """
+
+    def __init__(self, ttl: int = TTL_CACHE, ttl_negativo: int = TTL_NEGATIVO):
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._lock = threading.RLock()
+        self._por_nome: Dict[str, int] = {}
+        self._negativos: Dict[str, float] = {}
+        self._parciais: Dict[str, Optional[int]] = {}
+        self._aquecido_em = 0.0
+        self._hits = 0
+        self._hits_negativos = 0
+        self._misses = 0
+
+    # ------------------------------------------------------------
+    # CARGA / INVALIDAÇÃO
+    # ------------------------------------------------------------
+
+    def aquecer(self) -> None:
+        """Carrega todas as adquirentes (menor id vence em nomes repetidos)"""
+        linhas = db.session.query(Adquirente.id, Adquirente.nome).order_by(Adquirente.id.desc()).all()
+        with self._lock:
+            self._por_nome = {nome.strip().lower(): id_ for id_, nome in linhas if nome}
+            self._negativos.clear()
+            self._parciais.clear()
+            self._aquecido_em = time.time()
+        logger.info(f"🔥 [ADQUIRENTES] Cache aquecido: {len(self._por_nome)} adquirentes")
+
+    def invalidar(self, nome: str = None) -> None:
+        """Invalida um nome (ou tudo, se nome=None)"""
+        with self._lock:
+            if nome is None:
+                self._por_nome.clear()
+                self._negativos.clear()
+                self._parciais.clear()
+                self._aquecido_em = 0.0
+                return
+            chave = nome.strip().lower()
+            self._por_nome.pop(chave, None)
+            self._negativos.pop(chave, None)
+            self._parciais.clear()
+
+    def _garantir_aquecido(self) -> None:
+        if time.time() - self._aquecido_em > self.ttl:
+            self.aquecer()
+
+    # ------------------------------------------------------------
+    # RESOLUÇÃO
+    # ------------------------------------------------------------
+
+    def resolver(self, nome: str, ignorar_negativo: bool = False) -> Optional[int]:
+        """
+        id da adquirente com lower(nome) igual, ou None.
+
+        ignorar_negativo=True vai ao banco mesmo com um "não existe" em
+        cache: é o que usa quem cria a adquirente quando recebe None, para
+        não duplicar uma que outro worker acabou de criar.
+        """
+        if not nome:
+            return None
+        chave = nome.strip().lower()
+
+        pendentes = db.session.info.get(_CHAVE_SESSAO)
+        if pendentes and chave in pendentes:
+            return pendentes[chave]
+
+        self._garantir_aquecido()
+        with self._lock:
+            if chave in self._por_nome:
+                self._hits += 1
+                return self._por_nome[chave]
+            expira = None if ignorar_negativo else self._negativos.get(chave)
+            if expira and expira > time.time():
+                self._hits_negativos += 1
+                return None
+            self._misses += 1
+
+        # Miss: pode ter sido criada por outro processo depois do aquecimento
+        adquirente = Adquirente.query.filter(
+            db.func.lower(Adquirente.nome) == chave
+        ).order_by(Adquirente.id).first()
+
+        with self._lock:
+            if adquirente:
+                self._por_nome[chave] = adquirente.id
+                return adquirente.id
+            self._negativos[chave] = time.time() + self.ttl_negativo
+            return None
+
+    def resolver_parcial(self, nome: str) -> Optional[int]:
+        """
+        Match exato; se não houver, primeira adquirente cujo nome contém o texto.
+        """
+        id_exato = self.resolver(nome)
+        if id_exato or not nome:
+            return id_exato
+        chave = nome.strip().lower()
+
+        with self._lock:
+            if chave in self._parciais:
+                self._hits += 1
+                return self._parciais[chave]
+            candidatos = [id_ for n, id_ in self._por_nome.items() if chave in n]
+            encontrado = min(candidatos) if candidatos else None
+            self._parciais[chave] = encontrado
+            return encontrado
+
+    # ------------------------------------------------------------
+    # MÉTRICAS
+    # ------------------------------------------------------------
+
+    @property
+    def stats(self) -> Dict:
+        total = self._hits + self._hits_negativos + self._misses
+        hit_rate = ((self._hits + self._hits_negativos) / total * 100) if total > 0 else 0
+        return {
+            "size": len(self._por_nome),
+            "negativos": len(self._negativos),
+            "hits": self._hits,
+            "hits_negativos": self._hits_negativos,
+            "misses": self._misses,
+            "hit_rate": f"{hit_rate:.1f}%",
+        }
+
+
+# Instância global
+resolvedor_adquirentes = ResolvedorAdquirentes()
+
+
+# ============================================================
+# EVENTOS: criação/alteração de adquirentes
+# ============================================================
+
+@event.listens_for(Adquirente, "after_insert")
+@event.listens_for(Adquirente, "after_update")
+def _adquirente_gravada(mapper, connection, target):
+    sessao = object_session(target)
+    if sessao is None:
+        return
+    pendentes = sessao.info.setdefault(_CHAVE_SESSAO, {})
+    # Renomeada: o nome antigo deixa de resolver
+    for nome_antigo in inspect(target).attrs.nome.history.deleted or ():
+        if nome_antigo:
+            pendentes[nome_antigo.strip().lower()] = None
+    if target.nome:
+        pendentes[target.nome.strip().lower()] = target.id
+
+
+@event.listens_for(Adquirente, "after_delete")
+def _adquirente_removida(mapper, connection, target):
+    sessao = object_session(target)
+    if sessao is not None and target.nome:
+        sessao.info.setdefault(_CHAVE_SESSAO, {})[target.nome.strip().lower()] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _confirmar_pendentes(sessao):
+    pendentes = sessao.info.pop(_CHAVE_SESSAO, None)
+    if pendentes:
+        for nome in pendentes:
+            resolvedor_adquirentes.invalidar(nome)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_pendentes(sessao, transacao_anterior):
+    if transacao_anterior.parent is None:
+        sessao.info.pop(_CHAVE_SESSAO, None)
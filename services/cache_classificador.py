@@ -1,12 +1,36 @@
 # services/cache_classificador.py
-# Cache LRU para classificação financeira
+# Cache de classificação financeira: LRU em memória + SQLite compartilhado
 
+import atexit
+import json
 import logging
+import os
+import sqlite3
+import tempfile
+import threading
 from collections import OrderedDict
 from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+# ==========================================
+# CONFIGURAÇÕES (sobrescrevíveis por env)
+# ==========================================
+# compartilhado → LRU do processo + SQLite local lido por todos os workers
+# memoria       → só o LRU do processo (comportamento anterior)
+CACHE_BACKEND = os.getenv("CLASSIFICADOR_CACHE", "compartilhado").strip().lower()
+CACHE_CAMINHO = os.getenv(
+    "CLASSIFICADOR_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "nouscard_cache_classificador.db"),
+)
+CACHE_MAX_COMPARTILHADO = int(os.getenv("CLASSIFICADOR_CACHE_MAX", 200000))
+
+
+def _resumo_hits(hits: int, misses: int) -> Dict:
+    total = hits + misses
+    hit_rate = (hits / total * 100) if total > 0 else 0
+    return {"hits": hits, "misses": misses, "hit_rate": f"{hit_rate:.1f}%"}
+
 
 class CacheClassificador:
     """
@@ -14,51 +38,62 @@ class CacheClassificador:
     Evita reclassificar descrições idênticas.
     """
 
+    nome = "memoria"
+
     def __init__(self, max_size: int = 10000):
         self.max_size = max_size
         self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()   # Workers gthread classificam em paralelo
         self._hits = 0
         self._misses = 0
+        self.versao = ""
+
+    def definir_versao(self, versao: str) -> None:
+        """Versão das regras/aliases em uso; ao mudar, as entradas deixam de valer"""
+        if versao != self.versao:
+            self.versao = versao
+            self.clear()
 
     def get(self, chave: str) -> Optional[Dict]:
         """
         Busca no cache.
         Se encontrado, move para o final (LRU).
         """
-        if chave in self._cache:
-            self._cache.move_to_end(chave)
-            self._hits += 1
-            return self._cache[chave]
-        self._misses += 1
-        return None
+        with self._lock:
+            valor = self._cache.get(chave)
+            if valor is not None:
+                self._cache.move_to_end(chave)
+                self._hits += 1
+                return valor
+            self._misses += 1
+            return None
 
     def set(self, chave: str, valor: Dict) -> None:
         """Armazena no cache. Remove o mais antigo se cheio."""
-        if chave in self._cache:
-            self._cache.move_to_end(chave)
-        else:
-            if len(self._cache) >= self.max_size:
-                self._cache.popitem(last=False)  # Remove o mais antigo
-        self._cache[chave] = valor
+        with self._lock:
+            if chave in self._cache:
+                self._cache.move_to_end(chave)
+            else:
+                if len(self._cache) >= self.max_size:
+                    self._cache.popitem(last=False)  # Remove o mais antigo
+            self._cache[chave] = valor
 
     def clear(self) -> None:
         """Limpa o cache."""
-        self._cache.clear()
-        self._hits = 0
-        self._misses = 0
+        with self._lock:
+            self._cache.clear()
+            self._hits = 0
+            self._misses = 0
         logger.info("🧹 Cache limpo")
 
     @property
     def stats(self) -> Dict:
         """Estatísticas do cache."""
-        total = self._hits + self._misses
-        hit_rate = (self._hits / total * 100) if total > 0 else 0
         return {
             "size": len(self._cache),
             "max_size": self.max_size,
-            "hits": self._hits,
-            "misses": self._misses,
-            "hit_rate": f"{hit_rate:.1f}%"
+            **_resumo_hits(self._hits, self._misses),
+            "versao": self.versao,
         }
 
     def __len__(self) -> int:
@@ -68,5 +103,201 @@ class CacheClassificador:
         return chave in self._cache
 
 
+class CacheSQLite:
+    """
+    Cache em SQLite num arquivo local, compartilhado pelos processos do host.
+
+    - Chave = (versão das regras, chave da classificação): trocar as regras
+      não exige limpar nada, as entradas antigas só deixam de ser lidas
+    - INSERT OR REPLACE em modo WAL: escrita atômica, leitores não bloqueiam
+    - Escritas acumuladas e gravadas em lote (uma transação a cada
+      ESCRITAS_POR_LOTE): um commit por classificação custaria mais que
+      classificar de novo
+    - Uma conexão por thread (e por processo, após fork do gunicorn)
+    - Erro de banco vira miss; classificar nunca falha por causa do cache
+    """
+
+    nome = "sqlite"
+    PODA_A_CADA = 1000        # Escritas entre podas (versões antigas + excesso)
+    ESCRITAS_POR_LOTE = 200
+
+    def __init__(self, caminho: str = None, max_size: int = None):
+        self.caminho = caminho or CACHE_CAMINHO
+        self.max_size = max_size or CACHE_MAX_COMPARTILHADO
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._erros = 0
+        self._escritas = 0
+        self._pendentes = []
+        atexit.register(self.gravar_pendentes)
+
+    def _conexao(self) -> sqlite3.Connection:
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is not None and self._local.pid == os.getpid():
+            return conexao
+
+        conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        conexao.execute(
+            "CREATE TABLE IF NOT EXISTS classificacoes ("
+            " versao TEXT NOT NULL, chave TEXT NOT NULL, valor TEXT NOT NULL,"
+            " PRIMARY KEY (versao, chave))"
+        )
+        self._local.conexao = conexao
+        self._local.pid = os.getpid()
+        return conexao
+
+    def _falha(self, operacao: str, erro: Exception) -> None:
+        with self._lock:
+            self._erros += 1
+            primeiro = self._erros == 1
+        if primeiro:
+            logger.warning(f"⚠️ Cache SQLite ({self.caminho}) indisponível no {operacao}: {erro}")
+
+    def get(self, chave: str, versao: str) -> Optional[Dict]:
+        try:
+            linha = self._conexao().execute(
+                "SELECT valor FROM classificacoes WHERE versao = ? AND chave = ?", (versao, chave)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._falha("get", e)
+            linha = None
+
+        with self._lock:
+            if linha is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return json.loads(linha[0])
+
+    def set(self, chave: str, valor: Dict, versao: str) -> None:
+        with self._lock:
+            self._pendentes.append((versao, chave, json.dumps(valor, ensure_ascii=False)))
+            gravar = len(self._pendentes) >= self.ESCRITAS_POR_LOTE
+        if gravar:
+            self.gravar_pendentes()
+
+    def gravar_pendentes(self) -> None:
+        """Grava as escritas acumuladas numa única transação"""
+        with self._lock:
+            lote, self._pendentes = self._pendentes, []
+            if not lote:
+                return
+            self._escritas += len(lote)
+            podar = self._escritas // self.PODA_A_CADA != (self._escritas - len(lote)) // self.PODA_A_CADA
+        try:
+            conexao = self._conexao()
+            with conexao:
+                conexao.execute("BEGIN IMMEDIATE")
+                conexao.executemany(
+                    "INSERT OR REPLACE INTO classificacoes (versao, chave, valor) VALUES (?, ?, ?)", lote
+                )
+                if podar:
+                    self._podar(conexao, lote[-1][0])
+        except sqlite3.Error as e:
+            self._falha("set", e)
+
+    def _podar(self, conexao: sqlite3.Connection, versao: str) -> None:
+        """Remove versões antigas e, acima do limite, as entradas mais antigas"""
+        conexao.execute("DELETE FROM classificacoes WHERE versao != ?", (versao,))
+        excesso = conexao.execute("SELECT COUNT(*) FROM classificacoes").fetchone()[0] - self.max_size
+        if excesso > 0:
+            conexao.execute(
+                "DELETE FROM classificacoes WHERE rowid IN "
+                "(SELECT rowid FROM classificacoes ORDER BY rowid LIMIT ?)", (excesso,)
+            )
+
+    def clear(self) -> None:
+        """Zera as métricas; as entradas valem enquanto a versão das regras for a mesma"""
+        with self._lock:
+            self._pendentes = []
+            self._hits = 0
+            self._misses = 0
+
+    @property
+    def stats(self) -> Dict:
+        return {
+            "caminho": self.caminho,
+            "max_size": self.max_size,
+            "erros": self._erros,
+            "pendentes": len(self._pendentes),
+            **_resumo_hits(self._hits, self._misses),
+        }
+
+
+class CacheClassificadorCompartilhado:
+    """
+    Duas camadas com a mesma interface do CacheClassificador:
+    LRU do processo na frente, SQLite compartilhado atrás.
+
+    Um worker recém-reciclado erra no LRU mas acerta no SQLite (aquecido
+    pelos outros workers), e o resultado sobe para o LRU. A versão das
+    regras entra na chave do SQLite; quando ela muda, o LRU é esvaziado.
+    """
+
+    def __init__(self, memoria: CacheClassificador = None, compartilhado: CacheSQLite = None):
+        self.memoria = memoria or CacheClassificador()
+        self.compartilhado = compartilhado or CacheSQLite()
+        self.versao = ""
+
+    def definir_versao(self, versao: str) -> None:
+        """Versão das regras/aliases em uso (o classificador chama a cada consulta)"""
+        self.versao = versao
+        self.memoria.definir_versao(versao)
+
+    def get(self, chave: str) -> Optional[Dict]:
+        valor = self.memoria.get(chave)
+        if valor is not None:
+            return valor
+        valor = self.compartilhado.get(chave, self.versao)
+        if valor is not None:
+            self.memoria.set(chave, valor)
+        return valor
+
+    def set(self, chave: str, valor: Dict) -> None:
+        self.memoria.set(chave, valor)
+        self.compartilhado.set(chave, valor, self.versao)
+
+    def clear(self) -> None:
+        self.memoria.clear()
+        self.compartilhado.clear()
+
+    @property
+    def max_size(self) -> int:
+        return self.memoria.max_size
+
+    @property
+    def stats(self) -> Dict:
+        """Hit rate combinado (miss = foi preciso classificar) e por backend"""
+        memoria = self.memoria.stats
+        compartilhado = self.compartilhado.stats
+        return {
+            "size": memoria["size"],
+            "max_size": memoria["max_size"],
+            **_resumo_hits(memoria["hits"] + compartilhado["hits"], compartilhado["misses"]),
+            "versao": self.versao,
+            "backends": {
+                self.memoria.nome: memoria,
+                self.compartilhado.nome: compartilhado,
+            },
+        }
+
+    def __len__(self) -> int:
+        return len(self.memoria)
+
+    def __contains__(self, chave: str) -> bool:
+        return chave in self.memoria
+
+
+def criar_cache():
+    """Cache conforme CLASSIFICADOR_CACHE"""
+    if CACHE_BACKEND == "memoria":
+        return CacheClassificador()
+    return CacheClassificadorCompartilhado()
+
+
 # Instância global
-cache = CacheClassificador()
\ No newline at end of file
+cache = criar_cache()
\ No newline at end of file
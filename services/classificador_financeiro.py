@@ -3,7 +3,7 @@
 # Versão 2.0 - Evoluído com cache, score, aliases e JSON
 
 import logging
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from services.regras_financeiras import regras
 from services.aliases_financeiros import aliases
@@ -27,7 +27,8 @@ class ClassificadorFinanceiro:
     - Relatórios Financeiros
 
     Características:
-    - Cache LRU para performance
+    - Cache em dois níveis: análise do texto (cacheada, independe do
+      valor) + decisão por valor/trntype (barata, sempre recalculada)
     - Score de confiança
     - Aliases para normalização
     - Regras em JSON (hot-reload)
@@ -69,19 +70,62 @@ class ClassificadorFinanceiro:
         # 1. Normalizar descrição (aliases)
         descricao_normalizada = self.aliases.normalizar(descricao)
 
-        # 2. Verificar cache
-        chave_cache = f"{descricao_normalizada}|{valor}|{trntype}"
-        cached = self.cache.get(chave_cache)
-        if cached:
-            return cached
+        # 2. Nível 1: candidatos e tipo de pagamento do texto (cache)
+        analise = self._analisar_texto(descricao_normalizada)
 
-        # 3. Classificar
-        resultado = self._classificar_interno(descricao_normalizada, valor, trntype)
+        # 3. Nível 2: natureza pelo valor, score e fallback (sem cache)
+        matches = self._filtrar_por_natureza(analise["candidatos"], valor)
+        return self._decidir(descricao_normalizada, matches, analise["tipo_pagamento"], valor, trntype)
 
-        # 4. Armazenar no cache
-        self.cache.set(chave_cache, resultado)
+    def classificar_lote(
+        self,
+        transacoes: Iterable[Tuple[str, float, Optional[str]]]
+    ) -> List[Dict]:
+        """
+        Classifica várias transações de uma vez (importações, reprocessamentos).
+
+        Cada descrição distinta passa uma única vez pelos aliases e pela
+        análise de texto; a decisão final só depende do sinal do valor e de
+        o trntype ser de crédito, então também é feita uma vez por
+        combinação e copiada para as demais linhas.
+
+        Args:
+            transacoes: (descricao, valor, trntype) por transação
 
-        return resultado
+        Returns:
+            lista de resultados na mesma ordem de `transacoes`, iguais aos
+            de classificar() linha a linha
+        """
+        normalizadas = {}
+        analises = {}
+        decisoes = {}
+        resultados = []
+
+        for descricao, valor, trntype in transacoes:
+            valor = float(valor) if valor else 0.0
+
+            descricao_normalizada = normalizadas.get(descricao)
+            if descricao_normalizada is None:
+                descricao_normalizada = self.aliases.normalizar(descricao)
+                normalizadas[descricao] = descricao_normalizada
+
+            credito = bool(trntype) and "CREDIT" in trntype.upper()
+            chave = (descricao_normalizada, valor > 0, credito)
+            resultado = decisoes.get(chave)
+            if resultado is None:
+                analise = analises.get(descricao_normalizada)
+                if analise is None:
+                    analise = self._analisar_texto(descricao_normalizada)
+                    analises[descricao_normalizada] = analise
+                matches = self._filtrar_por_natureza(analise["candidatos"], valor)
+                resultado = self._decidir(
+                    descricao_normalizada, matches, analise["tipo_pagamento"], valor, trntype
+                )
+                decisoes[chave] = resultado
+
+            resultados.append(dict(resultado))
+
+        return resultados
 
     def classificar_movimento(self, normalizacao) -> Dict:
         """
@@ -103,43 +147,57 @@ class ClassificadorFinanceiro:
     # MÉTODOS PRIVADOS
     # ============================================================
 
-    def _classificar_interno(
+    def _analisar_texto(self, descricao_normalizada: str) -> Dict:
+        """
+        Parte da classificação que só depende do texto, cacheada pela
+        descrição normalizada: "PIX RECEBIDO FULANO" de R$ 10,00 e de
+        R$ 10,01 usam a mesma entrada.
+        """
+        # Entradas valem só para a versão atual das regras
+        self.cache.definir_versao(self.versao_regras)
+        analise = self.cache.get(descricao_normalizada)
+        if analise is not None:
+            return analise
+
+        descricao_upper = descricao_normalizada.upper()
+        analise = {
+            "candidatos": self.regras.buscar_categorias(descricao_upper),
+            "tipo_pagamento": self._classificar_tipo_pagamento(descricao_upper),
+        }
+        self.cache.set(descricao_normalizada, analise)
+        return analise
+
+    def _decidir(
         self,
-        descricao: str,
+        descricao_upper: str,
+        matches: list,
+        tipo_pagamento: str,
         valor: float,
         trntype: Optional[str] = None
     ) -> Dict:
-        """Classificação interna (sem cache)."""
-        descricao_upper = descricao.upper()
-
-        # 1. Coletar todos os matches possíveis
-        matches = self._coletar_matches(descricao_upper, valor)
-
-        # 2. Escolher melhor categoria por score
+        """Escolhe a categoria entre os matches e monta o resultado."""
+        # 1. Escolher melhor categoria por score
         categoria, score = self.scorer.classificar_com_score(
             matches, descricao_upper, valor
         )
 
-        # 3. Fallback se nenhum match
+        # 2. Fallback se nenhum match
         if not categoria:
             categoria = self._fallback(descricao_upper, valor, trntype)
             score = 10
 
-        # 4. Tipo de pagamento
-        tipo_pagamento = self._classificar_tipo_pagamento(descricao_upper)
-
-        # 5. Natureza
+        # 3. Natureza
         natureza = self.regras.get_natureza(categoria)
         if not natureza:
             natureza = "receita" if valor > 0 else "despesa"
 
-        # 6. Grupo e subgrupo
+        # 4. Grupo e subgrupo
         grupo, subgrupo = self.regras.get_grupo_subgrupo(categoria)
 
-        # 7. Centro de custo
+        # 5. Centro de custo
         centro_custo = self.regras.get_centro_custo(categoria)
 
-        # 8. Ícone e cor
+        # 6. Ícone e cor
         icone, cor = self.regras.get_icone_cor(categoria)
 
         return {
@@ -154,40 +212,31 @@ class ClassificadorFinanceiro:
             "score": score
         }
 
-    def _coletar_matches(self, descricao: str, valor: float) -> list:
-        """
-        Coleta todos os matches possíveis por palavra-chave.
-        Separa receitas e despesas baseado no valor.
-        """
+    def _filtrar_por_natureza(self, candidatos: list, valor: float) -> list:
+        """Matches das categorias candidatas com a natureza do valor."""
         matches = []
         natureza_esperada = "receita" if valor > 0 else "despesa"
 
-        for categoria, dados in self.regras.categorias.items():
+        for categoria, palavra in candidatos:
+            dados = self.regras.categorias[categoria]
+
             # Filtrar por natureza (receita/despesa)
             natureza_categoria = dados.get("natureza", "despesa")
             if natureza_categoria != natureza_esperada:
                 continue
 
-            # Buscar palavras que deram match
-            for palavra in dados.get("palavras", []):
-                if palavra.upper() in descricao:
-                    matches.append({
-                        "categoria": categoria,
-                        "palavra": palavra,
-                        "prioridade": dados.get("prioridade", 50),
-                        "natureza": natureza_categoria
-                    })
-                    break  # Uma palavra já basta por categoria
+            matches.append({
+                "categoria": categoria,
+                "palavra": palavra,
+                "prioridade": dados.get("prioridade", 50),
+                "natureza": natureza_categoria
+            })
 
         return matches
 
     def _classificar_tipo_pagamento(self, descricao: str) -> str:
         """Classifica o tipo de pagamento."""
-        for tipo, palavras in self.regras.tipos_pagamento.items():
-            for palavra in palavras:
-                if palavra.upper() in descricao:
-                    return tipo
-        return "outros"
+        return self.regras.buscar_tipo_pagamento(descricao) or "outros"
 
     def _fallback(self, descricao: str, valor: float, trntype: Optional[str] = None) -> str:
         """Fallback quando nenhuma regra específica é encontrada."""
@@ -204,10 +253,16 @@ class ClassificadorFinanceiro:
     # MÉTODOS PÚBLICOS
     # ============================================================
 
+    @property
+    def versao_regras(self) -> str:
+        """Versão das regras + aliases em uso (chave dos caches)."""
+        return f"{self.regras.versao}:{self.aliases.versao}"
+
     def get_stats(self) -> Dict:
         """Retorna estatísticas do classificador."""
         return {
             "cache": self.cache.stats,
+            "versao_regras": self.versao_regras,
             "categorias": len(self.regras.categorias),
             "tipos_pagamento": len(self.regras.tipos_pagamento),
             "aliases": len(self.aliases.aliases)
@@ -224,4 +279,4 @@ class ClassificadorFinanceiro:
 # INSTÂNCIA GLOBAL (SINGLETON)
 # ============================================================
 
-classificador = ClassificadorFinanceiro()
\ No newline at end of file
+classificador = ClassificadorFinanceiro()
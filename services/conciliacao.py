@@ -3,12 +3,17 @@
 #  Compatível com SQLAlchemy 1.4.x + Python 3.11
 # ============================================================
 
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal, InvalidOperation
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case, bindparam
 from sqlalchemy.orm import lazyload
 from sqlalchemy.exc import SQLAlchemyError
-from models import db, MovAdquirente, MovBanco, Conciliacao, LogAuditoria
+from models import db, MovAdquirente, MovBanco, Conciliacao, LogAuditoria, Normalizacao
+from services.job_service import JobInterrompido
+from utils.combinacao_valores import (
+    valor_em_centavos, tolerancia_em_centavos, buscar_combinacao,
+    MAX_CANDIDATAS_DEFAULT, MAX_ESTADOS_DEFAULT, TEMPO_MAX_DEFAULT,
+)
 import logging
 import time
 
@@ -20,6 +25,14 @@ logger = logging.getLogger(__name__)
 TOLERANCIA_CENTAVOS = Decimal("0.02")
 TIMEOUT_SEGUNDOS = 25
 
+# Execução em background (sem timeout, commits por lote)
+TAMANHO_LOTE_BACKGROUND = 500   # Vendas/recebimentos entre commits
+INTERVALO_PROGRESSO = 200       # Itens entre atualizações de progresso
+
+# Gravação em lote das conciliações
+LOTE_GRAVACAO = 1000            # Vínculos acumulados antes de gravar
+TAMANHO_CHUNK_SQL = 1000        # Itens por IN (...) / executemany
+
 # Tolerância de dias por tipo de pagamento
 TOLERANCIA_DIAS_POR_TIPO = {
     'pix': 1,           # PIX: D+0 ou D+1
@@ -151,6 +164,164 @@ def tentar_matching(venda, recebimentos_disponiveis):
     
     return None
 
+# ============================================================
+# ÍNDICE DE RECEBIMENTOS (LOOKUP O(1) POR VENDA)
+# ============================================================
+
+class IndiceRecebimentos:
+    """
+    Índice dos recebimentos disponíveis, montado uma única vez por execução.
+
+    Chaves:
+    - NSU/documento normalizado
+    - valor em centavos (inteiro)
+    - dia do movimento (ordinal)
+
+    A ordem de preferência entre candidatos é a mesma da varredura linear
+    (ordem de iteração do pool de recebimentos), então o resultado de
+    tentar_matching_indexado é idêntico ao de tentar_matching.
+    """
+
+    def __init__(self, recebimentos, ordem_ids=None):
+        """
+        Args:
+            recebimentos: Lista de MovBanco
+            ordem_ids: Iterável de IDs na ordem de preferência (default: ordem da lista)
+        """
+        self.recebimentos_map = {r.id: r for r in recebimentos}
+        ids = list(ordem_ids) if ordem_ids is not None else [r.id for r in recebimentos]
+        self.ordem = {rid: pos for pos, rid in enumerate(ids)}
+        self.disponiveis = set(rid for rid in ids if rid in self.recebimentos_map)
+        self.tolerancia_centavos = tolerancia_em_centavos(TOLERANCIA_CENTAVOS)
+
+        self.por_nsu = {}
+        self.por_centavos = {}
+        self.por_dia = {}
+        self.sem_centavos = []  # Valores fora do padrão → comparação Decimal direta
+
+        for rid in ids:
+            r = self.recebimentos_map.get(rid)
+            if r is None:
+                continue
+
+            nsu = normalizar_nsu(r.documento)
+            if nsu:
+                self.por_nsu.setdefault(nsu, []).append(r)
+
+            centavos = valor_em_centavos(r.valor)
+            if centavos is None:
+                self.sem_centavos.append(r)
+            else:
+                self.por_centavos.setdefault(centavos, []).append(r)
+
+            if r.data_movimento:
+                self.por_dia.setdefault(r.data_movimento.toordinal(), []).append(r)
+
+    def __len__(self):
+        return len(self.disponiveis)
+
+    def remover(self, recebimento_id):
+        """Marca recebimento como usado (não volta a ser candidato)"""
+        self.disponiveis.discard(recebimento_id)
+
+    def listar_disponiveis(self):
+        """Recebimentos ainda disponíveis, na ordem de preferência"""
+        return sorted(
+            (self.recebimentos_map[rid] for rid in self.disponiveis),
+            key=lambda r: self.ordem[r.id]
+        )
+
+    def _primeiro(self, baldes, criterio):
+        """Primeiro recebimento disponível (menor ordem) que atende ao critério"""
+        melhor = None
+        for balde in baldes:
+            for r in balde:
+                if r.id not in self.disponiveis:
+                    continue
+                if melhor is not None and self.ordem[r.id] >= self.ordem[melhor.id]:
+                    break  # Baldes já estão em ordem de preferência
+                if criterio(r):
+                    melhor = r
+                    break
+        return melhor
+
+    def buscar_por_nsu(self, nsu, criterio):
+        return self._primeiro([self.por_nsu.get(nsu, ())], criterio)
+
+    def buscar_por_valor(self, centavos, criterio, tolerancia=0):
+        baldes = [self.por_centavos.get(c, ()) for c in range(centavos - tolerancia, centavos + tolerancia + 1)]
+        baldes.append(self.sem_centavos)
+        return self._primeiro(baldes, criterio)
+
+    def buscar_por_data(self, data, tolerancia_dias, criterio):
+        # Margem de 1 dia: o critério original (datas_compatíveis) faz a validação final
+        base = data.toordinal()
+        baldes = [self.por_dia.get(d, ()) for d in range(base - tolerancia_dias - 1, base + tolerancia_dias + 2)]
+        return self._primeiro(baldes, criterio)
+
+
+def tentar_matching_indexado(venda, indice):
+    """
+    Mesma semântica de tentar_matching, mas consultando o IndiceRecebimentos
+    em vez de varrer todos os recebimentos disponíveis.
+
+    Returns:
+        List[Tuple] ou None
+    """
+    # ✅ PRIORIDADE 1: Match por NSU/documento
+    nsu_venda = normalizar_nsu(venda.nsu)
+    if nsu_venda:
+        r = indice.buscar_por_nsu(
+            nsu_venda,
+            lambda r: valores_compatíveis(r.valor, venda.valor_liquido)
+        )
+        if r:
+            return [(venda, r, Decimal(str(r.valor)))]
+
+    valor_liq = Decimal(str(venda.valor_liquido or 0))
+    data_prevista = venda.data_prevista_pagamento
+    tipo_pagamento = getattr(venda, 'tipo_pagamento', 'cartao')
+
+    # Sem data prevista nenhum critério por data pode casar
+    if not data_prevista:
+        return None
+
+    centavos = valor_em_centavos(valor_liq)
+    if centavos is None:
+        # Valor fora do padrão de centavos: varredura linear original
+        return tentar_matching(venda, indice.listar_disponiveis())
+
+    def data_ok(r):
+        return datas_compatíveis(data_prevista, r.data_movimento, tipo_pagamento)
+
+    # Match exato primeiro (valor igual + data compatível)
+    r = indice.buscar_por_valor(
+        centavos,
+        lambda r: valores_iguais(r.valor, valor_liq) and data_ok(r)
+    )
+    if r:
+        return [(venda, r, valor_liq)]
+
+    # Match com tolerância de centavos
+    r = indice.buscar_por_valor(
+        centavos,
+        lambda r: valores_compatíveis(r.valor, valor_liq) and data_ok(r),
+        tolerancia=indice.tolerancia_centavos
+    )
+    if r:
+        return [(venda, r, Decimal(str(r.valor)))]
+
+    # Match parcial (recebimento menor que venda) - útil para parcelas
+    def parcial_ok(r):
+        valor_rec = Decimal(str(r.valor))
+        return valor_rec < valor_liq and valor_rec > 0 and data_ok(r)
+
+    r = indice.buscar_por_data(data_prevista, get_tolerancia_dias(tipo_pagamento), parcial_ok)
+    if r:
+        return [(venda, r, Decimal(str(r.valor)))]
+
+    return None
+
 # ============================================================
 # MULTIVENDA (VÁRIAS VENDAS → UM RECEBIMENTO)
 # ============================================================
@@ -194,88 +365,286 @@ def tentar_multivenda(recebimento, vendas_disponiveis):
     # Retorna mesmo se não bater exato (match parcial)
     return vinculos if vinculos else None
 
+
+def tentar_multivenda_otima(recebimento, vendas_disponiveis):
+    """
+    Busca o conjunto exato de vendas cuja soma bate com o recebimento
+    (dentro de TOLERANCIA_CENTAVOS), via subset-sum em centavos inteiros.
+    
+    Complementa tentar_multivenda: o greedy deixa passar combinações
+    válidas que não começam pelas maiores vendas.
+    
+    Returns:
+        List[Tuple] de vínculos ou None
+    """
+    alvo = valor_em_centavos(recebimento.valor)
+    if not alvo or alvo <= 0:
+        return None
+    
+    candidatas = []
+    for v in vendas_disponiveis:
+        if not v.valor_liquido or v.valor_liquido <= 0:
+            continue
+        tipo_pagamento = getattr(v, 'tipo_pagamento', 'cartao')
+        if not datas_compatíveis(v.data_prevista_pagamento, recebimento.data_movimento, tipo_pagamento):
+            continue
+        centavos = valor_em_centavos(v.valor_liquido)
+        if centavos is None:
+            continue
+        candidatas.append((v, centavos))
+        if len(candidatas) >= MAX_CANDIDATAS_DEFAULT:
+            break
+    
+    if not candidatas:
+        return None
+    
+    indices = buscar_combinacao(
+        [c for _, c in candidatas],
+        alvo,
+        tolerancia=tolerancia_em_centavos(TOLERANCIA_CENTAVOS),
+        max_estados=MAX_ESTADOS_DEFAULT,
+        tempo_max=TEMPO_MAX_DEFAULT
+    )
+    if not indices:
+        return None
+    
+    return [
+        (candidatas[i][0], recebimento, Decimal(str(candidatas[i][0].valor_liquido)))
+        for i in indices
+    ]
+
+
+def janela_vendas_por_data(vendas, vendas_por_dia, data, dias):
+    """
+    Vendas com data prevista em [data - dias, data + dias], na ordem original da lista.
+    
+    Args:
+        vendas: Lista completa de vendas pendentes
+        vendas_por_dia: Dict ordinal do dia → posições em `vendas`
+        data: Data do recebimento
+        dias: Tamanho da janela (maior tolerância entre os tipos de pagamento)
+    """
+    if not data:
+        return []
+    base = data.toordinal()
+    posicoes = []
+    for d in range(base - dias, base + dias + 1):
+        posicoes.extend(vendas_por_dia.get(d, ()))
+    posicoes.sort()
+    return [vendas[p] for p in posicoes]
+
 # ============================================================
-# SALVAR CONCILIAÇÃO
+# SALVAR CONCILIAÇÃO EM LOTE
 # ============================================================
 
-def registrar_conciliacao(vinculos, empresa_id, usuario_id=None):
+def _chunks(itens, tamanho=TAMANHO_CHUNK_SQL):
+    for i in range(0, len(itens), tamanho):
+        yield itens[i:i + tamanho]
+
+
+def registrar_conciliacoes_em_lote(vinculos, empresa_id, usuario_id=None):
     """
-    Registra conciliações no banco com validação de duplicatas.
+    Registra conciliações no banco, ignorando pares (venda, recebimento)
+    que já têm conciliação, com poucos comandos por lote:
+    
+    1. Pares (venda, recebimento) já existentes: 1 SELECT por chunk de vendas
+    2. Novas Conciliacao: INSERT com executemany
+    3. valor_conciliado/datas: UPDATE com executemany (delta por linha)
+    4. status_conciliacao / conciliado: UPDATE set-based (WHERE id IN ...)
+    
+    Os objetos ORM envolvidos têm os atributos alterados expirados, para
+    que uma leitura posterior busque o valor gravado.
     
     Args:
         vinculos: Lista de tuplas (venda, recebimento, valor)
         empresa_id: ID da empresa
         usuario_id: ID do usuário (para auditoria)
+    
+    Returns:
+        Dict com contagem de linhas por etapa
     """
+    stats = {
+        "vinculos": len(vinculos),
+        "duplicados": 0,
+        "conciliacoes_inseridas": 0,
+        "vendas_atualizadas": 0,
+        "recebimentos_atualizados": 0,
+        "vendas_status_atualizado": 0,
+        "recebimentos_flag_atualizado": 0,
+    }
+    if not vinculos:
+        return stats
+    
+    # 1️⃣ Pares já gravados (em execuções anteriores ou repetidos neste lote)
+    vendas_ids = list({venda.id for venda, _, _ in vinculos})
+    existentes = set()
+    for chunk in _chunks(vendas_ids):
+        existentes.update(
+            db.session.query(Conciliacao.mov_adquirente_id, Conciliacao.mov_banco_id)
+            .filter(
+                Conciliacao.empresa_id == empresa_id,
+                Conciliacao.mov_adquirente_id.in_(chunk)
+            )
+        )
+    
+    novos = []
     for venda, recebimento, valor in vinculos:
-        
-        # Verificar se já existe conciliação para este par
-        conc_existente = Conciliacao.query.filter_by(
-            empresa_id=empresa_id,  
-            mov_adquirente_id=venda.id,
-            mov_banco_id=recebimento.id
-        ).first()
-        
-        if conc_existente:
+        par = (venda.id, recebimento.id)
+        if par in existentes:
+            stats["duplicados"] += 1
             continue
-        
-        try:
-            # Criar registro de conciliação
-            conc = Conciliacao(
-                empresa_id=empresa_id,
-                mov_adquirente_id=venda.id,
-                mov_banco_id=recebimento.id,
-                valor_previsto=venda.valor_liquido,
-                valor_conciliado=valor,
-                tipo="automatico",
-                status="conciliado"
-            )
-            
-            db.session.add(conc)
-            
-            # Atualizar venda
-            venda.valor_conciliado = (Decimal(str(venda.valor_conciliado or 0)) + valor)
-            venda.data_primeiro_recebimento = venda.data_primeiro_recebimento or recebimento.data_movimento
-            venda.data_ultimo_recebimento = recebimento.data_movimento
-            
-            valor_liq = Decimal(str(venda.valor_liquido or 0))
-            if venda.valor_conciliado >= valor_liq:
-                venda.status_conciliacao = "conciliado"
-            elif venda.valor_conciliado > 0:
-                venda.status_conciliacao = "parcial"
-            
-            # Atualizar recebimento
-            recebimento.valor_conciliado = (Decimal(str(recebimento.valor_conciliado or 0)) + valor)
-            recebimento.conciliado = recebimento.valor_conciliado >= Decimal(str(recebimento.valor or 0))
-            
-            logger.info(f"✅ Conciliação: venda={venda.id} ({venda.tipo_pagamento}), recebimento={recebimento.id}, valor={valor}")
-            
-        except Exception as e:
-            logger.error(f"❌ Erro ao registrar conciliação: {str(e)}")
-            continue  # Continua com os próximos vínculos
+        existentes.add(par)
+        novos.append((venda, recebimento, valor))
+    
+    if not novos:
+        return stats
+    
+    # 2️⃣ INSERT das conciliações (executemany)
+    linhas = [
+        {
+            "empresa_id": empresa_id,
+            "mov_adquirente_id": venda.id,
+            "mov_banco_id": recebimento.id,
+            "valor_previsto": venda.valor_liquido,
+            "valor_conciliado": valor,
+            "tipo": "automatico",
+            "status": "conciliado",
+        }
+        for venda, recebimento, valor in novos
+    ]
+    for chunk in _chunks(linhas):
+        db.session.execute(Conciliacao.__table__.insert(), chunk)
+    stats["conciliacoes_inseridas"] = len(linhas)
+    
+    # Agregar por venda/recebimento (mesma ordem do laço original:
+    # primeira data fica em data_primeiro_recebimento, última em data_ultimo)
+    por_venda = {}
+    por_recebimento = {}
+    objetos_venda = {}
+    objetos_recebimento = {}
+    for venda, recebimento, valor in novos:
+        data = recebimento.data_movimento
+        if venda.id in por_venda:
+            agg = por_venda[venda.id]
+            agg["b_delta"] += valor
+            agg["b_ultima"] = data
+            if agg["b_primeira"] is None:
+                agg["b_primeira"] = data
+        else:
+            por_venda[venda.id] = {"b_id": venda.id, "b_delta": valor, "b_primeira": data, "b_ultima": data}
+        por_recebimento.setdefault(recebimento.id, {"b_id": recebimento.id, "b_delta": Decimal("0")})
+        por_recebimento[recebimento.id]["b_delta"] += valor
+        objetos_venda[venda.id] = venda
+        objetos_recebimento[recebimento.id] = recebimento
+    
+    # 3️⃣ Acumular valor_conciliado (executemany, delta por linha)
+    t_venda = MovAdquirente.__table__
+    t_banco = MovBanco.__table__
+    
+    upd_venda = (
+        t_venda.update()
+        .where(t_venda.c.id == bindparam("b_id"))
+        .values(
+            valor_conciliado=func.coalesce(t_venda.c.valor_conciliado, 0) + bindparam("b_delta"),
+            data_primeiro_recebimento=func.coalesce(t_venda.c.data_primeiro_recebimento, bindparam("b_primeira")),
+            data_ultimo_recebimento=bindparam("b_ultima"),
+        )
+    )
+    upd_banco = (
+        t_banco.update()
+        .where(t_banco.c.id == bindparam("b_id"))
+        .values(valor_conciliado=func.coalesce(t_banco.c.valor_conciliado, 0) + bindparam("b_delta"))
+    )
+    
+    params_venda = list(por_venda.values())
+    params_banco = list(por_recebimento.values())
+    for chunk in _chunks(params_venda):
+        db.session.execute(upd_venda, chunk)
+    for chunk in _chunks(params_banco):
+        db.session.execute(upd_banco, chunk)
+    stats["vendas_atualizadas"] = len(params_venda)
+    stats["recebimentos_atualizados"] = len(params_banco)
+    
+    # 4️⃣ Flags (set-based)
+    for chunk in _chunks(list(por_venda)):
+        r = db.session.execute(
+            t_venda.update()
+            .where(t_venda.c.id.in_(chunk), t_venda.c.valor_conciliado > 0)
+            .values(status_conciliacao=case(
+                (t_venda.c.valor_conciliado >= t_venda.c.valor_liquido, "conciliado"),
+                else_="parcial"
+            ))
+        )
+        stats["vendas_status_atualizado"] += max(r.rowcount or 0, 0)
+    
+    for chunk in _chunks(list(por_recebimento)):
+        r = db.session.execute(
+            t_banco.update()
+            .where(t_banco.c.id.in_(chunk))
+            .values(conciliado=t_banco.c.valor_conciliado >= t_banco.c.valor)
+        )
+        stats["recebimentos_flag_atualizado"] += max(r.rowcount or 0, 0)
+    
+    # Objetos carregados na sessão agora estão defasados em relação ao banco
+    for venda in objetos_venda.values():
+        db.session.expire(venda, ["valor_conciliado", "status_conciliacao",
+                                  "data_primeiro_recebimento", "data_ultimo_recebimento"])
+    for recebimento in objetos_recebimento.values():
+        db.session.expire(recebimento, ["valor_conciliado", "conciliado"])
+    
+    logger.info(
+        f"✅ Conciliações gravadas em lote: empresa={empresa_id}, "
+        f"inseridas={stats['conciliacoes_inseridas']}, duplicadas={stats['duplicados']}, "
+        f"vendas={stats['vendas_atualizadas']}, recebimentos={stats['recebimentos_atualizados']}"
+    )
+    return stats
+
+# ============================================================
+# PROGRESSO
+# ============================================================
+
+def _reportar_progresso(progresso, fase, processados, total, resultado):
+    """Chama o callback de progresso sem deixar falhas dele abortarem a conciliação"""
+    if not progresso:
+        return
+    try:
+        progresso(fase, processados, total, dict(resultado))
+    except JobInterrompido:
+        raise
+    except Exception as e:
+        logger.warning(f"⚠️ Falha ao reportar progresso (não crítico): {str(e)}")
 
 # ============================================================
 # FUNÇÃO PRINCIPAL
 # ============================================================
 
-def executar_conciliacao(empresa_id, usuario_id=None, tipo_pagamento=None):
+def executar_conciliacao(empresa_id, usuario_id=None, tipo_pagamento=None,
+                         timeout=TIMEOUT_SEGUNDOS, progresso=None, tamanho_lote=None,
+                         filtro_vendas=None, filtro_recebimentos=None):
     """
     Executa conciliação automática para uma empresa.
     
     ✅ NOVO: Suporte a filtro por tipo_pagamento (pix/cartao/boleto)
+    ✅ NOVO: Execução em background (timeout=None + progresso + tamanho_lote)
     
     Fluxo:
     1. Carrega vendas pendentes e recebimentos não conciliados
     2. Tenta match por NSU/documento (prioridade máxima)
-    3. Tenta match individual por valor/data
-    4. Tenta match multivenda (várias vendas → um recebimento)
-    5. Salva conciliações e atualiza status
+    3. Tenta match individual por valor/data (via IndiceRecebimentos)
+    4. Tenta match multivenda (greedy; se não fechar, combinação exata)
+    5. Salva conciliações e atualiza status (em lote: INSERT/UPDATE set-based)
     6. Retorna estatísticas do processamento
     
     Args:
         empresa_id: ID da empresa para conciliar
         usuario_id: ID do usuário (opcional, para auditoria)
         tipo_pagamento: Opcional - filtra apenas vendas deste tipo ('pix', 'cartao', etc.)
+        timeout: Segundos até parar com resultado parcial (None = sem limite)
+        progresso: Callback opcional (fase, processados, total, resultado_parcial)
+        tamanho_lote: Se informado, faz commit a cada N itens (progresso durável;
+            uma nova execução continua de onde a anterior parou)
+        filtro_vendas / filtro_recebimentos: Critérios SQLAlchemy extras que
+            restringem o conjunto carregado (usado pela conciliação incremental)
     
     Returns:
         Dict com estatísticas da conciliação
@@ -284,6 +653,16 @@ def executar_conciliacao(empresa_id, usuario_id=None, tipo_pagamento=None):
     inicio = time.time()
     logger.info(f"Iniciando conciliação: empresa={empresa_id}, tipo_pagamento={tipo_pagamento or 'todos'}")
     
+    def estourou_tempo():
+        return timeout is not None and time.time() - inicio > timeout
+    
+    # Commits intermediários não devem expirar os objetos já carregados
+    # (evita um SELECT por venda/recebimento após cada lote)
+    sessao = db.session()
+    expire_original = sessao.expire_on_commit
+    if tamanho_lote:
+        sessao.expire_on_commit = False
+    
     try:
         # ✅ Query base para vendas pendentes
         query_vendas = MovAdquirente.query.filter_by(
@@ -295,16 +674,17 @@ def executar_conciliacao(empresa_id, usuario_id=None, tipo_pagamento=None):
         # ✅ Filtrar por tipo_pagamento se especificado
         if tipo_pagamento and tipo_pagamento != 'todos':
             query_vendas = query_vendas.filter(MovAdquirente.tipo_pagamento == tipo_pagamento)
+        if filtro_vendas is not None:
+            query_vendas = query_vendas.filter(filtro_vendas)
         
         vendas = list(query_vendas)
         
         # Recebimentos não conciliados
-        recebimentos = list(
-            MovBanco.query
-            .filter_by(empresa_id=empresa_id, conciliado=False)
-            .options(lazyload('*'))
-            .yield_per(1000)
-        )
+        query_recebimentos = MovBanco.query.filter_by(empresa_id=empresa_id, conciliado=False)
+        if filtro_recebimentos is not None:
+            query_recebimentos = query_recebimentos.filter(filtro_recebimentos)
+        
+        recebimentos = list(query_recebimentos.options(lazyload('*')).yield_per(1000))
         
         logger.info(f"Carregados: {len(vendas)} vendas pendentes, {len(recebimentos)} recebimentos disponíveis")
         
@@ -312,36 +692,66 @@ def executar_conciliacao(empresa_id, usuario_id=None, tipo_pagamento=None):
         recebimentos_disponiveis = set(r.id for r in recebimentos)
         recebimentos_map = {r.id: r for r in recebimentos}
         
+        # ✅ Índice montado uma vez (NSU / centavos / dia), mesma ordem do pool
+        indice = IndiceRecebimentos(recebimentos, ordem_ids=recebimentos_disponiveis)
+        
         resultado = {
             "conciliados": 0,
             "parciais": 0,
             "multivendas": 0,
+            "multivendas_otimizadas": 0,  # ✅ Depósitos resolvidos só pela busca exata
             "nao_conciliados": 0,
             "creditos_sem_origem": 0,
-            "por_tipo": {}  # ✅ Detalhamento por tipo de pagamento
+            "por_tipo": {},  # ✅ Detalhamento por tipo de pagamento
+            "persistencia": {}  # ✅ Linhas gravadas por fase (gravação em lote)
         }
         
+        # Vínculos aguardando gravação em lote + vendas já vinculadas nesta execução
+        buffer_vinculos = []
+        vendas_vinculadas = set()
+        
+        def gravar_vinculos(fase):
+            if not buffer_vinculos:
+                return
+            stats = registrar_conciliacoes_em_lote(buffer_vinculos, empresa_id, usuario_id)
+            acumulado = resultado["persistencia"].setdefault(fase, {})
+            for chave, valor in stats.items():
+                acumulado[chave] = acumulado.get(chave, 0) + valor
+            buffer_vinculos.clear()
+        
+        def acumular_vinculos(vinculos, fase):
+            buffer_vinculos.extend(vinculos)
+            vendas_vinculadas.update(v.id for v, _, _ in vinculos)
+            if len(buffer_vinculos) >= LOTE_GRAVACAO:
+                gravar_vinculos(fase)
+        
+        _reportar_progresso(progresso, "matching", 0, len(vendas), resultado)
+        
         # ============================================================
         # FASE 1: MATCH POR NSU/DOCUMENTO + INDIVIDUAL
         # ============================================================
-        for venda in vendas:
+        for pos, venda in enumerate(vendas, 1):
             # Timeout check
-            if time.time() - inicio > TIMEOUT_SEGUNDOS:
+            if estourou_tempo():
                 logger.warning("⚠️ Timeout na conciliação. Processamento parcial.")
                 break
             
-            # Filtrar recebimentos disponíveis
-            recebs_disp = [recebimentos_map[rid] for rid in recebimentos_disponiveis if rid in recebimentos_map]
+            if tamanho_lote and pos % tamanho_lote == 0:
+                gravar_vinculos("matching")
+                db.session.commit()
+            if pos % INTERVALO_PROGRESSO == 0:
+                _reportar_progresso(progresso, "matching", pos, len(vendas), resultado)
             
-            # ✅ Tenta match por NSU primeiro (mais confiável)
-            vinculos = tentar_matching(venda, recebs_disp)
+            # ✅ Tenta match por NSU primeiro (mais confiável), via índice
+            vinculos = tentar_matching_indexado(venda, indice)
             
             if vinculos:
-                registrar_conciliacao(vinculos, empresa_id, usuario_id)
+                acumular_vinculos(vinculos, "matching")
                 
                 # Remover recebimentos usados do pool
                 for _, r, _ in vinculos:
                     recebimentos_disponiveis.discard(r.id)
+                    indice.remover(r.id)
                 
                 total = sum(v[2] for v in vinculos)
                 valor_liq = Decimal(str(venda.valor_liquido or 0))
@@ -358,6 +768,9 @@ def executar_conciliacao(empresa_id, usuario_id=None, tipo_pagamento=None):
                     resultado["parciais"] += 1
                     resultado['por_tipo'][tipo]["parciais"] += 1
         
+        # Fase 2 recarrega do banco: grava o que a fase 1 acumulou
+        gravar_vinculos("matching")
+        
         # ============================================================
         # FASE 2: MULTIVENDA
         # ============================================================
@@ -370,29 +783,64 @@ def executar_conciliacao(empresa_id, usuario_id=None, tipo_pagamento=None):
         
         if tipo_pagamento and tipo_pagamento != 'todos':
             pend_vendas_query = pend_vendas_query.filter(MovAdquirente.tipo_pagamento == tipo_pagamento)
+        if filtro_vendas is not None:
+            pend_vendas_query = pend_vendas_query.filter(filtro_vendas)
         
         pend_vendas = list(pend_vendas_query.yield_per(1000))
         pend_receb_ids = recebimentos_disponiveis.copy()
         
-        for rid in list(pend_receb_ids):
-            if time.time() - inicio > TIMEOUT_SEGUNDOS:
+        # ✅ Vendas indexadas por data prevista: cada recebimento só olha a sua janela
+        vendas_por_dia = {}
+        for pos, v in enumerate(pend_vendas):
+            if v.data_prevista_pagamento:
+                vendas_por_dia.setdefault(v.data_prevista_pagamento.toordinal(), []).append(pos)
+        janela_dias = max(TOLERANCIA_DIAS_POR_TIPO.values()) + 1
+        
+        _reportar_progresso(progresso, "multivenda", 0, len(pend_receb_ids), resultado)
+        
+        for pos, rid in enumerate(list(pend_receb_ids), 1):
+            if estourou_tempo():
                 break
             
+            if tamanho_lote and pos % tamanho_lote == 0:
+                gravar_vinculos("multivenda")
+                db.session.commit()
+            if pos % INTERVALO_PROGRESSO == 0:
+                _reportar_progresso(progresso, "multivenda", pos, len(pend_receb_ids), resultado)
+            
             r = recebimentos_map.get(rid)
             if not r:
                 continue
             
-            vinculos = tentar_multivenda(r, pend_vendas)
+            # Vendas já vinculadas a outro depósito nesta execução ficam de fora
+            candidatas = [
+                v for v in janela_vendas_por_data(pend_vendas, vendas_por_dia, r.data_movimento, janela_dias)
+                if v.id not in vendas_vinculadas
+            ]
+            
+            vinculos = tentar_multivenda(r, candidatas)
+            
+            # Greedy não fechou o valor → busca combinação exata
+            if not vinculos or not valores_iguais(sum(v[2] for v in vinculos), r.valor):
+                vinculos_otimos = tentar_multivenda_otima(r, candidatas)
+                if vinculos_otimos:
+                    vinculos = vinculos_otimos
+                    resultado["multivendas_otimizadas"] += 1
+            
             if vinculos:
-                registrar_conciliacao(vinculos, empresa_id, usuario_id)
+                acumular_vinculos(vinculos, "multivenda")
                 resultado["multivendas"] += 1
                 
                 for _, rec, _ in vinculos:
                     recebimentos_disponiveis.discard(rec.id)
         
-        # Commit único (transação)
+        gravar_vinculos("multivenda")
+        
+        # Commit final (único, se não houver tamanho_lote)
         db.session.commit()
         
+        _reportar_progresso(progresso, "finalizando", 0, 0, resultado)
+        
         # ============================================================
         # CONTAGEM FINAL
         # ============================================================
@@ -428,3 +876,213 @@ def executar_conciliacao(empresa_id, usuario_id=None, tipo_pagamento=None):
         db.session.rollback()
         logger.error(f"❌ Erro desconhecido na conciliação: empresa={empresa_id}, erro={str(e)}")
         raise
+    finally:
+        sessao.expire_on_commit = expire_original
+
+
+# ============================================================
+# CONCILIAÇÃO INCREMENTAL (SÓ O LOTE RECÉM-IMPORTADO)
+# ============================================================
+
+def _janela_datas(coluna, inicio, fim, dias):
+    """Critério coluna BETWEEN [inicio - dias, fim + dias] (ou None se não há datas)"""
+    if not inicio or not fim:
+        return None
+    return coluna.between(inicio - timedelta(days=dias), fim + timedelta(days=dias))
+
+
+def _valores_nsu(valores):
+    """Valores brutos + normalizados, para IN contra nsu/documento"""
+    chaves = set()
+    for v in valores:
+        if v:
+            chaves.add(str(v).strip())
+            chaves.add(normalizar_nsu(v))
+    chaves.discard("")
+    return list(chaves)
+
+
+def executar_conciliacao_incremental(empresa_id, arquivo_id=None, normalizacao_ids=None,
+                                     usuario_id=None, tipo_pagamento=None, timeout=TIMEOUT_SEGUNDOS):
+    """
+    Concilia apenas o lote recém-importado contra o conjunto em aberto.
+    
+    Em vez de recarregar todas as vendas pendentes e todos os recebimentos em
+    aberto da empresa, carrega:
+    - as vendas/recebimentos do(s) arquivo(s) do lote (arquivo_origem)
+    - os recebimentos em aberto cuja data cai na janela das novas vendas
+      (maior tolerância de TOLERANCIA_DIAS_POR_TIPO) ou cujo documento bate
+      com o NSU de alguma venda nova
+    - as vendas pendentes na janela dos novos recebimentos (ou com NSU igual
+      ao documento deles), além das vizinhas das novas vendas (multivenda)
+    
+    O matching em si é o mesmo de executar_conciliacao.
+    
+    Args:
+        empresa_id: ID da empresa
+        arquivo_id: ID do ArquivoImportado recém-processado
+        normalizacao_ids: Alternativa: IDs de Normalizacao do lote
+        usuario_id: ID do usuário (auditoria)
+        tipo_pagamento: Filtro opcional por tipo de pagamento
+        timeout: Segundos até parar com resultado parcial (None = sem limite)
+    
+    Returns:
+        Dict com estatísticas (mesmo formato de executar_conciliacao + escopo)
+    """
+    arquivo_ids = set()
+    if arquivo_id:
+        arquivo_ids.add(arquivo_id)
+    if normalizacao_ids:
+        arquivo_ids.update(
+            a for (a,) in db.session.query(Normalizacao.arquivo_origem_id)
+            .filter(
+                Normalizacao.empresa_id == empresa_id,
+                Normalizacao.id.in_(list(normalizacao_ids)),
+                Normalizacao.arquivo_origem_id.isnot(None)
+            )
+            .distinct()
+        )
+    
+    if not arquivo_ids:
+        raise ValueError("Informe arquivo_id ou normalizacao_ids para a conciliação incremental")
+    
+    origens = [str(a) for a in arquivo_ids]
+    dias = max(TOLERANCIA_DIAS_POR_TIPO.values())
+    
+    # Extremos de data + chaves NSU do lote (uma query agregada + uma de chaves por lado)
+    vendas_min, vendas_max = db.session.query(
+        func.min(MovAdquirente.data_prevista_pagamento),
+        func.max(MovAdquirente.data_prevista_pagamento)
+    ).filter(
+        MovAdquirente.empresa_id == empresa_id,
+        MovAdquirente.arquivo_origem.in_(origens),
+        MovAdquirente.status_conciliacao == "pendente",
+        MovAdquirente.ativo == True
+    ).one()
+    
+    receb_min, receb_max = db.session.query(
+        func.min(MovBanco.data_movimento),
+        func.max(MovBanco.data_movimento)
+    ).filter(
+        MovBanco.empresa_id == empresa_id,
+        MovBanco.arquivo_origem.in_(origens),
+        MovBanco.conciliado == False
+    ).one()
+    
+    if not vendas_min and not receb_min:
+        logger.info(f"Conciliação incremental: nada em aberto no lote, empresa={empresa_id}, arquivos={origens}")
+        return {
+            "conciliados": 0,
+            "parciais": 0,
+            "multivendas": 0,
+            "multivendas_otimizadas": 0,
+            "nao_conciliados": 0,
+            "creditos_sem_origem": 0,
+            "por_tipo": {},
+            "incremental": True,
+            "arquivos": origens,
+        }
+    
+    nsus_novos = _valores_nsu(
+        n for (n,) in db.session.query(MovAdquirente.nsu).filter(
+            MovAdquirente.empresa_id == empresa_id,
+            MovAdquirente.arquivo_origem.in_(origens),
+            MovAdquirente.status_conciliacao == "pendente",
+            MovAdquirente.nsu.isnot(None)
+        )
+    )
+    documentos_novos = _valores_nsu(
+        d for (d,) in db.session.query(MovBanco.documento).filter(
+            MovBanco.empresa_id == empresa_id,
+            MovBanco.arquivo_origem.in_(origens),
+            MovBanco.conciliado == False,
+            MovBanco.documento.isnot(None)
+        )
+    )
+    
+    criterios_vendas = [
+        MovAdquirente.arquivo_origem.in_(origens),
+        _janela_datas(MovAdquirente.data_prevista_pagamento, receb_min, receb_max, dias),
+        # Vizinhas das novas vendas: podem fechar um depósito junto com elas
+        _janela_datas(MovAdquirente.data_prevista_pagamento, vendas_min, vendas_max, 2 * dias),
+    ]
+    if documentos_novos:
+        criterios_vendas.append(MovAdquirente.nsu.in_(documentos_novos))
+    
+    criterios_recebimentos = [
+        MovBanco.arquivo_origem.in_(origens),
+        _janela_datas(MovBanco.data_movimento, vendas_min, vendas_max, dias),
+    ]
+    if nsus_novos:
+        criterios_recebimentos.append(MovBanco.documento.in_(nsus_novos))
+    
+    resultado = executar_conciliacao(
+        empresa_id=empresa_id,
+        usuario_id=usuario_id,
+        tipo_pagamento=tipo_pagamento,
+        timeout=timeout,
+        filtro_vendas=or_(*[c for c in criterios_vendas if c is not None]),
+        filtro_recebimentos=or_(*[c for c in criterios_recebimentos if c is not None]),
+    )
+    resultado["incremental"] = True
+    resultado["arquivos"] = origens
+    return resultado
+
+
+# ============================================================
+# EXECUÇÃO EM BACKGROUND
+# ============================================================
+
+def iniciar_conciliacao_em_background(empresa_id, usuario_id=None, tipo_pagamento=None, ip=None):
+    """
+    Enfileira a conciliação em background e retorna o job (dict).
+    
+    Se já existe um job ativo para a empresa, retorna esse job em vez de
+    iniciar outro (duas conciliações simultâneas disputariam os mesmos registros).
+    """
+    from services.job_service import reservar_job, submeter_job, registrar_progresso
+    
+    # Verificação e criação atômicas (trava por empresa): duas requisições
+    # simultâneas recebem o mesmo job
+    job, criado = reservar_job(
+        "conciliacao",
+        empresa_id,
+        usuario_id,
+        params={"tipo_pagamento": tipo_pagamento or "todos"}
+    )
+    if not criado:
+        logger.info(f"♻️ Conciliação já em andamento: empresa={empresa_id}, job={job['id']}")
+        return job
+    
+    def _executar(job_id):
+        def progresso(fase, processados, total, parcial):
+            registrar_progresso(job_id, fase, processados, total, parcial=parcial)
+        
+        resultado = executar_conciliacao(
+            empresa_id=empresa_id,
+            usuario_id=usuario_id,
+            tipo_pagamento=tipo_pagamento,
+            timeout=None,
+            progresso=progresso,
+            tamanho_lote=TAMANHO_LOTE_BACKGROUND
+        )
+        
+        # Log de auditoria (isolado para não afetar o resultado)
+        try:
+            log = LogAuditoria(
+                usuario_id=usuario_id,
+                empresa_id=empresa_id,
+                acao="conciliacao_executada",
+                detalhes=f"Conciliados: {resultado.get('conciliados', 0)}, Parciais: {resultado.get('parciais', 0)}, Multivendas: {resultado.get('multivendas', 0)}, tipo={tipo_pagamento or 'todos'}, job={job_id}",
+                ip=ip,
+                criado_em=datetime.now(timezone.utc)
+            )
+            db.session.add(log)
+            db.session.commit()
+        except Exception as log_err:
+            logger.warning(f"Erro ao logar auditoria (não crítico): {str(log_err)}")
+            db.session.rollback()
+        
+        return resultado
+    
+    return submeter_job(job, _executar)
@@ -0,0 +1,235 @@
+# services/conteudo_importado.py
+# Formato de armazenamento do conteúdo importado: blocos comprimidos e
+# criptografados de forma independente (ArquivoImportado.conteudo_json)
+
+import base64
+import json
+import logging
+import os
+import zlib
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from models import db, ArquivoImportado
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CONFIGURAÇÕES (sobrescrevíveis por env)
+# ==========================================
+REGISTROS_POR_BLOCO = int(os.getenv("IMPORT_BLOCO_REGISTROS", 500))
+NIVEL_COMPRESSAO = int(os.getenv("IMPORT_NIVEL_COMPRESSAO", 6))
+
+# ==========================================
+# LAYOUT
+# ==========================================
+# NCZ1:<tamanho do cabeçalho, 8 dígitos>:<cabeçalho JSON><bloco 0><bloco 1>...
+#
+# O cabeçalho (em claro: só contagens e posições) diz onde começa cada bloco,
+# relativo ao fim do cabeçalho, e traz o resumo de valores do arquivo
+# codificado como um bloco (criptografado), para a página de detalhes não
+# precisar ler todos os registros. Cada bloco é o JSON de até
+# REGISTROS_POR_BLOCO registros, comprimido com zlib e então criptografado
+# com Fernet (ou só em base64, sem ENCRYPTION_KEY). Tudo é ASCII, então
+# posição em caracteres = posição em bytes e um SUBSTR no banco traz um
+# bloco sem ler o resto da coluna.
+PREFIXO = "NCZ1:"
+_DIGITOS_CABECALHO = 8
+_INICIO_CABECALHO = len(PREFIXO) + _DIGITOS_CABECALHO + 1
+
+
+def eh_empacotado(conteudo):
+    """True se o conteúdo está no formato em blocos"""
+    return isinstance(conteudo, str) and conteudo.startswith(PREFIXO)
+
+
+# ============================================================
+# ESCRITA
+# ============================================================
+
+def resumir_registros(registros):
+    """Totais de entradas/saídas, por categoria e por tipo de pagamento"""
+    total_entradas = Decimal("0")
+    total_saidas = Decimal("0")
+    categorias = {}
+    tipos_pagamento = {}
+    for reg in registros:
+        try:
+            valor = Decimal(str(reg.get("valor", 0)))
+        except Exception:
+            continue
+        if valor > 0:
+            total_entradas += valor
+        else:
+            total_saidas += abs(valor)
+        cat = reg.get("categoria", "outros")
+        categorias[cat] = categorias.get(cat, Decimal("0")) + valor
+        tipo = reg.get("tipo_pagamento", "outros")
+        tipos_pagamento[tipo] = tipos_pagamento.get(tipo, Decimal("0")) + valor
+    return {
+        "total_entradas": total_entradas,
+        "total_saidas": total_saidas,
+        "categorias": categorias,
+        "tipos_pagamento": tipos_pagamento,
+    }
+
+
+def _resumo_para_json(resumo):
+    return {
+        "total_entradas": str(resumo["total_entradas"]),
+        "total_saidas": str(resumo["total_saidas"]),
+        # Chaves podem ser None (registro sem categoria); JSON só aceita texto
+        "categorias": [[k, str(v)] for k, v in resumo["categorias"].items()],
+        "tipos_pagamento": [[k, str(v)] for k, v in resumo["tipos_pagamento"].items()],
+    }
+
+
+def _resumo_de_json(dados):
+    return {
+        "total_entradas": Decimal(dados["total_entradas"]),
+        "total_saidas": Decimal(dados["total_saidas"]),
+        "categorias": {k: Decimal(v) for k, v in dados["categorias"]},
+        "tipos_pagamento": {k: Decimal(v) for k, v in dados["tipos_pagamento"]},
+    }
+
+
+def _codificar_bloco(registros, fernet):
+    bruto = json.dumps(registros, ensure_ascii=False, default=str, separators=(",", ":")).encode("utf-8")
+    comprimido = zlib.compress(bruto, NIVEL_COMPRESSAO)
+    if fernet is not None:
+        return fernet.encrypt(comprimido).decode("ascii")
+    return base64.urlsafe_b64encode(comprimido).decode("ascii")
+
+
+def empacotar(registros, fernet=None, por_bloco=None):
+    """
+    Serializa os registros no formato em blocos.
+    fernet=None grava só comprimido (mesmo comportamento de "sem chave" do legado).
+    """
+    por_bloco = max(1, por_bloco or REGISTROS_POR_BLOCO)
+    blocos = []
+    indice = []
+    posicao = 0
+    for inicio in range(0, len(registros), por_bloco):
+        parte = registros[inicio:inicio + por_bloco]
+        codificado = _codificar_bloco(parte, fernet)
+        indice.append([posicao, len(codificado), len(parte)])
+        blocos.append(codificado)
+        posicao += len(codificado)
+
+    cabecalho = json.dumps({
+        "v": 1,
+        "total": len(registros),
+        "por_bloco": por_bloco,
+        "compressao": "zlib",
+        "cripto": "fernet" if fernet is not None else "nenhuma",
+        "blocos": indice,
+        "resumo": _codificar_bloco(_resumo_para_json(resumir_registros(registros)), fernet),
+    }, separators=(",", ":"))
+
+    return f"{PREFIXO}{len(cabecalho):0{_DIGITOS_CABECALHO}d}:{cabecalho}" + "".join(blocos)
+
+
+# ============================================================
+# LEITURA (conteúdo já em memória)
+# ============================================================
+
+def _tamanho_cabecalho(prefixo):
+    if not eh_empacotado(prefixo) or len(prefixo) < _INICIO_CABECALHO:
+        raise ValueError("Conteúdo não está no formato em blocos")
+    return int(prefixo[len(PREFIXO):len(PREFIXO) + _DIGITOS_CABECALHO])
+
+
+def ler_cabecalho(conteudo):
+    """Cabeçalho do conteúdo, com 'inicio_blocos' (posição 0-based do bloco 0)"""
+    tamanho = _tamanho_cabecalho(conteudo)
+    cabecalho = json.loads(conteudo[_INICIO_CABECALHO:_INICIO_CABECALHO + tamanho])
+    cabecalho["inicio_blocos"] = _INICIO_CABECALHO + tamanho
+    return cabecalho
+
+
+def decodificar_bloco(texto, cabecalho, fernet=None):
+    """Registros de um bloco (texto exatamente como gravado)"""
+    if cabecalho.get("cripto") == "fernet":
+        if fernet is None:
+            raise ValueError("Conteúdo criptografado e ENCRYPTION_KEY indisponível")
+        comprimido = fernet.decrypt(texto.encode("ascii"))
+    else:
+        comprimido = base64.urlsafe_b64decode(texto.encode("ascii"))
+    return json.loads(zlib.decompress(comprimido).decode("utf-8"))
+
+
+def ler_bloco(conteudo, cabecalho, indice, fernet=None):
+    """Registros do bloco `indice` a partir do conteúdo completo"""
+    posicao, tamanho, _ = cabecalho["blocos"][indice]
+    inicio = cabecalho["inicio_blocos"] + posicao
+    return decodificar_bloco(conteudo[inicio:inicio + tamanho], cabecalho, fernet)
+
+
+def ler_resumo(cabecalho, fernet=None):
+    """Resumo de valores gravado no cabeçalho (None se o cabeçalho não tem)"""
+    if not cabecalho.get("resumo"):
+        return None
+    return _resumo_de_json(decodificar_bloco(cabecalho["resumo"], cabecalho, fernet))
+
+
+def desempacotar(conteudo, fernet=None):
+    """Todos os registros, bloco a bloco"""
+    cabecalho = ler_cabecalho(conteudo)
+    registros = []
+    for indice in range(len(cabecalho["blocos"])):
+        registros.extend(ler_bloco(conteudo, cabecalho, indice, fernet))
+    return registros
+
+
+# ============================================================
+# LEITURA DIRETO DO BANCO (só o trecho necessário da coluna)
+# ============================================================
+
+def _substr(arquivo_id, empresa_id, inicio, tamanho):
+    """Trecho de conteudo_json (inicio 0-based) sem carregar a coluna inteira"""
+    return db.session.query(
+        func.substr(ArquivoImportado.conteudo_json, inicio + 1, tamanho)
+    ).filter(
+        ArquivoImportado.id == arquivo_id,
+        ArquivoImportado.empresa_id == empresa_id,
+    ).scalar()
+
+
+def carregar_cabecalho(arquivo_id, empresa_id):
+    """
+    Cabeçalho do conteúdo de um arquivo (duas leituras curtas).
+    None se o arquivo não existe, está vazio ou usa um formato antigo.
+    """
+    prefixo = _substr(arquivo_id, empresa_id, 0, _INICIO_CABECALHO)
+    if not eh_empacotado(prefixo):
+        return None
+    tamanho = _tamanho_cabecalho(prefixo)
+    cabecalho = json.loads(_substr(arquivo_id, empresa_id, _INICIO_CABECALHO, tamanho))
+    cabecalho["inicio_blocos"] = _INICIO_CABECALHO + tamanho
+    return cabecalho
+
+
+def carregar_bloco(arquivo_id, empresa_id, cabecalho, indice, fernet=None):
+    """Registros do bloco `indice` lendo só os bytes dele no banco"""
+    posicao, tamanho, _ = cabecalho["blocos"][indice]
+    texto = _substr(arquivo_id, empresa_id, cabecalho["inicio_blocos"] + posicao, tamanho)
+    return decodificar_bloco(texto, cabecalho, fernet)
+
+
+def carregar_registros(arquivo_id, empresa_id, cabecalho, inicio, fim, fernet=None):
+    """
+    Registros [inicio, fim) decodificando só os blocos que cobrem o intervalo.
+    """
+    registros = []
+    primeiro_do_bloco = 0
+    for indice, (_, _, quantidade) in enumerate(cabecalho["blocos"]):
+        ultimo_do_bloco = primeiro_do_bloco + quantidade
+        if primeiro_do_bloco >= fim:
+            break
+        if ultimo_do_bloco > inicio:
+            bloco = carregar_bloco(arquivo_id, empresa_id, cabecalho, indice, fernet)
+            registros.extend(bloco[max(0, inicio - primeiro_do_bloco):fim - primeiro_do_bloco])
+        primeiro_do_bloco = ultimo_do_bloco
+    return registros
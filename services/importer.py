@@ -3,30 +3,47 @@
 
 import hashlib
 import logging
+import os
+import re
+import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 from io import BytesIO
 
+from flask import current_app
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
 from utils.parsers import (
-    parse_csv_generic,
-    parse_excel_generic,
-    parse_ofx_generic,
+    iterar_csv_generic,
+    iterar_excel_generic,
+    iterar_ofx_generic,
     parse_flow_csv,
     is_flow_csv,
     extrair_dados_conta_ofx,
-    dividir_ofx_em_partes,
-    dividir_csv_em_partes,
 )
+from utils.telemetria_importacao import resumir_resultado, definir_sinal_de_vida
 
 from services.importer_db import salvar_arquivo_importado, verificar_arquivo_duplicado
 from services.importer_normalizacao import ImportadorNormalizado
+from models import db
 
 logger = logging.getLogger(__name__)
 
 MAX_FILE_SIZE = 10 * 1024 * 1024
 MAX_TOTAL_SIZE = 50 * 1024 * 1024
 MAX_REGISTROS_POR_ARQUIVO = 10000
-MAX_TRANSACOES_POR_LOTE = 50
-PAUSA_ENTRE_PARTES = 0.5
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", 4))     # Arquivos processados em paralelo por processo
+
+_executor_upload = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="nouscard-upload")
+_locks_empresa = {}
+_locks_empresa_guarda = threading.Lock()
+
+_OFX_INICIO_TRANSACOES = re.compile(rb"<BANKTRANLIST>", re.IGNORECASE)
+
+FASES_FINAIS_ARQUIVO = ("concluido", "erro")
 
 
 def process_file(file_storage, default_empresa_id=None):
@@ -50,12 +67,17 @@ def process_file(file_storage, default_empresa_id=None):
     logger.info(f"🧪 [IMPORTER] size_kb={size / 1024:.2f}, hash={hash_arquivo}")
 
     dados_conta = None
-    dividido_automaticamente = False
-    total_transacoes_original = None
-    num_partes = None
     registros = []
     tipo = "desconhecido"
 
+    # Os parsers leem do conteúdo já em memória (usado no hash), em uma única
+    # passada: sem dividir o arquivo em partes, reserializar ou pausar.
+    # Os registros ficam numa lista (não vão do iterador direto para a
+    # normalização) porque o arquivo inteiro é usado antes dela: o tipo é
+    # identificado pelo conteúdo, o conteúdo criptografado de
+    # arquivo_importado é gravado primeiro (a normalização referencia o
+    # arquivo_id) e o resumo do upload soma todos os valores. A memória fica
+    # limitada por MAX_FILE_SIZE e MAX_REGISTROS_POR_ARQUIVO.
     try:
         sample = (
             conteudo[:1024].decode("utf-8", errors="ignore")
@@ -71,73 +93,29 @@ def process_file(file_storage, default_empresa_id=None):
 
         elif nome.endswith(".csv") or nome.endswith(".txt"):
             logger.info("📄 [IMPORTER] Detectado CSV/TXT genérico")
-            content_text = conteudo.decode("utf-8", errors="replace")
-            total_linhas = content_text.count("\n")
-            logger.info(f"🧪 [IMPORTER] total_linhas_csv={total_linhas}")
-
-            if total_linhas > MAX_TRANSACOES_POR_LOTE:
-                dividido_automaticamente = True
-                total_transacoes_original = total_linhas
-                partes = dividir_csv_em_partes(content_text, MAX_TRANSACOES_POR_LOTE)
-                num_partes = len(partes)
-                todos_registros = []
-
-                for i, parte in enumerate(partes, 1):
-                    logger.info(f"📄 [IMPORTER] CSV parte {i}/{num_partes}")
-                    stream = BytesIO(parte.encode("utf-8"))
-                    regs = parse_csv_generic(stream, f"{nome}_parte_{i}")
-                    logger.info(f"🧪 [IMPORTER] CSV parte {i} registros={len(regs)}")
-                    todos_registros.extend(regs)
-                    if i < num_partes:
-                        time.sleep(PAUSA_ENTRE_PARTES)
-
-                registros = todos_registros
-            else:
-                file_storage.seek(0)
-                registros = parse_csv_generic(file_storage)
-
+            registros = list(iterar_csv_generic(BytesIO(conteudo), nome, max_linhas=MAX_REGISTROS_POR_ARQUIVO))
             tipo = identificar_tipo_por_conteudo(registros, nome)
 
         elif nome.endswith(".xlsx") or nome.endswith(".xls"):
             logger.info("📊 [IMPORTER] Detectado Excel")
-            file_storage.seek(0)
-            registros = parse_excel_generic(file_storage)
+            registros = list(iterar_excel_generic(BytesIO(conteudo), nome, max_linhas=MAX_REGISTROS_POR_ARQUIVO))
             tipo = identificar_tipo_por_conteudo(registros, nome)
 
         elif nome.endswith(".ofx"):
             logger.info("🏦 [IMPORTER] Detectado OFX")
-            content_text = conteudo.decode("utf-8", errors="replace")
 
+            # Dados da conta ficam antes da lista de transações
+            inicio_transacoes = _OFX_INICIO_TRANSACOES.search(conteudo)
+            cabecalho = conteudo[:inicio_transacoes.start()] if inicio_transacoes else conteudo
             try:
-                dados_conta = extrair_dados_conta_ofx(content_text) or {}
+                dados_conta = extrair_dados_conta_ofx(cabecalho.decode("utf-8", errors="replace")) or {}
                 logger.info(f"🧪 [IMPORTER] dados_conta_extraidos={dados_conta}")
             except Exception as e:
                 dados_conta = {}
                 logger.error(f"❌ [IMPORTER] erro_extraindo_dados_conta={str(e)}", exc_info=True)
 
-            total_transacoes_original = content_text.upper().count("<STMTTRN>")
-            logger.info(f"🧪 [IMPORTER] total_transacoes_ofx={total_transacoes_original}")
-
-            if total_transacoes_original > MAX_TRANSACOES_POR_LOTE:
-                dividido_automaticamente = True
-                partes = dividir_ofx_em_partes(content_text, MAX_TRANSACOES_POR_LOTE)
-                num_partes = len(partes)
-                todos_registros = []
-
-                for i, parte in enumerate(partes, 1):
-                    logger.info(f"📄 [IMPORTER] OFX parte {i}/{num_partes}")
-                    stream = BytesIO(parte.encode("utf-8"))
-                    regs = parse_ofx_generic(stream, f"{nome}_parte_{i}")
-                    logger.info(f"🧪 [IMPORTER] OFX parte {i} registros={len(regs)}")
-                    todos_registros.extend(regs)
-                    if i < num_partes:
-                        time.sleep(PAUSA_ENTRE_PARTES)
-
-                registros = todos_registros
-            else:
-                file_storage.seek(0)
-                registros = parse_ofx_generic(file_storage)
-
+            registros = list(iterar_ofx_generic(BytesIO(conteudo), nome))
+            logger.info(f"🧪 [IMPORTER] total_transacoes_ofx={len(registros)}")
             tipo = "recebimento"
 
         else:
@@ -160,9 +138,6 @@ def process_file(file_storage, default_empresa_id=None):
         "hash": hash_arquivo,
         "linhas": len(registros),
         "dados_conta": dados_conta,
-        "dividido_automaticamente": dividido_automaticamente,
-        "total_transacoes_original": total_transacoes_original,
-        "num_partes": num_partes,
     }
 
     resultado = corrigir_tipo_arquivo(resultado, nome)
@@ -182,113 +157,343 @@ def process_file(file_storage, default_empresa_id=None):
     return resultado
 
 
-def process_uploaded_files(files, empresa_id, usuario_id):
+def process_uploaded_files(files, empresa_id, usuario_id, progresso=None, sinal_de_vida=None):
+    """
+    Processa os arquivos de um upload em paralelo (pool limitado de threads).
+
+    Cada arquivo roda o pipeline completo numa thread do pool, com app
+    context e sessão de banco próprios. A leitura/parse (a parte pesada e
+    independente) corre em paralelo; a persistência (duplicidade por hash,
+    arquivo_importado, normalização e tabelas finais) é serializada por
+    empresa, porque a detecção de duplicatas entre arquivos depende da ordem.
+    O retorno mantém a ordem dos arquivos e traz os tempos de cada um.
+
+    `progresso(indice, fase, **campos)`, se informado, é chamado a cada
+    etapa de cada arquivo (indice = posição do arquivo em `files`).
+    `sinal_de_vida()`, se informado, é chamado a cada lote de normalização e
+    persistência (ver utils.telemetria_importacao.definir_sinal_de_vida).
+    """
     inicio_total = time.time()
-    resultados = []
 
     logger.info("🚀 [UPLOAD] INÍCIO UPLOAD NORMALIZADO")
-    logger.info(f"🧪 [UPLOAD] usuario_id={usuario_id}, empresa_id={empresa_id}, arquivos={len(files)}")
+    logger.info(
+        f"🧪 [UPLOAD] usuario_id={usuario_id}, empresa_id={empresa_id}, "
+        f"arquivos={len(files)}, workers={UPLOAD_WORKERS}"
+    )
 
-    for i, file_storage in enumerate(files, 1):
-        inicio_arquivo = time.time()
-        nome = file_storage.filename.lower()
+    app = current_app._get_current_object()
+    futuros = [
+        _executor_upload.submit(
+            _processar_upload, app, file_storage, i, len(files), empresa_id, usuario_id,
+            time.time(), progresso, sinal_de_vida
+        )
+        for i, file_storage in enumerate(files, 1)
+    ]
+    resultados = [futuro.result() for futuro in futuros]
+
+    logger.info(f"🏁 [UPLOAD] FIM tempo_total={time.time() - inicio_total:.2f}s resultados={resultados}")
+    return resultados
+
+
+def _lock_empresa(empresa_id):
+    with _locks_empresa_guarda:
+        return _locks_empresa.setdefault(empresa_id, threading.Lock())
 
-        logger.info(f"📄 [UPLOAD] ARQUIVO {i}/{len(files)}: {nome}")
 
+def _processar_upload(app, file_storage, i, total, empresa_id, usuario_id, submetido_em, progresso=None,
+                      sinal_de_vida=None):
+    """Roda numa thread do pool: app context e sessão próprios"""
+    tempos = {"fila": round(time.time() - submetido_em, 3)}
+    inicio_arquivo = time.time()
+    nome = file_storage.filename.lower()
+
+    def avisar(fase, **campos):
+        if progresso is None:
+            return
+        try:
+            progresso(i - 1, fase, **campos)
+        except Exception as e:
+            logger.warning(f"⚠️ [UPLOAD] Falha ao registrar progresso de {nome}: {str(e)}")
+
+    with app.app_context():
+        definir_sinal_de_vida(sinal_de_vida)
         try:
-            resultado = process_file(file_storage, default_empresa_id=empresa_id)
-
-            logger.info("🧪 [UPLOAD] RESULTADO PROCESS_FILE")
-            logger.info(f"🧪 arquivo={nome}")
-            logger.info(f"🧪 resultado={resultado}")
-
-            if not resultado.get("ok"):
-                logger.error(f"❌ [UPLOAD] Falha no parse: {resultado.get('erro')}")
-                resultados.append(resultado)
-                continue
-
-            resultado = corrigir_tipo_arquivo(resultado, nome)
-
-            if resultado.get("tipo") in [None, "", "desconhecido"]:
-                logger.error(f"❌ [UPLOAD] Tipo não identificado: {nome}")
-                resultados.append({
-                    "ok": False,
-                    "arquivo": nome,
-                    "erro": "Tipo de arquivo não identificado",
-                })
-                continue
-
-            logger.info("🔍 [UPLOAD] Verificando duplicidade")
-            if verificar_arquivo_duplicado(empresa_id, resultado["hash"]):
-                logger.warning(f"⚠️ [UPLOAD] Arquivo duplicado: {nome}, hash={resultado['hash']}")
-                resultados.append({
-                    "ok": False,
-                    "arquivo": nome,
-                    "erro": "Arquivo já importado anteriormente",
-                })
-                continue
-
-            logger.info("💾 [UPLOAD] Salvando arquivo_importado")
-            arquivo_id = salvar_arquivo_importado(
-                empresa_id=empresa_id,
-                usuario_id=usuario_id,
-                nome_arquivo=nome,
-                tipo=resultado["tipo"],
-                hash_arquivo=resultado["hash"],
-                registros=resultado["registros"],
+            resultado = _processar_arquivo_upload(
+                file_storage, nome, i, total, empresa_id, usuario_id, tempos, avisar
             )
+        except Exception as e:
+            logger.error(f"❌ [UPLOAD] Erro inesperado em {nome}: {str(e)}", exc_info=True)
+            db.session.rollback()
+            resultado = {
+                "ok": False,
+                "arquivo": nome,
+                "erro": f"Erro interno: {str(e)}",
+            }
+        finally:
+            definir_sinal_de_vida(None)
+            db.session.remove()
 
-            logger.info(f"🧪 [UPLOAD] ARQUIVO SALVO: arquivo_id={arquivo_id}, tipo={resultado.get('tipo')}")
+        tempos["total"] = round(time.time() - inicio_arquivo, 3)
+        resultado["tempos"] = tempos
+        logger.info(f"⏱️ [UPLOAD] {nome}: tempos={tempos}")
 
-            tipo_origem = _determinar_tipo_origem(resultado, nome)
+        avisar("concluido" if resultado.get("ok") else "erro", tempos=tempos, **_contadores_upload(resultado))
 
-            logger.info("🔄 [UPLOAD] Normalizando")
-            logger.info(f"🧪 arquivo_id={arquivo_id}, tipo_origem={tipo_origem}, tipo_movimento={resultado['tipo']}")
+    return resultado
 
-            importador = ImportadorNormalizado(empresa_id, usuario_id)
 
-            stats_normalizacao = importador.importar_arquivo(
-                arquivo_id=arquivo_id,
-                registros=resultado["registros"],
-                tipo_origem=tipo_origem,
-                tipo_movimento=resultado["tipo"],
-            )
+def _contadores_upload(resultado):
+    """Linhas, duplicados e erros de um arquivo, a partir das stats de cada etapa"""
+    normalizacao = resultado.get("stats_normalizacao") or {}
+    final = resultado.get("stats_final") or {}
+    vendas = final.get("vendas") or {}
+    recebimentos = final.get("recebimentos") or {}
+    return {
+        "linhas": resultado.get("linhas", 0),
+        "duplicados": normalizacao.get("duplicados", 0) + vendas.get("duplicados", 0),
+        "erros": (
+            normalizacao.get("falhas", 0)
+            + vendas.get("falhas", 0)
+            + recebimentos.get("falhas", 0)
+            + recebimentos.get("invalidos", 0)
+        ),
+        "erro": resultado.get("erro"),
+    }
 
-            logger.info(f"🧪 [UPLOAD] STATS NORMALIZACAO: {stats_normalizacao}")
 
-            logger.info("🔄 [UPLOAD] Processando para tabelas finais")
-            from services.processador_normalizacao import processar_normalizacoes
+def _processar_arquivo_upload(file_storage, nome, i, total, empresa_id, usuario_id, tempos, avisar):
+    logger.info(f"📄 [UPLOAD] ARQUIVO {i}/{total}: {nome}")
+    avisar("lendo")
 
-            stats_final = processar_normalizacoes(
-                empresa_id,
-                arquivo_id,
-                dados_conta=resultado.get("dados_conta"),
-            )
+    inicio = time.time()
+    resultado = process_file(file_storage, default_empresa_id=empresa_id)
+    tempos["parse"] = round(time.time() - inicio, 3)
 
-            logger.info(f"🧪 [UPLOAD] STATS FINAL COMPLETO: {stats_final}")
+    logger.info("🧪 [UPLOAD] RESULTADO PROCESS_FILE")
+    logger.info(f"🧪 arquivo={nome}")
+    logger.info(f"🧪 resultado={resumir_resultado(resultado)}")
 
-            resultados.append({
-                "ok": True,
-                "arquivo": nome,
-                "tipo": resultado["tipo"],
-                "linhas": resultado["linhas"],
-                "dados_conta": resultado.get("dados_conta"),
-                "stats_normalizacao": stats_normalizacao,
-                "stats_final": stats_final,
-            })
+    if not resultado.get("ok"):
+        logger.error(f"❌ [UPLOAD] Falha no parse: {resultado.get('erro')}")
+        return resultado
 
-            logger.info(f"✅ [UPLOAD] ARQUIVO CONCLUÍDO: {nome}, tempo={time.time() - inicio_arquivo:.2f}s")
+    resultado = corrigir_tipo_arquivo(resultado, nome)
 
-        except Exception as e:
-            logger.error(f"❌ [UPLOAD] Erro inesperado em {nome}: {str(e)}", exc_info=True)
-            resultados.append({
-                "ok": False,
-                "arquivo": nome,
-                "erro": f"Erro interno: {str(e)}",
-            })
+    if resultado.get("tipo") in [None, "", "desconhecido"]:
+        logger.error(f"❌ [UPLOAD] Tipo não identificado: {nome}")
+        return {
+            "ok": False,
+            "arquivo": nome,
+            "erro": "Tipo de arquivo não identificado",
+        }
+
+    avisar("aguardando", linhas=resultado.get("linhas", 0))
+
+    # Daqui em diante a ordem importa (hash/NSU já importados por outro
+    # arquivo da mesma empresa): um arquivo por vez por empresa
+    inicio = time.time()
+    with _lock_empresa(empresa_id):
+        tempos["espera_empresa"] = round(time.time() - inicio, 3)
+        inicio = time.time()
+        try:
+            return _persistir_upload(resultado, nome, empresa_id, usuario_id, avisar)
+        finally:
+            tempos["persistencia"] = round(time.time() - inicio, 3)
+
+
+def _persistir_upload(resultado, nome, empresa_id, usuario_id, avisar):
+    avisar("verificando_duplicidade")
+    logger.info("🔍 [UPLOAD] Verificando duplicidade")
+    if verificar_arquivo_duplicado(empresa_id, resultado["hash"]):
+        logger.warning(f"⚠️ [UPLOAD] Arquivo duplicado: {nome}, hash={resultado['hash']}")
+        return {
+            "ok": False,
+            "arquivo": nome,
+            "erro": "Arquivo já importado anteriormente",
+        }
+
+    avisar("salvando")
+    logger.info("💾 [UPLOAD] Salvando arquivo_importado")
+    arquivo_id = salvar_arquivo_importado(
+        empresa_id=empresa_id,
+        usuario_id=usuario_id,
+        nome_arquivo=nome,
+        tipo=resultado["tipo"],
+        hash_arquivo=resultado["hash"],
+        registros=resultado["registros"],
+    )
 
-    logger.info(f"🏁 [UPLOAD] FIM tempo_total={time.time() - inicio_total:.2f}s resultados={resultados}")
-    return resultados
+    logger.info(f"🧪 [UPLOAD] ARQUIVO SALVO: arquivo_id={arquivo_id}, tipo={resultado.get('tipo')}")
+
+    tipo_origem = _determinar_tipo_origem(resultado, nome)
+
+    avisar("normalizando", arquivo_id=arquivo_id)
+    logger.info("🔄 [UPLOAD] Normalizando")
+    logger.info(f"🧪 arquivo_id={arquivo_id}, tipo_origem={tipo_origem}, tipo_movimento={resultado['tipo']}")
+
+    importador = ImportadorNormalizado(empresa_id, usuario_id)
+
+    stats_normalizacao = importador.importar_arquivo(
+        arquivo_id=arquivo_id,
+        registros=resultado["registros"],
+        tipo_origem=tipo_origem,
+        tipo_movimento=resultado["tipo"],
+    )
+
+    logger.info(f"🧪 [UPLOAD] STATS NORMALIZACAO: {stats_normalizacao}")
+
+    avisar(
+        "processando",
+        duplicados=stats_normalizacao.get("duplicados", 0),
+        erros=stats_normalizacao.get("falhas", 0),
+    )
+    logger.info("🔄 [UPLOAD] Processando para tabelas finais")
+    from services.processador_normalizacao import processar_normalizacoes
+
+    stats_final = processar_normalizacoes(
+        empresa_id,
+        arquivo_id,
+        dados_conta=resultado.get("dados_conta"),
+    )
+
+    logger.info(f"🧪 [UPLOAD] STATS FINAL COMPLETO: {stats_final}")
+    logger.info(f"✅ [UPLOAD] ARQUIVO CONCLUÍDO: {nome}")
+
+    return {
+        "ok": True,
+        "arquivo": nome,
+        "tipo": resultado["tipo"],
+        "linhas": resultado["linhas"],
+        "dados_conta": resultado.get("dados_conta"),
+        "stats_normalizacao": stats_normalizacao,
+        "stats_final": stats_final,
+    }
+
+
+def resumir_upload(resultados):
+    """Resumo do upload (o mesmo para a resposta síncrona e para o job)"""
+    arquivos_sucesso = [r for r in resultados if r.get("ok")]
+    total_valor_vendas = Decimal("0")
+    total_valor_recebimentos = Decimal("0")
+
+    for r in arquivos_sucesso:
+        if r.get("tipo") == "venda":
+            for reg in r.get("registros", []):
+                try:
+                    total_valor_vendas += Decimal(str(reg.get("valor_bruto") or reg.get("valor") or 0))
+                except Exception:
+                    pass
+        elif r.get("tipo") == "recebimento":
+            for reg in r.get("registros", []):
+                try:
+                    total_valor_recebimentos += Decimal(str(reg.get("valor") or 0))
+                except Exception:
+                    pass
+
+    return {
+        "total_arquivos": len(arquivos_sucesso),
+        "qtde_vendas": sum(r.get("linhas", 0) for r in arquivos_sucesso if r.get("tipo") == "venda"),
+        "qtde_recebimentos": sum(r.get("linhas", 0) for r in arquivos_sucesso if r.get("tipo") == "recebimento"),
+        "total_vendas": str(total_valor_vendas),
+        "total_recebimentos": str(total_valor_recebimentos),
+        "result": resultados,
+    }
+
+
+# ============================================================
+# IMPORTAÇÃO EM BACKGROUND (job + polling)
+# ============================================================
+
+def _pasta_importacoes():
+    pasta = os.path.join(current_app.config.get("UPLOAD_FOLDER", "uploads"), "importacoes")
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def _limpar_importacoes_antigas():
+    """Remove arquivos de jobs que não terminaram (worker reiniciado no meio)"""
+    from services.job_service import JOB_RETENCAO_SEGUNDOS
+
+    pasta = _pasta_importacoes()
+    limite = time.time() - JOB_RETENCAO_SEGUNDOS
+    for nome in os.listdir(pasta):
+        caminho = os.path.join(pasta, nome)
+        try:
+            if os.path.getmtime(caminho) < limite:
+                shutil.rmtree(caminho, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def iniciar_importacao_em_background(files, empresa_id, usuario_id):
+    """
+    Grava os arquivos no disco local e enfileira a importação como job.
+
+    Retorna o job na hora; o andamento de cada arquivo (fase, linhas,
+    duplicados, erros) fica em job['arquivos'] e é lido por polling.
+    Os arquivos gravados são apagados ao fim do job.
+    """
+    from services.job_service import (
+        criar_job, submeter_job, atualizar_job, atualizar_item_job, registrar_progresso, sinal_de_vida
+    )
+
+    _limpar_importacoes_antigas()
+
+    nomes = [f.filename for f in files]
+    job = criar_job(
+        "importacao",
+        empresa_id,
+        usuario_id,
+        params={"arquivos": [n.lower() for n in nomes]},
+        total=len(files),
+        arquivos=[
+            {"arquivo": n.lower(), "fase": "na_fila", "linhas": 0, "duplicados": 0, "erros": 0, "erro": None}
+            for n in nomes
+        ],
+    )
+
+    pasta = os.path.join(_pasta_importacoes(), job["id"])
+    caminhos = []
+    try:
+        os.makedirs(pasta, exist_ok=True)
+        for i, file_storage in enumerate(files):
+            caminho = os.path.join(pasta, f"{i:03d}_{secure_filename(file_storage.filename) or 'arquivo'}")
+            file_storage.save(caminho)
+            caminhos.append(caminho)
+    except Exception as e:
+        shutil.rmtree(pasta, ignore_errors=True)
+        atualizar_job(job["id"], status="erro", fase="erro", erro=f"Falha ao gravar arquivos: {str(e)}")
+        raise
+
+    logger.info(f"📥 [UPLOAD] {len(files)} arquivo(s) gravados para o job {job['id']}")
+
+    def _executar(job_id):
+        trava = threading.Lock()
+        concluidos = [0]
+
+        def progresso(indice, fase, **campos):
+            atualizar_item_job(job_id, "arquivos", indice, fase=fase, **campos)
+            if fase in FASES_FINAIS_ARQUIVO:
+                with trava:
+                    concluidos[0] += 1
+                    registrar_progresso(job_id, "importando", concluidos[0], len(caminhos))
+
+        registrar_progresso(job_id, "importando", 0, len(caminhos))
+
+        streams = [open(caminho, "rb") for caminho in caminhos]
+        try:
+            arquivos = [FileStorage(stream=stream, filename=nome) for stream, nome in zip(streams, nomes)]
+            resultados = process_uploaded_files(
+                arquivos, empresa_id, usuario_id, progresso=progresso, sinal_de_vida=sinal_de_vida(job_id)
+            )
+        finally:
+            for stream in streams:
+                stream.close()
+            shutil.rmtree(pasta, ignore_errors=True)
+
+        return resumir_upload(resultados)
+
+    return submeter_job(job, _executar)
 
 
 def corrigir_tipo_arquivo(resultado, nome_arquivo):
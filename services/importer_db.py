@@ -1,13 +1,19 @@
 # services/importer_db.py - VERSÃO CORRIGIDA COM SUPORTE FLOW + PIX + DATAS
 
-from models import db, ArquivoImportado, LogAuditoria, MovAdquirente, MovBanco, Adquirente
+from models import db, ArquivoImportado, LogAuditoria, MovAdquirente, MovBanco
 from datetime import datetime, timezone, date
 from decimal import Decimal, InvalidOperation
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 import logging
 import os
 import json
-from cryptography.fernet import Fernet
+from sqlalchemy.orm import defer
+
+from utils.chaves_criptografia import gerenciador_chaves
+from services.conteudo_importado import (
+    empacotar, desempacotar, eh_empacotado, carregar_cabecalho, carregar_registros,
+    ler_resumo, resumir_registros,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -15,25 +21,14 @@ logger = logging.getLogger(__name__)
 # CRIPTOGRAFIA - VERSÃO COM LOGS DETALHADOS
 # ============================================================
 def criptografar_conteudo(registros):
-    """Criptografa registros JSON antes de salvar"""
+    """
+    Comprime e criptografa os registros em blocos independentes
+    (formato NCZ1, ver services/conteudo_importado.py)
+    """
     try:
-        encryption_key = os.getenv("ENCRYPTION_KEY")
-        
-        if not encryption_key:
-            logger.warning("⚠️ ENCRYPTION_KEY não configurada, salvando sem criptografia (JSON puro)")
-            return json.dumps(registros, ensure_ascii=False, default=str)
-        
-        # ✅ CORREÇÃO: Remover aspas extras que podem vir do Render/Heroku
-        encryption_key = encryption_key.strip().strip('"').strip("'")
-        
-        if len(encryption_key) < 32:
-            logger.error(f"❌ ENCRYPTION_KEY muito curta ({len(encryption_key)} chars), precisa de 32+ caracteres")
-            return json.dumps(registros, ensure_ascii=False, default=str)
-        
-        f = Fernet(encryption_key.encode())
-        conteudo = json.dumps(registros, ensure_ascii=False, default=str)
-        encrypted = f.encrypt(conteudo.encode()).decode()
-        logger.debug(f"✅ Conteúdo criptografado: {len(conteudo)} bytes → {len(encrypted)} bytes")
+        f = gerenciador_chaves.fernet()
+        encrypted = empacotar(registros, fernet=f)
+        logger.debug(f"✅ Conteúdo empacotado: {len(registros)} registros → {len(encrypted)} bytes")
         return encrypted
         
     except Exception as e:
@@ -58,21 +53,20 @@ def descriptografar_conteudo(conteudo_criptografado):
             return []
     
     try:
-        encryption_key = os.getenv("ENCRYPTION_KEY")
-        
-        if not encryption_key:
-            logger.error("❌ ENCRYPTION_KEY não configurada, não é possível descriptografar")
-            return []
+        # ✅ Formato em blocos (comprimido, criptografado por bloco)
+        if eh_empacotado(conteudo_criptografado):
+            registros = desempacotar(conteudo_criptografado, fernet=gerenciador_chaves.fernet())
+            logger.debug(f"✅ Conteúdo desempacotado: {len(registros)} registros")
+            return registros
         
-        # ✅ CORREÇÃO: Remover aspas extras
-        encryption_key = encryption_key.strip().strip('"').strip("'")
+        # Legado: um único token Fernet com o JSON inteiro (MultiFernet lê
+        # tokens de qualquer chave configurada, atual ou antiga)
+        f = gerenciador_chaves.fernet()
         
-        if len(encryption_key) < 32:
-            logger.error(f"❌ ENCRYPTION_KEY inválida ({len(encryption_key)} chars), precisa de 32+")
+        if f is None:
+            logger.error("❌ ENCRYPTION_KEY ausente ou inválida, não é possível descriptografar")
             return []
         
-        f = Fernet(encryption_key.encode())
-        
         # Tentar descriptografar
         decrypted_bytes = f.decrypt(conteudo_criptografado.encode())
         conteudo = decrypted_bytes.decode('utf-8')
@@ -99,6 +93,7 @@ def descriptografar_conteudo(conteudo_criptografado):
             logger.warning("⚠️ Fallback JSON puro também falhou")
             return []
 
+
 # ============================================================
 # UTILITÁRIOS DE CONVERSÃO
 # ============================================================
@@ -158,20 +153,12 @@ def resolver_adquirente_id(valor, empresa_id=None):
     if isinstance(valor, str) and valor.strip().isdigit():
         return int(valor.strip())
     
-    # Se for nome (string), busca no banco
+    # Se for nome (string), resolve pelo cache (exato, depois parcial)
     if isinstance(valor, str):
-        nome_normalizado = valor.strip().lower()
-        adquirente = Adquirente.query.filter(
-            db.func.lower(Adquirente.nome) == nome_normalizado
-        ).first()
-        if adquirente:
-            return adquirente.id
-        # Tenta match parcial
-        adquirente = Adquirente.query.filter(
-            db.func.lower(Adquirente.nome).contains(nome_normalizado)
-        ).first()
-        if adquirente:
-            return adquirente.id
+        from services.cache_adquirentes import resolvedor_adquirentes
+        adquirente_id = resolvedor_adquirentes.resolver_parcial(valor)
+        if adquirente_id:
+            return adquirente_id
         logger.warning(f"⚠️ Adquirente não encontrada: '{valor}'")
     
     return None
@@ -277,7 +264,9 @@ def listar_arquivos_importados(empresa_id: int, page=1, per_page=50):
     """Lista arquivos com paginação - usando getattr para segurança"""
     
     try:
+        # conteudo_json fica fora do SELECT: a listagem não precisa dele
         pagination = ArquivoImportado.query.filter_by(empresa_id=empresa_id, ativo=True)\
+            .options(defer(ArquivoImportado.conteudo_json))\
             .order_by(ArquivoImportado.criado_em.desc())\
             .paginate(page=page, per_page=per_page, error_out=False)
         
@@ -308,26 +297,53 @@ def listar_arquivos_importados(empresa_id: int, page=1, per_page=50):
         }
 
 # ============================================================
-# BUSCAR ARQUIVO POR ID
+# BUSCAR ARQUIVO POR ID (COM PÁGINA DE REGISTROS)
 # ============================================================
-def buscar_arquivo_por_id(arquivo_id, empresa_id):
-    """Busca arquivo por ID com descriptografia segura"""
+REGISTROS_POR_PAGINA = 200
+
+def _pagina_de_registros(arquivo_id, empresa_id, inicio, fim):
+    """
+    (registros[inicio:fim], total, resumo) do conteúdo do arquivo.
+    No formato em blocos só os blocos da página são decodificados e o resumo
+    vem do cabeçalho; nos formatos antigos o conteúdo inteiro é lido.
+    """
+    cabecalho = carregar_cabecalho(arquivo_id, empresa_id)
+    if cabecalho is not None and cabecalho.get("resumo"):
+        f = gerenciador_chaves.fernet()
+        registros = carregar_registros(arquivo_id, empresa_id, cabecalho, inicio, fim, fernet=f)
+        return registros, cabecalho["total"], ler_resumo(cabecalho, fernet=f)
+    
+    conteudo = db.session.query(ArquivoImportado.conteudo_json)\
+        .filter_by(id=arquivo_id, empresa_id=empresa_id).scalar()
+    todos = descriptografar_conteudo(conteudo)
+    return todos[inicio:fim], len(todos), resumir_registros(todos)
+
+
+def buscar_arquivo_por_id(arquivo_id, empresa_id, pagina=1, por_pagina=REGISTROS_POR_PAGINA):
+    """
+    Busca arquivo por ID com a página `pagina` dos registros já descriptografada.
+    O custo não cresce com o tamanho do arquivo (formato em blocos).
+    """
     
     try:
         arquivo = ArquivoImportado.query.filter_by(
             id=arquivo_id,
             empresa_id=empresa_id,
             ativo=True
-        ).first()
+        ).options(defer(ArquivoImportado.conteudo_json)).first()
         
         if not arquivo:
             return None
         
+        pagina = max(1, pagina)
+        por_pagina = max(1, por_pagina)
+        inicio = (pagina - 1) * por_pagina
+        
         try:
-            registros = descriptografar_conteudo(getattr(arquivo, 'conteudo_json', None))
+            registros, total, resumo = _pagina_de_registros(arquivo_id, empresa_id, inicio, inicio + por_pagina)
         except Exception as e:
             logger.error(f"Erro ao descriptografar arquivo {arquivo_id}: {str(e)}")
-            registros = []
+            registros, total, resumo = [], 0, resumir_registros([])
         
         return {
             "id": arquivo.id,
@@ -337,8 +353,14 @@ def buscar_arquivo_por_id(arquivo_id, empresa_id):
             "total_registros": getattr(arquivo, 'total_registros', 0),
             "total_valor": str(getattr(arquivo, 'total_valor', 0)),
             "created_at": arquivo.criado_em.strftime("%d/%m/%Y %H:%M") if arquivo.criado_em else "",
-            "conteudo_json": getattr(arquivo, 'conteudo_json', None),
+            "resumo": resumo,
             "registros": registros,
+            "paginacao": {
+                "pagina": pagina,
+                "por_pagina": por_pagina,
+                "total": total,
+                "paginas": (total + por_pagina - 1) // por_pagina,
+            },
         }
     except Exception as e:
         logger.error(f"Erro ao buscar arquivo {arquivo_id}: {str(e)}")
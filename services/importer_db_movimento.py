@@ -5,13 +5,17 @@ from models import db, MovAdquirente, MovBanco, Adquirente, ContaBancaria
 from datetime import datetime, date, timezone
 from decimal import Decimal, InvalidOperation
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import func
 import logging
 import time
 
+from services.cache_adquirentes import resolvedor_adquirentes
+from utils.telemetria_importacao import TelemetriaImportacao
+
 logger = logging.getLogger(__name__)
 
 BATCH_SIZE = 200
+LOTE_INSERCAO_VENDAS = 1000     # Linhas por INSERT executemany + commit
+TAMANHO_CHUNK_IN = 1000         # Itens por cláusula IN na checagem de NSU
 
 
 # ============================================================
@@ -218,6 +222,26 @@ def obter_ou_criar_conta_bancaria(empresa_id, dados_conta=None):
 # SALVAR VENDAS
 # ============================================================
 
+def carregar_nsus_existentes(empresa_id, nsus):
+    """
+    NSUs ativos da empresa que já existem em mov_adquirente, entre os informados.
+    Uma consulta por chunk de TAMANHO_CHUNK_IN (a consulta é limitada pelos NSUs
+    do arquivo, não pelo volume histórico da empresa).
+    """
+    nsus = list(nsus)
+    existentes = set()
+    for i in range(0, len(nsus), TAMANHO_CHUNK_IN):
+        chunk = nsus[i:i + TAMANHO_CHUNK_IN]
+        existentes.update(
+            nsu for (nsu,) in db.session.query(MovAdquirente.nsu).filter(
+                MovAdquirente.empresa_id == empresa_id,
+                MovAdquirente.ativo.is_(True),
+                MovAdquirente.nsu.in_(chunk),
+            )
+        )
+    return existentes
+
+
 def salvar_vendas(registros: list, empresa_id: int, arquivo_id: int = None) -> dict:
     inicio_total = time.time()
 
@@ -253,11 +277,9 @@ def salvar_vendas(registros: list, empresa_id: int, arquivo_id: int = None) -> d
 
     for nome in nomes_adquirentes:
         try:
-            adquirente = Adquirente.query.filter(
-                func.lower(Adquirente.nome) == nome.lower()
-            ).first()
+            adquirente_id = resolvedor_adquirentes.resolver(nome, ignorar_negativo=True)
 
-            if not adquirente:
+            if not adquirente_id:
                 logger.info(f"➕ [MOVIMENTO] Criando adquirente: {nome}")
                 adquirente = Adquirente(
                     nome=nome[:100],
@@ -266,152 +288,160 @@ def salvar_vendas(registros: list, empresa_id: int, arquivo_id: int = None) -> d
                 )
                 db.session.add(adquirente)
                 db.session.commit()
+                adquirente_id = adquirente.id
                 stats["adquirente_criada"] = True
 
-            adquirentes_cache[nome.lower()] = adquirente
+            adquirentes_cache[nome.lower()] = adquirente_id
             stats["adquirentes_processadas"].add(nome)
 
         except Exception as e:
             logger.error(f"❌ [MOVIMENTO] Erro ao resolver adquirente '{nome}': {str(e)}", exc_info=True)
             db.session.rollback()
 
-    batch_size = 20
-    total_batches = (len(registros) + batch_size - 1) // batch_size
-
-    for batch_num in range(total_batches):
-        inicio = batch_num * batch_size
-        fim = min((batch_num + 1) * batch_size, len(registros))
-        batch = registros[inicio:fim]
+    # NSUs já gravados: uma consulta (em chunks de IN) para os NSUs do arquivo,
+    # incluindo os AUTO-* que podem ser gerados para linhas sem NSU
+    candidatos = set()
+    for reg in registros:
+        nsu = reg.get("nsu") or reg.get("id")
+        if nsu:
+            candidatos.add(nsu)
+    candidatos.update(f"AUTO-{k}-{empresa_id}" for k in range(len(registros)))
+    nsus_existentes = carregar_nsus_existentes(empresa_id, candidatos)
 
-        batch_sucesso = 0
-        batch_falhas = 0
-        batch_duplicados = 0
+    logger.info(
+        f"🧪 [MOVIMENTO] nsus_candidatos={len(candidatos)}, "
+        f"nsus_ja_gravados={len(nsus_existentes)}"
+    )
 
-        logger.info(f"📦 [MOVIMENTO] Batch vendas {batch_num + 1}/{total_batches}, registros={len(batch)}")
+    linhas = []
+    agora = datetime.now(timezone.utc)
+    arquivo_origem = str(arquivo_id) if arquivo_id else None
+    telemetria = TelemetriaImportacao("VENDAS", logger)
 
+    for idx, reg in enumerate(registros):
+        amostrar = telemetria.amostrar()
         try:
-            for idx, reg in enumerate(batch):
-                try:
-                    adquirente_nome = (
-                        reg.get("adquirente")
-                        or reg.get("nome_adquirente")
-                        or "Flow"
-                    ).lower()
-
-                    adquirente = adquirentes_cache.get(adquirente_nome)
-
-                    if not adquirente:
-                        logger.warning(f"⚠️ [MOVIMENTO] Adquirente não encontrada cache: {adquirente_nome}")
-                        batch_falhas += 1
-                        continue
-
-                    nsu = (
-                        reg.get("nsu")
-                        or reg.get("id")
-                        or f"AUTO-{stats['sucesso'] + batch_sucesso}-{empresa_id}"
-                    )
-
-                    data_venda_raw = (
-                        reg.get("data_venda")
-                        or reg.get("data_transacao")
-                        or reg.get("data")
-                    )
-
-                    valor_bruto = to_decimal(reg.get("valor_bruto") or reg.get("valor"))
-                    valor_liquido = to_decimal(reg.get("valor_liquido"), valor_bruto)
-                    taxa_cobrada = to_decimal(reg.get("desconto") or reg.get("taxa_cobrada"))
-
-                    if valor_bruto <= 0:
-                        logger.warning(
-                            f"⚠️ [MOVIMENTO] Venda ignorada valor_bruto<=0: "
-                            f"idx={inicio + idx + 1}, valor={valor_bruto}, reg={reg}"
-                        )
-                        batch_falhas += 1
-                        continue
-
-                    if nsu:
-                        duplicata = MovAdquirente.query.filter_by(
-                            empresa_id=empresa_id,
-                            nsu=nsu,
-                            ativo=True,
-                        ).first()
-
-                        if duplicata:
-                            logger.info(f"🔁 [MOVIMENTO] Venda duplicada nsu={nsu}")
-                            batch_duplicados += 1
-                            continue
-
-                    data_venda = to_date(data_venda_raw) or date.today()
-
-                    tipo_pagamento = reg.get("tipo_pagamento") or "cartao"
-
-                    if tipo_pagamento not in ["cartao", "pix", "boleto", "outros", "debito", "credito"]:
-                        tipo_pagamento = "cartao"
+            adquirente_nome = (
+                reg.get("adquirente")
+                or reg.get("nome_adquirente")
+                or "Flow"
+            ).lower()
+
+            adquirente_id = adquirentes_cache.get(adquirente_nome)
+
+            if not adquirente_id:
+                telemetria.erro(
+                    f"⚠️ [MOVIMENTO] Adquirente não encontrada cache: {adquirente_nome}",
+                    registro=reg, nivel=logging.WARNING,
+                )
+                stats["falhas"] += 1
+                continue
 
-                    mov = MovAdquirente(
-                        empresa_id=empresa_id,
-                        adquirente_id=adquirente.id,
-                        data_venda=data_venda,
-                        valor_bruto=valor_bruto,
-                        valor_liquido=valor_liquido,
-                        taxa_cobrada=taxa_cobrada,
-                        arquivo_origem=str(arquivo_id) if arquivo_id else None,
-                        bandeira=reg.get("bandeira", "")[:50] if reg.get("bandeira") else None,
-                        tipo_pagamento=tipo_pagamento,
-                        produto=reg.get("produto", "")[:50] if reg.get("produto") else None,
-                        nsu=nsu[:50] if nsu else None,
-                        status_conciliacao="pendente",
-                        valor_conciliado=Decimal("0"),
-                        observacoes=reg.get("observacoes", "")[:2000] if reg.get("observacoes") else None,
-                        ativo=True,
-                        criado_em=datetime.now(timezone.utc),
-                    )
+            nsu = (
+                reg.get("nsu")
+                or reg.get("id")
+                or f"AUTO-{len(linhas)}-{empresa_id}"
+            )
 
-                    db.session.add(mov)
-                    batch_sucesso += 1
+            data_venda_raw = (
+                reg.get("data_venda")
+                or reg.get("data_transacao")
+                or reg.get("data")
+            )
 
-                except Exception as e:
-                    logger.error(
-                        f"❌ [MOVIMENTO] Erro ao processar venda {inicio + idx + 1}: {str(e)}",
-                        exc_info=True,
-                    )
-                    batch_falhas += 1
-                    continue
+            valor_bruto = to_decimal(reg.get("valor_bruto") or reg.get("valor"))
+            valor_liquido = to_decimal(reg.get("valor_liquido"), valor_bruto)
+            taxa_cobrada = to_decimal(reg.get("desconto") or reg.get("taxa_cobrada"))
 
-            if batch_sucesso > 0:
-                db.session.commit()
-                logger.info(
-                    f"✅ [MOVIMENTO] Commit vendas batch {batch_num + 1}: "
-                    f"sucesso={batch_sucesso}, falhas={batch_falhas}, duplicados={batch_duplicados}"
+            if valor_bruto <= 0:
+                telemetria.erro(
+                    f"⚠️ [MOVIMENTO] Venda ignorada valor_bruto<=0: idx={idx + 1}, valor={valor_bruto}",
+                    registro=reg, nivel=logging.WARNING,
                 )
-            else:
-                db.session.rollback()
-                logger.warning(f"⚠️ [MOVIMENTO] Batch vendas sem sucesso. Rollback batch={batch_num + 1}")
+                stats["falhas"] += 1
+                continue
 
-            stats["sucesso"] += batch_sucesso
-            stats["falhas"] += batch_falhas
-            stats["duplicados"] += batch_duplicados
+            if nsu and nsu in nsus_existentes:
+                if amostrar:
+                    logger.info(f"🔁 [MOVIMENTO] Venda duplicada nsu={nsu} (amostra)")
+                stats["duplicados"] += 1
+                continue
 
-            for reg in batch:
-                try:
-                    vb = to_decimal(reg.get("valor_bruto") or reg.get("valor"))
-                    vl = to_decimal(reg.get("valor_liquido"), vb)
+            data_venda = to_date(data_venda_raw) or date.today()
+
+            tipo_pagamento = reg.get("tipo_pagamento") or "cartao"
+
+            if tipo_pagamento not in ["cartao", "pix", "boleto", "outros", "debito", "credito"]:
+                tipo_pagamento = "cartao"
+
+            linha = {
+                "empresa_id": empresa_id,
+                "adquirente_id": adquirente_id,
+                "data_venda": data_venda,
+                "valor_bruto": valor_bruto,
+                "valor_liquido": valor_liquido,
+                "taxa_cobrada": taxa_cobrada,
+                "arquivo_origem": arquivo_origem,
+                "bandeira": reg.get("bandeira", "")[:50] if reg.get("bandeira") else None,
+                "tipo_pagamento": tipo_pagamento,
+                "produto": reg.get("produto", "")[:50] if reg.get("produto") else None,
+                "nsu": nsu[:50] if nsu else None,
+                "status_conciliacao": "pendente",
+                "valor_conciliado": Decimal("0"),
+                "observacoes": reg.get("observacoes", "")[:2000] if reg.get("observacoes") else None,
+                "ativo": True,
+                "criado_em": agora,
+            }
+
+            # Vale também para repetições dentro do próprio arquivo
+            if linha["nsu"]:
+                nsus_existentes.add(linha["nsu"])
+            linhas.append(linha)
+
+            if amostrar:
+                logger.info(f"🧪 [MOVIMENTO] Venda {idx + 1} (amostra): {linha}")
 
-                    if vb > 0:
-                        stats["total_valor_bruto"] += vb
-                        stats["total_valor_liquido"] += vl
-                except Exception:
-                    pass
+        except Exception as e:
+            telemetria.erro(
+                f"❌ [MOVIMENTO] Erro ao processar venda {idx + 1}: {str(e)}",
+                registro=reg, exc_info=True,
+            )
+            stats["falhas"] += 1
+            continue
+
+    # INSERT em executemany, uma transação por lote grande
+    tabela = MovAdquirente.__table__
+    total_lotes = (len(linhas) + LOTE_INSERCAO_VENDAS - 1) // LOTE_INSERCAO_VENDAS
 
+    for lote_num, inicio in enumerate(range(0, len(linhas), LOTE_INSERCAO_VENDAS), 1):
+        lote = linhas[inicio:inicio + LOTE_INSERCAO_VENDAS]
+        try:
+            db.session.execute(tabela.insert(), lote)
+            db.session.commit()
+            stats["sucesso"] += len(lote)
+            telemetria.lote(
+                f"✅ [MOVIMENTO] Commit vendas lote {lote_num}/{total_lotes}: inseridas={len(lote)}"
+            )
         except Exception as e:
-            logger.error(f"❌ [MOVIMENTO] Erro no batch vendas {batch_num + 1}: {str(e)}", exc_info=True)
+            logger.error(f"❌ [MOVIMENTO] Erro no lote vendas {lote_num}: {str(e)}", exc_info=True)
             db.session.rollback()
-            stats["falhas"] += len(batch)
-            continue
+            stats["falhas"] += len(lote)
+
+    for reg in registros:
+        try:
+            vb = to_decimal(reg.get("valor_bruto") or reg.get("valor"))
+            vl = to_decimal(reg.get("valor_liquido"), vb)
+
+            if vb > 0:
+                stats["total_valor_bruto"] += vb
+                stats["total_valor_liquido"] += vl
+        except Exception:
+            pass
 
     if isinstance(stats.get("adquirentes_processadas"), set):
         stats["adquirentes_processadas"] = list(stats["adquirentes_processadas"])
 
+    telemetria.finalizar()
     logger.info(f"🏁 [MOVIMENTO] FIM salvar_vendas tempo={time.time() - inicio_total:.2f}s stats={stats}")
     return stats
 
@@ -457,35 +487,43 @@ def salvar_recebimentos(registros, empresa_id, arquivo_id, usuario_id=None, dado
         estatisticas["falhas"] = len(registros)
         return estatisticas
 
+    telemetria = TelemetriaImportacao("RECEBIMENTOS", logger)
+
     for i in range(0, len(registros), BATCH_SIZE):
         batch = registros[i:i + BATCH_SIZE]
 
-        logger.info(f"📦 [MOVIMENTO] Batch recebimentos {i // BATCH_SIZE + 1}, registros={len(batch)}")
-        logger.info(f"🧪 [MOVIMENTO] Primeiro registro batch={batch[0] if batch else None}")
+        logger.debug(f"📦 [MOVIMENTO] Batch recebimentos {i // BATCH_SIZE + 1}, registros={len(batch)}")
 
         try:
             for r_idx, r in enumerate(batch, 1):
+                amostrar = telemetria.amostrar()
                 try:
                     valor = to_decimal(r.get("valor"))
 
                     if valor == 0:
-                        logger.warning(f"⚠️ [MOVIMENTO] Recebimento inválido valor=0: {r}")
+                        telemetria.erro(
+                            "⚠️ [MOVIMENTO] Recebimento inválido valor=0",
+                            registro=r, nivel=logging.WARNING,
+                        )
                         estatisticas["invalidos"] += 1
                         continue
 
                     data_movimento = to_date(r.get("data") or r.get("data_movimento"))
 
                     if not data_movimento:
-                        logger.warning(f"⚠️ [MOVIMENTO] Recebimento sem data válida: {r}")
+                        telemetria.erro(
+                            "⚠️ [MOVIMENTO] Recebimento sem data válida",
+                            registro=r, nivel=logging.WARNING,
+                        )
                         estatisticas["invalidos"] += 1
                         continue
 
                     categoria = str(r.get("categoria") or "outros").strip()[:100]
                     tipo_pagamento = str(r.get("tipo_pagamento") or "outros").strip()[:50]
 
-                    if estatisticas["sucesso"] == 0:
+                    if amostrar:
                         logger.info(
-                            f"🧪 [MOVIMENTO] PRIMEIRO INSERT MOVBANCO: "
+                            f"🧪 [MOVIMENTO] INSERT MOVBANCO (amostra): "
                             f"conta_id={conta_id}, data={data_movimento}, valor={valor}, "
                             f"categoria={categoria}, tipo_pagamento={tipo_pagamento}, "
                             f"descricao={str(r.get('descricao') or '')[:150]}"
@@ -524,18 +562,17 @@ def salvar_recebimentos(registros, empresa_id, arquivo_id, usuario_id=None, dado
                     estatisticas["sucesso"] += 1
 
                 except Exception as e:
-                    logger.error(
+                    telemetria.erro(
                         f"⚠️ [MOVIMENTO] Erro ao preparar recebimento "
                         f"batch_idx={r_idx}, arquivo_id={arquivo_id}: {str(e)}",
-                        exc_info=True,
+                        registro=r, exc_info=True,
                     )
-                    logger.error(f"⚠️ [MOVIMENTO] Registro com erro={r}")
                     estatisticas["falhas"] += 1
                     continue
 
             db.session.commit()
 
-            logger.info(
+            telemetria.lote(
                 f"🧪 [MOVIMENTO] COMMIT OK BATCH {i // BATCH_SIZE + 1}: "
                 f"sucesso={estatisticas['sucesso']}, "
                 f"falhas={estatisticas['falhas']}, "
@@ -559,6 +596,7 @@ def salvar_recebimentos(registros, empresa_id, arquivo_id, usuario_id=None, dado
             logger.error(f"❌ [MOVIMENTO] Primeiro registro do batch={batch[0] if batch else None}")
             estatisticas["falhas"] += len(batch)
 
+    telemetria.finalizar()
     logger.info(
         f"🏁 [MOVIMENTO] FIM salvar_recebimentos tempo={time.time() - inicio_total:.2f}s "
         f"stats={estatisticas}"
@@ -8,9 +8,14 @@ from decimal import Decimal
 import logging
 
 from services.classificador_financeiro import classificador
+from services.cache_adquirentes import resolvedor_adquirentes
+from utils.lote_adaptativo import LoteAdaptativo, em_lotes
+from utils.telemetria_importacao import TelemetriaImportacao
 
 logger = logging.getLogger(__name__)
 
+TAMANHO_CHUNK_IN = 1000  # NSUs por consulta de duplicidade
+
 
 def _preparar_para_json(obj):
     """Converte recursivamente objetos não serializáveis para JSON."""
@@ -46,36 +51,46 @@ class ImportadorNormalizado:
             "erros": []
         }
 
-    def importar_arquivo(self, arquivo_id: int, registros: list, tipo_origem: str, tipo_movimento: str):
-        """Importa registros e salva na tabela de normalização."""
+    def importar_arquivo(self, arquivo_id: int, registros, tipo_origem: str, tipo_movimento: str,
+                         tamanho_lote: int = None):
+        """
+        Importa registros e salva na tabela de normalização.
+
+        `registros` pode ser lista ou qualquer iterável (ex.: gerador de um parser
+        em streaming). Os lotes começam em `tamanho_lote` e se ajustam pela
+        latência do commit (ver utils.lote_adaptativo).
+        """
+        total_conhecido = len(registros) if hasattr(registros, "__len__") else None
         logger.info(
-            f"📥 Iniciando normalização: {len(registros)} registros, "
+            f"📥 Iniciando normalização: {total_conhecido if total_conhecido is not None else '?'} registros, "
             f"tipo_origem={tipo_origem}, tipo_movimento={tipo_movimento}"
         )
 
-        self.stats["total_registros"] = len(registros)
-
-        BATCH_SIZE = 50
-        total_batches = (len(registros) + BATCH_SIZE - 1) // BATCH_SIZE
+        controle = LoteAdaptativo(inicial=tamanho_lote, nome="normalizacao")
+        telemetria = TelemetriaImportacao("NORMALIZACAO", logger)
+        inicio_idx = 0
 
-        for batch_num in range(total_batches):
-            inicio_idx = batch_num * BATCH_SIZE
-            fim_idx = min((batch_num + 1) * BATCH_SIZE, len(registros))
-            batch = registros[inicio_idx:fim_idx]
+        for batch_num, batch in enumerate(em_lotes(registros, controle)):
+            self.stats["total_registros"] += len(batch)
 
             batch_sucesso = 0
             batch_falhas = 0
             batch_duplicados = 0
 
+            # Saúde da conexão: uma vez por lote (não por registro)
+            try:
+                db.session.execute(db.text("SELECT 1"))
+            except Exception:
+                db.session.rollback()
+
+            # 1️⃣ Montagem e validação do lote inteiro (sem I/O)
+            objetos = []
+            validos = []
             for idx, reg in enumerate(batch):
                 numero_registro = inicio_idx + idx + 1
+                amostrar = telemetria.amostrar()
 
                 try:
-                    try:
-                        db.session.execute(db.text("SELECT 1"))
-                    except Exception:
-                        db.session.rollback()
-
                     normalizacao = self._criar_normalizacao(
                         arquivo_id=arquivo_id,
                         dados=reg,
@@ -91,57 +106,69 @@ class ImportadorNormalizado:
                     if not valido:
                         normalizacao.status = "erro"
                         normalizacao.erro_mensagem = erro
+                        telemetria.erro(
+                            f"⚠️ Registro {numero_registro} inválido: {erro}",
+                            registro=reg, nivel=logging.WARNING
+                        )
 
                         self.stats["falhas"] += 1
                         batch_falhas += 1
 
-                        db.session.add(normalizacao)
-                        continue
-
-                    if self._verificar_duplicata(normalizacao):
-                        normalizacao.status = "duplicado"
-                        normalizacao.erro_mensagem = "Registro duplicado"
-
-                        self.stats["duplicados"] += 1
-                        batch_duplicados += 1
-
-                        db.session.add(normalizacao)
+                        objetos.append(normalizacao)
                         continue
 
-                    try:
-                        normalizacao.enriquecer()
-                        normalizacao.status = "validado"
-                    except Exception as e:
-                        logger.debug(
-                            f"⚠️ Falha ao enriquecer normalização {numero_registro}: {str(e)}"
-                        )
-                        normalizacao.status = "validado"
-
-                    db.session.add(normalizacao)
+                    validos.append((numero_registro, normalizacao))
 
-                    self.stats["sucesso"] += 1
-                    batch_sucesso += 1
+                    if amostrar:
+                        logger.info(f"🧪 Registro {numero_registro} (amostra): {reg}")
 
                 except Exception as e:
-                    logger.error(
+                    telemetria.erro(
                         f"❌ Erro ao normalizar registro {numero_registro}: {str(e)}",
-                        exc_info=True
+                        registro=reg, exc_info=True
                     )
 
                     self.stats["falhas"] += 1
                     batch_falhas += 1
+                    continue
 
-                    try:
-                        db.session.rollback()
-                    except Exception:
-                        pass
+            inicio_idx += len(batch)
 
+            # 2️⃣ Duplicatas do lote: uma consulta
+            duplicatas = self._buscar_duplicatas([n for _, n in validos])
+
+            for numero_registro, normalizacao in validos:
+                if (normalizacao.nsu, normalizacao.data_movimento) in duplicatas:
+                    normalizacao.status = "duplicado"
+                    normalizacao.erro_mensagem = "Registro duplicado"
+
+                    self.stats["duplicados"] += 1
+                    batch_duplicados += 1
+
+                    objetos.append(normalizacao)
                     continue
 
+                try:
+                    normalizacao.enriquecer()
+                    normalizacao.status = "validado"
+                except Exception as e:
+                    logger.debug(
+                        f"⚠️ Falha ao enriquecer normalização {numero_registro}: {str(e)}"
+                    )
+                    normalizacao.status = "validado"
+
+                objetos.append(normalizacao)
+
+                self.stats["sucesso"] += 1
+                batch_sucesso += 1
+
+            # 3️⃣ Persistência em bulk (executemany) + commit do lote
             try:
-                db.session.commit()
-                logger.info(
-                    f"✅ Batch {batch_num + 1}/{total_batches}: "
+                with controle.medir(len(objetos)):
+                    db.session.bulk_save_objects(objetos)
+                    db.session.commit()
+                telemetria.lote(
+                    f"✅ Batch {batch_num + 1} ({len(batch)} registros): "
                     f"{batch_sucesso} OK, {batch_falhas} falhas, {batch_duplicados} duplicados"
                 )
 
@@ -153,6 +180,10 @@ class ImportadorNormalizado:
                 db.session.rollback()
                 continue
 
+        self.stats["lotes"] = controle.resumo()
+        self.stats["cache_adquirentes"] = resolvedor_adquirentes.stats
+        self.stats["telemetria"] = telemetria.finalizar()
+
         logger.info(
             f"✅ Normalização concluída: "
             f"{self.stats['sucesso']} sucesso, "
@@ -347,53 +378,58 @@ class ImportadorNormalizado:
 
         return None
 
-    def _verificar_duplicata(self, normalizacao: Normalizacao) -> bool:
+    def _buscar_duplicatas(self, normalizacoes: list) -> set:
         """
-        Verifica duplicidade na camada de normalização.
+        Verifica duplicidade na camada de normalização para um lote inteiro.
     
         Regra:
         - Para vendas/adquirentes: bloqueia duplicidade por empresa + nsu + data + tipo.
         - Para recebimento/pagamento/extrato bancário: NÃO bloqueia na normalização.
           Motivo: o extrato precisa seguir para mov_banco. A duplicidade bancária deve ser
           tratada na tabela final ou por arquivo_origem, não aqui.
-        """
-    
-        if not normalizacao.nsu:
-            logger.info(
-                f"🧪 [NORMALIZACAO] Sem NSU/FITID. Não será tratado como duplicado. "
-                f"arquivo={normalizacao.arquivo_origem_id}, tipo={normalizacao.tipo_movimento}"
-            )
-            return False
     
-        if normalizacao.tipo_movimento in ["recebimento", "pagamento", "extrato"]:
-            logger.info(
-                f"🧪 [NORMALIZACAO] Duplicidade ignorada para extrato bancário. "
-                f"arquivo={normalizacao.arquivo_origem_id}, nsu={normalizacao.nsu}, "
-                f"data={normalizacao.data_movimento}, valor={normalizacao.valor_bruto}"
-            )
-            return False
+        Returns:
+            Set de (nsu, data_movimento) que já existem em outro arquivo
+        """
+        candidatas = [
+            n for n in normalizacoes
+            if n.nsu and n.tipo_movimento not in ["recebimento", "pagamento", "extrato"]
+        ]
+        if not candidatas:
+            return set()
     
+        duplicatas = set()
         try:
-            duplicata = Normalizacao.query.filter(
-                Normalizacao.empresa_id == self.empresa_id,
-                Normalizacao.nsu == normalizacao.nsu,
-                Normalizacao.data_movimento == normalizacao.data_movimento,
-                Normalizacao.tipo_movimento == normalizacao.tipo_movimento,
-                Normalizacao.arquivo_origem_id != normalizacao.arquivo_origem_id
-            ).first()
+            # Agrupado por (arquivo, tipo) para manter a exclusão do próprio arquivo
+            grupos = {}
+            for n in candidatas:
+                grupos.setdefault((n.arquivo_origem_id, n.tipo_movimento), []).append(n)
+    
+            for (arquivo_origem_id, tipo_movimento), grupo in grupos.items():
+                chaves = {(n.nsu, n.data_movimento) for n in grupo}
+                nsus = list({nsu for nsu, _ in chaves})
+                for i in range(0, len(nsus), TAMANHO_CHUNK_IN):
+                    existentes = db.session.query(
+                        Normalizacao.nsu, Normalizacao.data_movimento
+                    ).filter(
+                        Normalizacao.empresa_id == self.empresa_id,
+                        Normalizacao.nsu.in_(nsus[i:i + TAMANHO_CHUNK_IN]),
+                        Normalizacao.tipo_movimento == tipo_movimento,
+                        Normalizacao.arquivo_origem_id != arquivo_origem_id
+                    )
+                    duplicatas.update(chave for chave in existentes if chave in chaves)
     
-            if duplicata:
+            if duplicatas:
                 logger.warning(
-                    f"⚠️ [NORMALIZACAO] Duplicata encontrada para venda. "
-                    f"normalizacao_id={duplicata.id}, nsu={normalizacao.nsu}, "
-                    f"data={normalizacao.data_movimento}"
+                    f"⚠️ [NORMALIZACAO] {len(duplicatas)} duplicata(s) de venda no lote "
+                    f"(ex.: nsu={next(iter(duplicatas))[0]})"
                 )
     
-            return duplicata is not None
+            return duplicatas
     
         except Exception as e:
             logger.error(
                 f"❌ [NORMALIZACAO] Erro ao verificar duplicidade: {str(e)}",
                 exc_info=True
             )
-            return False
+            return set()
@@ -0,0 +1,452 @@
+# services/job_service.py
+# Jobs em background (thread pool local, sem broker externo)
+#
+# O estado de cada job fica em um arquivo JSON no disco local, para que
+# qualquer worker do gunicorn no mesmo host consiga responder ao polling.
+
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURAÇÕES
+# ============================================================
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 1))              # Threads por processo
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", 2))  # Threads por processo só para importações
+JOB_HEARTBEAT_INTERVALO = int(os.getenv("JOB_HEARTBEAT_INTERVALO", 10))  # Mínimo entre heartbeats por lote
+JOB_HEARTBEAT_TIMEOUT = int(os.getenv("JOB_HEARTBEAT_TIMEOUT", 120))  # Segundos sem sinal → job interrompido
+JOB_FILA_TIMEOUT = int(os.getenv("JOB_FILA_TIMEOUT", 3600))  # Segundos na fila → interrompido (só sem /proc)
+JOB_RETENCAO_SEGUNDOS = 24 * 3600
+
+STATUS_ATIVOS = ("na_fila", "executando")
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="nouscard-job")
+# Importações têm pool próprio: não esperam atrás de uma conciliação longa
+_executores_por_tipo = {
+    "importacao": ThreadPoolExecutor(max_workers=IMPORT_JOB_WORKERS, thread_name_prefix="nouscard-job-importacao"),
+}
+_lock = threading.RLock()
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class JobInterrompido(Exception):
+    """O job foi marcado como interrompido; o worker deve parar de escrever"""
+
+
+# ============================================================
+# ARMAZENAMENTO (ARQUIVOS JSON)
+# ============================================================
+
+def _pasta_jobs():
+    pasta = current_app.config.get("JOBS_FOLDER") or os.path.join(
+        current_app.config.get("UPLOAD_FOLDER", "uploads"), "jobs"
+    )
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def _caminho_job(job_id):
+    if not job_id or not _JOB_ID_RE.match(str(job_id)):
+        raise ValueError(f"job_id inválido: {job_id}")
+    return os.path.join(_pasta_jobs(), f"{job_id}.json")
+
+
+def _agora_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def salvar_job(job):
+    """Grava o estado do job de forma atômica (arquivo temporário + os.replace)"""
+    caminho = _caminho_job(job["id"])
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False, default=str)
+    os.replace(temporario, caminho)
+    return job
+
+
+def obter_job(job_id, empresa_id=None):
+    """
+    Lê o estado de um job.
+
+    Args:
+        job_id: ID do job
+        empresa_id: Se informado, só retorna jobs desta empresa (isolamento)
+    """
+    try:
+        with open(_caminho_job(job_id), "r", encoding="utf-8") as f:
+            job = json.load(f)
+    except (ValueError, FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if empresa_id is not None and job.get("empresa_id") != empresa_id:
+        return None
+    return job
+
+
+def atualizar_job(job_id, **campos):
+    """Atualiza campos do job e renova o heartbeat"""
+    with _lock:
+        job = obter_job(job_id)
+        if job is None:
+            return None
+        if "fase" in campos and campos["fase"] != job.get("fase"):
+            job["fase_inicio_ts"] = time.time()
+        job.update(campos)
+        job["heartbeat"] = time.time()
+        job["atualizado_em"] = _agora_iso()
+        return salvar_job(job)
+
+
+def atualizar_item_job(job_id, chave, indice, **campos):
+    """
+    Atualiza job[chave][indice] (ex.: um arquivo de uma importação) e renova
+    o heartbeat, sob o mesmo lock de atualizar_job (vários threads do mesmo
+    job podem atualizar itens diferentes ao mesmo tempo).
+    """
+    with _lock:
+        job = obter_job(job_id)
+        if job is None:
+            return None
+        if job.get("status") == "interrompido":
+            raise JobInterrompido(job_id)
+        itens = job.get(chave) or []
+        if 0 <= indice < len(itens):
+            itens[indice].update(campos)
+        job["heartbeat"] = time.time()
+        job["atualizado_em"] = _agora_iso()
+        return salvar_job(job)
+
+
+def renovar_heartbeat(job_id):
+    """Renova só o heartbeat de um job em execução (sinal de vida de etapas longas)"""
+    with _lock:
+        job = obter_job(job_id)
+        if job is None or job.get("status") != "executando":
+            return None
+        job["heartbeat"] = time.time()
+        return salvar_job(job)
+
+
+def sinal_de_vida(job_id, intervalo=None):
+    """
+    Callback para utils.telemetria_importacao.definir_sinal_de_vida: renova o
+    heartbeat do job a cada lote, no máximo uma vez a cada `intervalo`
+    segundos (várias threads do mesmo job podem chamar). Falhas só são
+    logadas: o sinal de vida não interrompe o lote.
+    """
+    intervalo = JOB_HEARTBEAT_INTERVALO if intervalo is None else intervalo
+    trava = threading.Lock()
+    ultimo = [0.0]
+
+    def renovar():
+        agora = time.time()
+        with trava:
+            if agora - ultimo[0] < intervalo:
+                return
+            ultimo[0] = agora
+        try:
+            renovar_heartbeat(job_id)
+        except Exception as e:
+            logger.warning(f"⚠️ [JOB] Falha ao renovar heartbeat: id={job_id}, erro={str(e)}")
+
+    return renovar
+
+
+def criar_job(tipo, empresa_id, usuario_id, params=None, **extras):
+    """Cria um job na fila e retorna seu estado inicial"""
+    _limpar_jobs_antigos()
+    job = {
+        "id": uuid.uuid4().hex,
+        "tipo": tipo,
+        "empresa_id": empresa_id,
+        "usuario_id": usuario_id,
+        "params": params or {},
+        "status": "na_fila",
+        "fase": "na_fila",
+        "processados": 0,
+        "total": 0,
+        "resultado": None,
+        "erro": None,
+        "criado_em": _agora_iso(),
+        "atualizado_em": _agora_iso(),
+        "iniciado_em": None,
+        "inicio_ts": None,
+        "fase_inicio_ts": time.time(),
+        "heartbeat": time.time(),
+        # Quem vai executar (o pool é do processo que cria o job)
+        "processo": _processo_atual(),
+    }
+    job.update(extras)
+    return salvar_job(job)
+
+
+def _inicio_processo(pid):
+    """Instante de início do processo (ticks desde o boot, de /proc) ou None"""
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            dados = f.read()
+    except OSError:
+        return None
+    # O nome do processo (campo 2) pode ter espaços: conta depois do último ')'
+    campos = dados.rsplit(")", 1)[-1].split()
+    return campos[19] if len(campos) > 19 else None   # campo 22: starttime
+
+
+def _processo_atual():
+    pid = os.getpid()
+    return {"host": socket.gethostname(), "pid": pid, "inicio": _inicio_processo(pid)}
+
+
+def _processo_vivo(processo):
+    """
+    True/False se o processo dono do job ainda existe; None quando não dá
+    para saber (outro host, sem /proc). Compara o instante de início, então
+    um PID reaproveitado depois de um restart não conta como vivo.
+    """
+    if not processo or not processo.get("inicio") or processo.get("host") != socket.gethostname():
+        return None
+    return _inicio_processo(processo.get("pid")) == processo["inicio"]
+
+
+def job_interrompido(job):
+    """
+    True se o job está ativo mas não vai mais avançar (worker reiniciado/caiu).
+
+    No mesmo host vale o processo dono estar vivo: uma etapa longa ou uma
+    fila longa não interrompem o job. Sem como checar o processo, vale o
+    heartbeat (executando) ou o tempo de fila (na_fila, que não dá sinal).
+    """
+    if job.get("status") not in STATUS_ATIVOS:
+        return False
+
+    vivo = _processo_vivo(job.get("processo"))
+    if vivo is not None:
+        return not vivo
+
+    parado = time.time() - (job.get("heartbeat") or 0)
+    if job.get("status") == "na_fila":
+        return parado > JOB_FILA_TIMEOUT
+    return parado > JOB_HEARTBEAT_TIMEOUT
+
+
+# ============================================================
+# JOB ÚNICO POR EMPRESA (TRAVA EM ARQUIVO)
+# ============================================================
+
+def _caminho_trava(tipo, empresa_id):
+    return os.path.join(_pasta_jobs(), f"{tipo}_{int(empresa_id)}.lock")
+
+
+def _ler_trava(caminho):
+    """ID do job dono da trava ('' se vazia/em criação, None se não existe)"""
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _remover_trava_orfa(caminho, dono):
+    """
+    Remove a trava de um job que já terminou/morreu. O rename é atômico:
+    se outra requisição recriou a trava nesse meio tempo, ela é devolvida.
+    """
+    temporario = f"{caminho}.{uuid.uuid4().hex}.orfa"
+    try:
+        os.rename(caminho, temporario)
+    except FileNotFoundError:
+        return
+    try:
+        if _ler_trava(temporario) != dono:
+            try:
+                os.link(temporario, caminho)
+            except OSError:
+                pass
+    finally:
+        os.remove(temporario)
+
+
+def reservar_job(tipo, empresa_id, usuario_id, params=None, **extras):
+    """
+    Cria o job só se não houver outro ativo do mesmo tipo para a empresa.
+
+    A exclusividade vem de um arquivo de trava criado com O_CREAT|O_EXCL
+    (atômico entre threads e processos do host): duas requisições
+    simultâneas não criam dois jobs. A trava é liberada ao fim do job;
+    a de um job que morreu é removida quando o job é visto como interrompido.
+
+    Returns:
+        (job, criado): o job novo ou o já ativo, e se foi criado agora
+    """
+    caminho = _caminho_trava(tipo, empresa_id)
+    for _ in range(50):
+        try:
+            fd = os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            dono = _ler_trava(caminho)
+            if dono is None:
+                continue
+            if dono == "":
+                # Outra requisição acabou de criar a trava e ainda vai gravar o id
+                try:
+                    if time.time() - os.path.getmtime(caminho) < 5:
+                        time.sleep(0.05)
+                        continue
+                except OSError:
+                    continue
+
+            job = obter_job(dono, empresa_id) if dono else None
+            if job and job.get("status") in STATUS_ATIVOS:
+                if not job_interrompido(job):
+                    return job, False
+                atualizar_job(job["id"], status="interrompido", fase="interrompido")
+            _remover_trava_orfa(caminho, dono)
+            continue
+
+        job_id = uuid.uuid4().hex
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(job_id)
+            job = criar_job(tipo, empresa_id, usuario_id, params=params, id=job_id, trava=caminho, **extras)
+        except Exception:
+            _remover_trava_orfa(caminho, job_id)
+            raise
+        return job, True
+
+    raise RuntimeError(f"Não foi possível reservar o job {tipo} da empresa {empresa_id}")
+
+
+def _liberar_trava(job):
+    caminho = job.get("trava")
+    if caminho and _ler_trava(caminho) == job["id"]:
+        _remover_trava_orfa(caminho, job["id"])
+
+
+def _limpar_jobs_antigos():
+    pasta = _pasta_jobs()
+    limite = time.time() - JOB_RETENCAO_SEGUNDOS
+    for nome in os.listdir(pasta):
+        if nome.endswith(".lock"):
+            continue   # Travas saem com o job (ou como órfãs em reservar_job)
+        caminho = os.path.join(pasta, nome)
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+        except OSError:
+            continue
+
+
+# ============================================================
+# EXECUÇÃO
+# ============================================================
+
+def registrar_progresso(job_id, fase, processados, total, **extras):
+    """
+    Atualiza fase/contadores e calcula o ETA pela taxa observada na fase
+    atual (os contadores recomeçam a cada fase).
+
+    Levanta JobInterrompido se o job já foi dado como interrompido: o
+    worker para em vez de seguir escrevendo ao lado de um job novo.
+    """
+    with _lock:
+        job = obter_job(job_id)
+        if job is None:
+            return None
+        if job.get("status") == "interrompido":
+            raise JobInterrompido(job_id)
+
+        agora = time.time()
+        inicio_fase = job.get("fase_inicio_ts") if fase == job.get("fase") else agora
+        eta = None
+        if inicio_fase and processados and total:
+            eta = round((agora - inicio_fase) / processados * max(total - processados, 0), 1)
+        return atualizar_job(
+            job_id,
+            fase=fase,
+            processados=processados,
+            total=total,
+            eta_segundos=eta,
+            **extras
+        )
+
+
+def submeter_job(job, func, *args, **kwargs):
+    """
+    Executa func(job_id, *args, **kwargs) em background, com app context próprio.
+    O retorno de func vira job['resultado']; exceções viram status 'erro'.
+    """
+    app = current_app._get_current_object()
+    job_id = job["id"]
+
+    def _executar():
+        with app.app_context():
+            from models import db
+            atual = obter_job(job_id)
+            if atual and atual.get("status") == "interrompido":
+                logger.warning(f"⚠️ [JOB] Interrompido antes de iniciar: id={job_id}, tipo={job.get('tipo')}")
+                _liberar_trava(job)
+                return
+            atualizar_job(job_id, status="executando", fase="iniciando",
+                          iniciado_em=_agora_iso(), inicio_ts=time.time())
+            try:
+                resultado = func(job_id, *args, **kwargs)
+                atualizar_job(job_id, status="concluido", fase="concluido",
+                              resultado=resultado, eta_segundos=0)
+                logger.info(f"✅ [JOB] Concluído: id={job_id}, tipo={job.get('tipo')}")
+            except JobInterrompido:
+                logger.warning(f"⚠️ [JOB] Interrompido durante a execução: id={job_id}, tipo={job.get('tipo')}")
+                try:
+                    db.session.rollback()
+                except Exception:
+                    pass
+            except Exception as e:
+                logger.error(f"❌ [JOB] Falha: id={job_id}, tipo={job.get('tipo')}, erro={str(e)}", exc_info=True)
+                try:
+                    db.session.rollback()
+                except Exception:
+                    pass
+                atualizar_job(job_id, status="erro", fase="erro", erro=str(e))
+            finally:
+                db.session.remove()
+                _liberar_trava(job)
+
+    _executores_por_tipo.get(job.get("tipo"), _executor).submit(_executar)
+    logger.info(f"📤 [JOB] Submetido: id={job_id}, tipo={job.get('tipo')}, empresa={job.get('empresa_id')}")
+    return job
+
+
+def serializar_job(job):
+    """Dict público do job (sem campos internos)"""
+    if not job:
+        return None
+    publico = {
+        "job_id": job["id"],
+        "tipo": job.get("tipo"),
+        "status": job.get("status"),
+        "fase": job.get("fase"),
+        "processados": job.get("processados", 0),
+        "total": job.get("total", 0),
+        "percentual": round(job["processados"] / job["total"] * 100, 1) if job.get("total") else 0,
+        "eta_segundos": job.get("eta_segundos"),
+        "parcial": job.get("parcial"),
+        "resultado": job.get("resultado"),
+        "erro": job.get("erro"),
+        "criado_em": job.get("criado_em"),
+        "atualizado_em": job.get("atualizado_em"),
+    }
+    # Jobs com itens (ex.: importação: um por arquivo)
+    if "arquivos" in job:
+        publico["arquivos"] = job["arquivos"]
+    return publico
@@ -4,15 +4,32 @@
 from models import db, Normalizacao
 from services.importer_db_movimento import salvar_vendas, salvar_recebimentos
 from services.classificador_financeiro import classificador
+from utils.telemetria_importacao import TelemetriaImportacao
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+TAMANHO_PAGINA = 1000     # Normalizações por página (keyset) e por UPDATE de status
 
-def processar_normalizacoes(empresa_id: int, arquivo_id: int = None, dados_conta: dict = None):
+
+def processar_normalizacoes(empresa_id: int, arquivo_id: int = None, dados_conta: dict = None,
+                            tamanho_pagina: int = TAMANHO_PAGINA):
+    """
+    Converte as normalizações pendentes em vendas/recebimentos.
+
+    As pendentes são lidas em páginas por id (keyset: id > último id lido),
+    então a memória fica limitada a uma página de objetos ORM. Cada página
+    é classificada numa chamada a classificar_lote e cada linha passa uma
+    única vez por enriquecimento e conversão; as transições de status
+    (processado/erro) de cada página são gravadas com UPDATEs em lote,
+    agrupados por status e mensagem.
+    """
     logger.info("🔄 [PROCESSADOR] INÍCIO processar_normalizacoes")
     logger.info(f"🧪 [PROCESSADOR] empresa_id={empresa_id}, arquivo_id={arquivo_id}, dados_conta={dados_conta}")
 
+    inicio = time.perf_counter()
+
     query = Normalizacao.query.filter(
         Normalizacao.empresa_id == empresa_id,
         Normalizacao.status.in_(["importado", "validado"])
@@ -21,105 +38,97 @@ def processar_normalizacoes(empresa_id: int, arquivo_id: int = None, dados_conta
     if arquivo_id:
         query = query.filter_by(arquivo_origem_id=arquivo_id)
 
-    normalizacoes = query.all()
-
-    logger.info(f"🧪 [PROCESSADOR] NORMALIZAÇÕES ENCONTRADAS: {len(normalizacoes)}")
-
-    for n in normalizacoes[:10]:
-        logger.info(
-            f"🧪 [PROCESSADOR] NORMALIZACAO SAMPLE: "
-            f"id={n.id}, arquivo_origem_id={getattr(n, 'arquivo_origem_id', None)}, "
-            f"tipo_movimento={getattr(n, 'tipo_movimento', None)}, "
-            f"tipo_origem={getattr(n, 'tipo_origem', None)}, "
-            f"status={getattr(n, 'status', None)}, "
-            f"valor_bruto={getattr(n, 'valor_bruto', None)}, "
-            f"valor_liquido={getattr(n, 'valor_liquido', None)}, "
-            f"categoria={getattr(n, 'categoria', None)}, "
-            f"tipo_pagamento={getattr(n, 'tipo_pagamento', None)}, "
-            f"data_movimento={getattr(n, 'data_movimento', None)}, "
-            f"descricao={str(getattr(n, 'descricao', '') or '')[:120]}"
-        )
-
-    if not normalizacoes:
-        logger.warning(
-            f"⚠️ [PROCESSADOR] Nenhuma normalização encontrada para "
-            f"empresa_id={empresa_id}, arquivo_id={arquivo_id}"
-        )
-        return {
-            "vendas": {"sucesso": 0, "falhas": 0, "motivo": "nenhuma_normalizacao"},
-            "recebimentos": {"sucesso": 0, "falhas": 0, "motivo": "nenhuma_normalizacao"}
-        }
-
     vendas = []
     recebimentos = []
 
     contadores_tipo = {}
+    total = 0
+    paginas = 0
+    telemetria = TelemetriaImportacao("PROCESSADOR", logger)
 
-    for norm in normalizacoes:
-        try:
+    for pagina in _paginar(query, tamanho_pagina):
+        paginas += 1
+        if total == 0:
+            _logar_amostra(pagina)
+        total += len(pagina)
+
+        transicoes = {}
+        classificacoes = _classificar_pagina(pagina)
+
+        for norm in pagina:
+            amostrar = telemetria.amostrar()
             tipo_movimento = getattr(norm, "tipo_movimento", None)
             contadores_tipo[tipo_movimento] = contadores_tipo.get(tipo_movimento, 0) + 1
 
-            logger.info(
-                f"🧪 [PROCESSADOR] PROCESSANDO NORMALIZACAO: "
-                f"id={norm.id}, tipo_movimento={tipo_movimento}, status={norm.status}"
-            )
+            try:
+                if norm.status == "importado":
+                    try:
+                        norm.enriquecer()
+                    except Exception as e:
+                        logger.warning(
+                            f"⚠️ [PROCESSADOR] Erro ao enriquecer id={norm.id}: {str(e)}",
+                            exc_info=True
+                        )
 
-            if norm.status == "importado":
-                try:
-                    logger.info(f"🧪 [PROCESSADOR] Enriquecendo normalizacao id={norm.id}")
-                    norm.enriquecer()
-                except Exception as e:
-                    logger.warning(
-                        f"⚠️ [PROCESSADOR] Erro ao enriquecer id={norm.id}: {str(e)}",
-                        exc_info=True
-                    )
+                if tipo_movimento == "venda":
+                    item = _converter_para_venda(norm, classificacoes.get(norm.id))
+                    destino, erro = vendas, "Falha na conversão para venda"
 
-            if tipo_movimento == "venda":
-                item = _converter_para_venda(norm)
+                elif tipo_movimento in ["recebimento", "pagamento"]:
+                    item = _converter_para_recebimento(norm, classificacoes.get(norm.id))
+                    destino, erro = recebimentos, "Falha na conversão para recebimento"
 
-                if item:
-                    vendas.append(item)
-                    norm.status = "processado"
-                    logger.info(
-                        f"✅ [PROCESSADOR] Venda convertida: "
-                        f"id={norm.id}, nsu={item.get('nsu')}, valor={item.get('valor_bruto')}, "
-                        f"categoria={item.get('categoria')}"
-                    )
                 else:
-                    norm.status = "erro"
-                    norm.erro_mensagem = "Falha na conversão para venda"
-                    logger.error(f"❌ [PROCESSADOR] Falha conversão venda id={norm.id}")
-
-            elif tipo_movimento in ["recebimento", "pagamento"]:
-                item = _converter_para_recebimento(norm)
+                    item, destino = None, None
+                    erro = f"Tipo de movimento não processável: {tipo_movimento}"
 
                 if item:
-                    recebimentos.append(item)
-                    norm.status = "processado"
-                    logger.info(
-                        f"✅ [PROCESSADOR] Recebimento convertido: "
-                        f"id={norm.id}, nsu={item.get('nsu')}, valor={item.get('valor')}, "
-                        f"categoria={item.get('categoria')}, tipo_pagamento={item.get('tipo_pagamento')}"
-                    )
+                    destino.append(item)
+                    transicoes.setdefault(("processado", None), []).append(norm.id)
+                    if amostrar:
+                        logger.info(
+                            f"🧪 [PROCESSADOR] Convertida (amostra): id={norm.id}, "
+                            f"tipo_movimento={tipo_movimento}, item={item}"
+                        )
                 else:
-                    norm.status = "erro"
-                    norm.erro_mensagem = "Falha na conversão para recebimento"
-                    logger.error(f"❌ [PROCESSADOR] Falha conversão recebimento id={norm.id}")
-
-            else:
-                norm.status = "erro"
-                norm.erro_mensagem = f"Tipo de movimento não processável: {tipo_movimento}"
-                logger.error(
-                    f"❌ [PROCESSADOR] NORMALIZACAO IGNORADA: "
-                    f"id={norm.id}, tipo_movimento={tipo_movimento}, arquivo_id={arquivo_id}"
+                    telemetria.erro(
+                        f"❌ [PROCESSADOR] {erro}: id={norm.id}, arquivo_id={arquivo_id}",
+                        registro=norm.dados_crus,
+                    )
+                    transicoes.setdefault(("erro", erro), []).append(norm.id)
+
+            except Exception as e:
+                telemetria.erro(
+                    f"❌ [PROCESSADOR] Erro normalização {norm.id}: {str(e)}",
+                    registro=norm.dados_crus, exc_info=True,
                 )
+                transicoes.setdefault(("erro", str(e)), []).append(norm.id)
+
+        # Enriquecimento (adquirente/categoria) ainda vai pelo flush do ORM;
+        # o status vai em UPDATEs em lote e a página sai da sessão
+        db.session.flush()
+        _aplicar_transicoes(transicoes)
+        for norm in pagina:
+            db.session.expunge(norm)
+
+        telemetria.lote(
+            f"📦 [PROCESSADOR] Página {paginas}: {len(pagina)} normalizações, "
+            f"{len(vendas)} vendas e {len(recebimentos)} recebimentos acumulados"
+        )
 
-        except Exception as e:
-            logger.error(f"❌ [PROCESSADOR] Erro normalização {norm.id}: {str(e)}", exc_info=True)
-            norm.status = "erro"
-            norm.erro_mensagem = str(e)
+    if total == 0:
+        logger.warning(
+            f"⚠️ [PROCESSADOR] Nenhuma normalização encontrada para "
+            f"empresa_id={empresa_id}, arquivo_id={arquivo_id}"
+        )
+        return {
+            "vendas": {"sucesso": 0, "falhas": 0, "motivo": "nenhuma_normalizacao"},
+            "recebimentos": {"sucesso": 0, "falhas": 0, "motivo": "nenhuma_normalizacao"}
+        }
+
+    tempo_conversao = time.perf_counter() - inicio
 
+    logger.info(f"🧪 [PROCESSADOR] NORMALIZAÇÕES ENCONTRADAS: {total} ({paginas} páginas)")
     logger.info(f"🧪 [PROCESSADOR] CONTADORES TIPO_MOVIMENTO: {contadores_tipo}")
     logger.info(f"🧪 [PROCESSADOR] VENDAS PARA SALVAR: {len(vendas)}")
     logger.info(f"🧪 [PROCESSADOR] RECEBIMENTOS PARA SALVAR: {len(recebimentos)}")
@@ -160,13 +169,29 @@ def processar_normalizacoes(empresa_id: int, arquivo_id: int = None, dados_conta
         db.session.rollback()
         logger.error(f"❌ [PROCESSADOR] Commit final falhou: {str(e)}", exc_info=True)
 
+    tempo_total = time.perf_counter() - inicio
+    desempenho = {
+        "paginas": paginas,
+        "tamanho_pagina": tamanho_pagina,
+        "tempo_conversao_segundos": round(tempo_conversao, 3),
+        "tempo_total_segundos": round(tempo_total, 3),
+        "linhas_por_segundo": round(total / tempo_total, 1) if tempo_total > 0 else None,
+        "telemetria": telemetria.finalizar(),
+    }
+
+    logger.info(
+        f"⚡ [PROCESSADOR] {total} normalizações em {tempo_total:.2f}s "
+        f"({desempenho['linhas_por_segundo']} linhas/s, conversão {tempo_conversao:.2f}s)"
+    )
+
     retorno = {
         "vendas": stats_vendas,
         "recebimentos": stats_recebimentos,
+        "desempenho": desempenho,
         "debug": {
             "empresa_id": empresa_id,
             "arquivo_id": arquivo_id,
-            "normalizacoes_encontradas": len(normalizacoes),
+            "normalizacoes_encontradas": total,
             "tipos": contadores_tipo,
             "vendas_para_salvar": len(vendas),
             "recebimentos_para_salvar": len(recebimentos),
@@ -179,6 +204,52 @@ def processar_normalizacoes(empresa_id: int, arquivo_id: int = None, dados_conta
     return retorno
 
 
+def _paginar(query, tamanho_pagina):
+    """Páginas de normalizações por id crescente (keyset, sem OFFSET)"""
+    ultimo_id = 0
+    while True:
+        pagina = (
+            query.filter(Normalizacao.id > ultimo_id)
+            .order_by(Normalizacao.id)
+            .limit(tamanho_pagina)
+            .all()
+        )
+        if not pagina:
+            return
+        ultimo_id = pagina[-1].id
+        yield pagina
+        if len(pagina) < tamanho_pagina:
+            return
+
+
+def _aplicar_transicoes(transicoes):
+    """Um UPDATE por (status, erro_mensagem), com os ids da página"""
+    for (status, erro), ids in transicoes.items():
+        valores = {Normalizacao.status: status}
+        if erro is not None:
+            valores[Normalizacao.erro_mensagem] = erro
+        Normalizacao.query.filter(Normalizacao.id.in_(ids)).update(
+            valores, synchronize_session=False
+        )
+
+
+def _logar_amostra(pagina):
+    for n in pagina[:10]:
+        logger.info(
+            f"🧪 [PROCESSADOR] NORMALIZACAO SAMPLE: "
+            f"id={n.id}, arquivo_origem_id={getattr(n, 'arquivo_origem_id', None)}, "
+            f"tipo_movimento={getattr(n, 'tipo_movimento', None)}, "
+            f"tipo_origem={getattr(n, 'tipo_origem', None)}, "
+            f"status={getattr(n, 'status', None)}, "
+            f"valor_bruto={getattr(n, 'valor_bruto', None)}, "
+            f"valor_liquido={getattr(n, 'valor_liquido', None)}, "
+            f"categoria={getattr(n, 'categoria', None)}, "
+            f"tipo_pagamento={getattr(n, 'tipo_pagamento', None)}, "
+            f"data_movimento={getattr(n, 'data_movimento', None)}, "
+            f"descricao={str(getattr(n, 'descricao', '') or '')[:120]}"
+        )
+
+
 def _texto_norm(norm):
     return (
         getattr(norm, "descricao", None)
@@ -192,7 +263,7 @@ def _classificar(norm, valor):
     descricao = _texto_norm(norm)
     trntype = getattr(norm, "trntype", None)
 
-    logger.info(
+    logger.debug(
         f"🧪 [PROCESSADOR] Classificando: "
         f"id={getattr(norm, 'id', None)}, valor={valor}, trntype={trntype}, "
         f"descricao={str(descricao)[:120]}"
@@ -204,7 +275,7 @@ def _classificar(norm, valor):
         trntype=trntype
     )
 
-    logger.info(
+    logger.debug(
         f"🧪 [PROCESSADOR] Resultado classificação: "
         f"id={getattr(norm, 'id', None)}, resultado={resultado}"
     )
@@ -212,22 +283,47 @@ def _classificar(norm, valor):
     return resultado
 
 
-def _converter_para_venda(norm: Normalizacao) -> dict:
+def _classificar_pagina(pagina):
+    """
+    Classificação da página inteira numa chamada a classificar_lote (id →
+    resultado): descrições repetidas no extrato são analisadas uma vez.
+    Se o lote falhar, devolve vazio e cada linha é classificada sozinha na
+    conversão, com o erro atribuído à linha certa.
+    """
+    classificaveis = [
+        n for n in pagina
+        if getattr(n, "tipo_movimento", None) in ("venda", "recebimento", "pagamento")
+    ]
+    try:
+        resultados = classificador.classificar_lote(
+            (_texto_norm(n), float(n.valor_bruto or 0), getattr(n, "trntype", None))
+            for n in classificaveis
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ [PROCESSADOR] Classificação em lote falhou, seguindo linha a linha: {str(e)}")
+        return {}
+
+    logger.debug(f"🧪 [PROCESSADOR] Página classificada em lote: {len(resultados)} normalizações")
+    return {n.id: resultado for n, resultado in zip(classificaveis, resultados)}
+
+
+def _converter_para_venda(norm: Normalizacao, resultado: dict = None) -> dict:
     try:
-        logger.info(f"🧪 [PROCESSADOR] _converter_para_venda id={norm.id}")
+        logger.debug(f"🧪 [PROCESSADOR] _converter_para_venda id={norm.id}")
 
         if not norm.valor_bruto or norm.valor_bruto <= 0:
-            logger.warning(
+            logger.debug(
                 f"⚠️ [PROCESSADOR] Venda inválida sem valor positivo: "
                 f"id={norm.id}, valor_bruto={norm.valor_bruto}"
             )
             return None
 
         if not norm.data_movimento:
-            logger.warning(f"⚠️ [PROCESSADOR] Venda inválida sem data_movimento: id={norm.id}")
+            logger.debug(f"⚠️ [PROCESSADOR] Venda inválida sem data_movimento: id={norm.id}")
             return None
 
-        resultado = _classificar(norm, norm.valor_bruto)
+        if resultado is None:
+            resultado = _classificar(norm, norm.valor_bruto)
 
         item = {
             "adquirente": norm.adquirente_nome or "Flow",
@@ -251,7 +347,7 @@ def _converter_para_venda(norm: Normalizacao) -> dict:
             "classificacao_manual": False,
         }
 
-        logger.info(f"🧪 [PROCESSADOR] Venda item convertido id={norm.id}: {item}")
+        logger.debug(f"🧪 [PROCESSADOR] Venda item convertido id={norm.id}: {item}")
         return item
 
     except Exception as e:
@@ -259,15 +355,16 @@ def _converter_para_venda(norm: Normalizacao) -> dict:
         return None
 
 
-def _converter_para_recebimento(norm: Normalizacao) -> dict:
+def _converter_para_recebimento(norm: Normalizacao, resultado: dict = None) -> dict:
     try:
-        logger.info(f"🧪 [PROCESSADOR] _converter_para_recebimento id={norm.id}")
+        logger.debug(f"🧪 [PROCESSADOR] _converter_para_recebimento id={norm.id}")
 
         if norm.valor_bruto is None:
-            logger.warning(f"⚠️ [PROCESSADOR] Recebimento inválido sem valor_bruto: id={norm.id}")
+            logger.debug(f"⚠️ [PROCESSADOR] Recebimento inválido sem valor_bruto: id={norm.id}")
             return None
 
-        resultado = _classificar(norm, norm.valor_bruto)
+        if resultado is None:
+            resultado = _classificar(norm, norm.valor_bruto)
 
         categoria = resultado.get("categoria") or norm.categoria or "outros"
         tipo_pagamento = resultado.get("tipo_pagamento") or norm.tipo_pagamento or "outros"
@@ -300,7 +397,7 @@ def _converter_para_recebimento(norm: Normalizacao) -> dict:
             "classificacao_manual": False,
         }
 
-        logger.info(f"🧪 [PROCESSADOR] Recebimento item convertido id={norm.id}: {item}")
+        logger.debug(f"🧪 [PROCESSADOR] Recebimento item convertido id={norm.id}: {item}")
         return item
 
     except Exception as e:
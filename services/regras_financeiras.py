@@ -1,11 +1,14 @@
 # services/regras_financeiras.py
 # Carrega regras do JSON e fornece acesso otimizado
 
+import hashlib
 import json
 import os
 import logging
 from typing import Dict, List, Optional, Tuple
 
+from services.automato_palavras import AutomatoPalavras
+
 logger = logging.getLogger(__name__)
 
 _CONFIG_PATH = os.path.join(
@@ -25,6 +28,9 @@ class RegrasFinanceiras:
         self.config_path = config_path or _CONFIG_PATH
         self._dados = None
         self._indice_palavras = None  # Cache para busca rápida
+        self._automato_categorias = None  # Aho-Corasick das palavras de categorias
+        self._automato_tipos = None       # Aho-Corasick das palavras de tipo de pagamento
+        self.versao = ""                  # Hash do conteúdo (chave dos caches de classificação)
         self._carregar()
 
     def _carregar(self) -> None:
@@ -37,9 +43,11 @@ class RegrasFinanceiras:
         except FileNotFoundError:
             logger.warning(f"⚠️ Arquivo de regras não encontrado: {self.config_path}")
             self._dados = {"categorias": {}, "tipos_pagamento": {}, "aliases": {}}
+            self._construir_indice()
         except json.JSONDecodeError as e:
             logger.error(f"❌ Erro ao parsear JSON: {e}")
             self._dados = {"categorias": {}, "tipos_pagamento": {}, "aliases": {}}
+            self._construir_indice()
 
     def _construir_indice(self) -> None:
         """Constrói índice invertido palavra → categoria para busca O(1)."""
@@ -53,6 +61,49 @@ class RegrasFinanceiras:
                     "categoria": categoria,
                     "prioridade": dados.get("prioridade", 0)
                 })
+        self._construir_automatos()
+        self.versao = hashlib.sha1(
+            json.dumps(self._dados, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:12]
+
+    def _construir_automatos(self) -> None:
+        """
+        Compila as palavras-chave em autômatos (refeito a cada carga).
+
+        Cada padrão aponta para (ordem da regra, ordem da palavra na regra),
+        para que a busca devolva o mesmo que a varredura linear: regras na
+        ordem do JSON e, por regra, a primeira palavra da lista que aparece.
+        """
+        def compilar(regras_palavras):
+            padroes = {}
+            destinos = []
+            for ordem_regra, (_, palavras) in enumerate(regras_palavras):
+                for ordem_palavra, palavra in enumerate(palavras):
+                    palavra_upper = palavra.upper()
+                    if palavra_upper not in padroes:
+                        padroes[palavra_upper] = len(destinos)
+                        destinos.append([])
+                    destinos[padroes[palavra_upper]].append((ordem_regra, ordem_palavra))
+            return AutomatoPalavras(padroes), destinos, regras_palavras
+
+        self._automato_categorias = compilar([
+            (categoria, dados.get("palavras", [])) for categoria, dados in self.categorias.items()
+        ])
+        self._automato_tipos = compilar(list(self.tipos_pagamento.items()))
+
+    @staticmethod
+    def _buscar(automato_compilado, descricao_upper: str) -> List[Tuple[str, str]]:
+        """(regra, primeira palavra da regra encontrada), na ordem das regras"""
+        automato, destinos, regras_palavras = automato_compilado
+        primeira = {}
+        for indice in automato.encontrar(descricao_upper):
+            for ordem_regra, ordem_palavra in destinos[indice]:
+                if ordem_palavra < primeira.get(ordem_regra, ordem_palavra + 1):
+                    primeira[ordem_regra] = ordem_palavra
+        return [
+            (regras_palavras[ordem_regra][0], regras_palavras[ordem_regra][1][primeira[ordem_regra]])
+            for ordem_regra in sorted(primeira)
+        ]
 
     @property
     def categorias(self) -> Dict:
@@ -80,6 +131,18 @@ class RegrasFinanceiras:
             reverse=True
         )
 
+    def buscar_categorias(self, descricao_upper: str) -> List[Tuple[str, str]]:
+        """
+        Categorias com alguma palavra contida na descrição (já em maiúsculas),
+        numa única passada. Retorna [(categoria, palavra)] na ordem do JSON.
+        """
+        return self._buscar(self._automato_categorias, descricao_upper)
+
+    def buscar_tipo_pagamento(self, descricao_upper: str) -> Optional[str]:
+        """Primeiro tipo de pagamento (ordem do JSON) com palavra na descrição."""
+        encontrados = self._buscar(self._automato_tipos, descricao_upper)
+        return encontrados[0][0] if encontrados else None
+
     def get_categoria_info(self, categoria: str) -> Dict:
         """Retorna informações completas de uma categoria."""
         return self.categorias.get(categoria, {})
@@ -109,4 +172,4 @@ class RegrasFinanceiras:
 
 
 # Instância global
-regras = RegrasFinanceiras()
\ No newline at end of file
+regras = RegrasFinanceiras()
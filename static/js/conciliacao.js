@@ -136,8 +136,8 @@
             const csrfToken = getCsrfToken();
             
             try {
-                // ✅ Chamada REAL à API de conciliação
-                const response = await fetch('/api/v1/conciliacao/processar', {
+                // ✅ Enfileira a conciliação em background (retorna job_id)
+                const response = await fetch('/api/v1/conciliacao/jobs', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
@@ -148,32 +148,16 @@
                     })
                 });
                 
-                // Simular progresso visual enquanto aguarda resposta
-                let progressoVisual = 0;
-                const intervaloVisual = setInterval(() => {
-                    if (progressoVisual < 90 && !response.ok) {
-                        progressoVisual += Math.random() * 15;
-                        if (progressBar) progressBar.style.width = `${Math.min(progressoVisual, 90)}%`;
-                        if (progressPercent) progressPercent.textContent = `${Math.round(progressoVisual)}%`;
-                        
-                        if (progressoVisual > 30 && progressoVisual < 60 && progressText) {
-                            progressText.textContent = 'Analisando vendas...';
-                        } else if (progressoVisual >= 60 && progressText) {
-                            progressText.textContent = 'Comparando com recebimentos...';
-                        }
-                    }
-                }, 400);
-                
                 if (!response.ok) {
-                    clearInterval(intervaloVisual);
                     const errorData = await response.json().catch(() => ({}));
                     throw new Error(errorData.message || `HTTP ${response.status}: ${response.statusText}`);
                 }
                 
-                const data = await response.json();
-                clearInterval(intervaloVisual);
+                const { job_id: jobId } = await response.json();
+                
+                // ✅ Polling do progresso real até o job terminar
+                const job = await acompanharJob(jobId);
                 
-                // ✅ Atualizar UI com 100% de progresso
                 if (progressBar) progressBar.style.width = '100%';
                 if (progressPercent) progressPercent.textContent = '100%';
                 if (progressText) progressText.textContent = 'Conciliação concluída!';
@@ -184,10 +168,10 @@
                 if (progressDiv) progressDiv.style.display = 'none';
                 
                 // ✅ Mostrar resultado com estatísticas
-                if (data.ok && data.resultado) {
-                    mostrarResultadoConciliacao(data.resultado);
+                if (job.resultado) {
+                    mostrarResultadoConciliacao(job.resultado);
                 } else {
-                    throw new Error(data.message || 'Erro ao processar conciliação');
+                    throw new Error(job.erro || 'Erro ao processar conciliação');
                 }
                 
             } catch (error) {
@@ -233,6 +217,49 @@
             }
         };
         
+        // ✅ Consulta o job até concluir, atualizando a barra de progresso
+        const FASES_CONCILIACAO = {
+            na_fila: 'Aguardando na fila...',
+            iniciando: 'Carregando vendas e recebimentos...',
+            matching: 'Analisando vendas...',
+            multivenda: 'Comparando com recebimentos...',
+            finalizando: 'Finalizando...'
+        };
+        
+        async function acompanharJob(jobId) {
+            while (true) {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                
+                const response = await fetch(`/api/v1/conciliacao/jobs/${jobId}`);
+                if (!response.ok) {
+                    const errorData = await response.json().catch(() => ({}));
+                    throw new Error(errorData.message || `HTTP ${response.status}: ${response.statusText}`);
+                }
+                
+                const { job } = await response.json();
+                
+                if (job.status === 'concluido') return job;
+                if (job.status === 'erro' || job.status === 'interrompido') {
+                    throw new Error(job.erro || 'Conciliação interrompida. Tente novamente.');
+                }
+                
+                // Fase 1 ocupa 0-70%, fase 2 (multivenda) 70-95%
+                let percentual = job.percentual || 0;
+                if (job.fase === 'matching') percentual = percentual * 0.7;
+                else if (job.fase === 'multivenda') percentual = 70 + percentual * 0.25;
+                else if (job.fase === 'finalizando') percentual = 95;
+                
+                if (progressBar) progressBar.style.width = `${percentual}%`;
+                if (progressPercent) progressPercent.textContent = `${Math.round(percentual)}%`;
+                if (progressDiv) progressDiv.setAttribute('aria-valuenow', String(Math.round(percentual)));
+                if (progressText) {
+                    let texto = FASES_CONCILIACAO[job.fase] || 'Processando...';
+                    if (job.eta_segundos) texto += ` (~${Math.ceil(job.eta_segundos)}s)`;
+                    progressText.textContent = texto;
+                }
+            }
+        }
+        
         // ✅ Mostrar resultado com estatísticas
         function mostrarResultadoConciliacao(resultado) {
             if (!resultDiv || !statsDiv || !actionsPost) return;
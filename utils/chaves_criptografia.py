@@ -0,0 +1,104 @@
+# utils/chaves_criptografia.py
+# Chaves Fernet do conteúdo importado: validadas uma vez por processo, com rotação
+
+import logging
+import os
+import threading
+
+from cryptography.fernet import Fernet, MultiFernet
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# VARIÁVEIS DE AMBIENTE
+# ==========================================
+# ENCRYPTION_KEY          → chave atual (criptografa tudo que é novo)
+# ENCRYPTION_KEYS_ANTIGAS → chaves anteriores separadas por vírgula; só
+#                           descriptografam, então trocar a ENCRYPTION_KEY
+#                           não exige recriptografar o histórico
+VAR_CHAVE = "ENCRYPTION_KEY"
+VAR_CHAVES_ANTIGAS = "ENCRYPTION_KEYS_ANTIGAS"
+
+
+def _limpar_chave(chave):
+    # ✅ Remover aspas extras que podem vir do Render/Heroku
+    return chave.strip().strip('"').strip("'")
+
+
+def _criar_fernet(chave, origem):
+    """Fernet da chave, ou None (com log) se ela for inválida"""
+    chave = _limpar_chave(chave)
+    if len(chave) < 32:
+        logger.error(f"❌ {origem} muito curta ({len(chave)} chars), precisa de 32+ caracteres")
+        return None
+    try:
+        return Fernet(chave.encode())
+    except (ValueError, TypeError) as e:
+        logger.error(f"❌ {origem} inválida para Fernet: {str(e)}")
+        return None
+
+
+class GerenciadorChaves:
+    """
+    Mantém o MultiFernet pronto para o processo inteiro.
+
+    As variáveis de ambiente são relidas a cada chamada (leitura de dict),
+    mas as chaves só são validadas e o MultiFernet só é montado quando o
+    valor muda, então os avisos de chave ausente/inválida saem uma vez.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._estado = (None, None)      # (valores das variáveis, MultiFernet)
+        self._total_chaves = 0
+        self._recarregamentos = 0
+
+    def _carregar(self, atual, antigas):
+        if not atual:
+            logger.warning(f"⚠️ {VAR_CHAVE} não configurada, conteúdo sem criptografia")
+            return None, 0
+
+        principal = _criar_fernet(atual, VAR_CHAVE)
+        if principal is None:
+            return None, 0
+
+        chaves = [principal]
+        for posicao, chave in enumerate(c for c in (antigas or "").split(",") if c.strip()):
+            fernet = _criar_fernet(chave, f"{VAR_CHAVES_ANTIGAS}[{posicao}]")
+            if fernet is not None:
+                chaves.append(fernet)
+
+        logger.info(f"🔐 Chaves de criptografia carregadas: 1 atual + {len(chaves) - 1} antiga(s)")
+        return MultiFernet(chaves), len(chaves)
+
+    def fernet(self):
+        """MultiFernet (criptografa com a atual, lê com todas) ou None sem chave válida"""
+        assinatura = (os.getenv(VAR_CHAVE), os.getenv(VAR_CHAVES_ANTIGAS))
+        carregada, fernet = self._estado
+        if assinatura == carregada:
+            return fernet
+
+        with self._lock:
+            carregada, fernet = self._estado
+            if assinatura != carregada:
+                fernet, self._total_chaves = self._carregar(*assinatura)
+                self._estado = (assinatura, fernet)
+                self._recarregamentos += 1
+            return fernet
+
+    def invalidar(self):
+        """Força a revalidação das chaves na próxima chamada"""
+        with self._lock:
+            self._estado = (None, None)
+
+    @property
+    def stats(self):
+        return {
+            "configurada": self._estado[1] is not None,
+            "chaves": self._total_chaves,
+            "recarregamentos": self._recarregamentos,
+        }
+
+
+# Instância global
+gerenciador_chaves = GerenciadorChaves()
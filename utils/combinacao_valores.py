@@ -0,0 +1,192 @@
+# utils/combinacao_valores.py
+# Busca de combinação exata de valores (subset-sum) em centavos inteiros
+
+from decimal import Decimal, InvalidOperation, ROUND_FLOOR
+import logging
+import time
+from typing import List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CONFIGURAÇÕES (orçamento por recebimento)
+# ==========================================
+MAX_ESTADOS_DEFAULT = 200_000   # Somas parciais distintas mantidas em memória
+TEMPO_MAX_DEFAULT = 0.05        # Segundos por busca
+MAX_CANDIDATAS_DEFAULT = 300    # Vendas consideradas por recebimento
+MIN_ITENS_VETORIZADO = 24       # Abaixo disso o dict puro é mais rápido que o NumPy
+MAX_ALVO_VETORIZADO = 10_000_000   # Alvo máximo (centavos) do array de somas (~20 MB)
+
+
+def valor_em_centavos(valor) -> Optional[int]:
+    """
+    Converte valor monetário para inteiro em centavos.
+    Retorna None se o valor não for múltiplo exato de centavo (ou inválido),
+    para que o chamador use a comparação Decimal original.
+    """
+    try:
+        centavos = Decimal(str(valor or 0)) * 100
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+    if centavos != centavos.to_integral_value():
+        return None
+    return int(centavos)
+
+
+def tolerancia_em_centavos(tolerancia) -> int:
+    """
+    Tolerância em reais convertida para centavos inteiros, arredondando para
+    baixo. Diferenças entre valores em centavos são inteiras, então
+    |diferença| <= tolerância equivale a |diferença em centavos| <=
+    piso(tolerância * 100); o ruído de float (0.29 → 28.999...) é
+    descartado antes do piso.
+    """
+    try:
+        centavos = (Decimal(str(tolerancia or 0)) * 100).quantize(Decimal("0.000001"))
+    except (InvalidOperation, ValueError, TypeError):
+        return 0
+    return max(0, int(centavos.to_integral_value(rounding=ROUND_FLOOR)))
+
+
+def buscar_combinacao(
+    valores: Sequence[int],
+    alvo: int,
+    tolerancia: int = 0,
+    max_estados: int = MAX_ESTADOS_DEFAULT,
+    tempo_max: float = TEMPO_MAX_DEFAULT,
+) -> Optional[List[int]]:
+    """
+    Encontra um subconjunto de valores cuja soma fica em [alvo - tolerancia, alvo + tolerancia].
+
+    Programação dinâmica esparsa sobre as somas alcançáveis (em centavos).
+    Prefere soma exata; sem soma exata, devolve a mais próxima do alvo.
+
+    Args:
+        valores: Valores em centavos (inteiros positivos)
+        alvo: Valor do recebimento em centavos
+        tolerancia: Diferença máxima aceita, em centavos
+        max_estados: Limite de somas parciais em memória (estoura → None)
+        tempo_max: Limite de tempo em segundos (estoura → None)
+
+    Returns:
+        Lista de índices (em `valores`) da combinação, ou None
+    """
+    if alvo <= 0:
+        return None
+
+    limite = alvo + tolerancia
+    itens = [(i, v) for i, v in enumerate(valores) if v and 0 < v <= limite]
+    if sum(v for _, v in itens) < alvo - tolerancia:
+        return None
+
+    deadline = time.perf_counter() + tempo_max
+
+    if (
+        np is not None
+        and len(itens) >= MIN_ITENS_VETORIZADO
+        and alvo + tolerancia <= MAX_ALVO_VETORIZADO
+    ):
+        return _buscar_combinacao_vetorizada(itens, alvo, tolerancia, max_estados, deadline)
+
+    # soma → (soma_anterior, índice do item que levou a esta soma)
+    estados = {0: None}
+
+    for i, v in itens:
+        if time.perf_counter() > deadline:
+            logger.debug(f"⏱️ Combinação: tempo esgotado (alvo={alvo}, estados={len(estados)})")
+            return None
+
+        novos = []
+        for s in estados:
+            nova = s + v
+            if nova <= limite and nova not in estados:
+                novos.append(nova)
+
+        for nova in novos:
+            if nova not in estados:
+                estados[nova] = (nova - v, i)
+                if nova == alvo:
+                    return _reconstruir(estados, nova)
+
+        if len(estados) > max_estados:
+            logger.debug(f"⚠️ Combinação: limite de estados atingido (alvo={alvo})")
+            return None
+
+    melhor = None
+    for s in estados:
+        if s and abs(s - alvo) <= tolerancia:
+            if melhor is None or abs(s - alvo) < abs(melhor - alvo):
+                melhor = s
+
+    return _reconstruir(estados, melhor) if melhor is not None else None
+
+
+def _reconstruir(estados: dict, soma: int) -> List[int]:
+    """Percorre os ponteiros de volta até a soma zero"""
+    indices = []
+    while estados[soma] is not None:
+        anterior, i = estados[soma]
+        indices.append(i)
+        soma = anterior
+    indices.reverse()
+    return indices
+
+
+def _buscar_combinacao_vetorizada(itens, alvo: int, tolerancia: int, max_estados: int, deadline: float):
+    """
+    Mesma busca de buscar_combinacao com as somas em arrays NumPy.
+
+    As somas ficam na ordem de inserção do dict da versão pura e cada uma
+    guarda o item que a criou (array indexado pela soma, que também faz o
+    papel do `in estados`), então a combinação devolvida é a mesma.
+    """
+    limite = alvo + tolerancia
+    somas = np.zeros(1, dtype=np.int64)
+    tipo = np.int16 if itens[-1][0] < np.iinfo(np.int16).max else np.int32
+    origem = np.full(limite + 1, -1, dtype=tipo)   # soma → item que a criou (-1 = não alcançada)
+    origem[0] = -2
+
+    for i, v in itens:
+        if time.perf_counter() > deadline:
+            logger.debug(f"⏱️ Combinação: tempo esgotado (alvo={alvo}, estados={len(somas)})")
+            return None
+
+        candidatas = somas + v
+        candidatas = candidatas[candidatas <= limite]
+        novas = candidatas[origem[candidatas] == -1]
+
+        if novas.size:
+            origem[novas] = i
+            somas = np.concatenate((somas, novas))
+            if origem[alvo] != -1:
+                return _reconstruir_vetorizado(origem, itens, alvo)
+
+        if len(somas) > max_estados:
+            logger.debug(f"⚠️ Combinação: limite de estados atingido (alvo={alvo})")
+            return None
+
+    distancias = np.abs(somas - alvo)
+    validas = (somas != 0) & (distancias <= tolerancia)
+    if not validas.any():
+        return None
+
+    # Primeira soma (ordem de inserção) com a menor distância, como no laço puro
+    melhor = int(somas[np.argmin(np.where(validas, distancias, tolerancia + 1))])
+    return _reconstruir_vetorizado(origem, itens, melhor)
+
+
+def _reconstruir_vetorizado(origem, itens, soma: int) -> List[int]:
+    """Volta pelos itens que criaram cada soma até chegar a zero"""
+    valores = dict(itens)
+    indices = []
+    while soma:
+        i = int(origem[soma])
+        indices.append(i)
+        soma -= valores[i]
+    indices.reverse()
+    return indices
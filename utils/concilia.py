@@ -6,6 +6,10 @@ import logging
 from typing import List, Dict, Any, Optional, Set
 from datetime import datetime, timedelta
 
+from utils.combinacao_valores import (
+    valor_em_centavos, tolerancia_em_centavos, buscar_combinacao, MAX_CANDIDATAS_DEFAULT,
+)
+
 logger = logging.getLogger(__name__)
 
 # ==========================================
@@ -458,6 +462,7 @@ def conciliar(
         "qtd_recebimentos": len(recebimentos),
         "qtd_conciliados_ok": len([c for c in conciliados if c["status"] == "OK"]),
         "qtd_conciliados_divergentes": len([c for c in conciliados if c["status"] != "OK"]),
+        "qtd_multivendas_otimizadas": len([c for c in conciliados if c.get("metodo_multivenda") == "otimizado"]),
         "qtd_pendentes_vendas": len(pendentes_vendas),
         "qtd_pendentes_recebimentos": len(pendentes_recebimentos),
         "taxa_conciliacao": round(
@@ -597,6 +602,16 @@ def _tentar_multivenda(
             if abs(soma - valor_rec) <= tol_centavos:
                 break
         
+        metodo = "greedy"
+        
+        # Greedy não fechou → busca combinação exata (subset-sum em centavos)
+        if not combinacao or abs(soma - valor_rec) > tol_centavos:
+            otima = _buscar_combinacao_otima(candidatas, valor_rec, tol_centavos)
+            if otima:
+                combinacao = otima
+                soma = sum((_to_decimal(v.get("valor")) for v in combinacao), Decimal("0"))
+                metodo = "otimizado"
+        
         # Se encontrou combinação válida
         if combinacao and abs(soma - valor_rec) <= tol_centavos:
             # Registrar conciliação multi-venda
@@ -607,6 +622,7 @@ def _tentar_multivenda(
                 "diferenca": str(valor_rec - soma),
                 "status": "OK" if abs(valor_rec - soma) <= tol_centavos else "DIVERGENTE",
                 "tipo_match": "MULTIVENDA",
+                "metodo_multivenda": metodo,
                 "qtd_vendas": len(combinacao),
                 "nsus_combinados": [v.get("nsu") for v in combinacao],
                 "data_recebimento": rec.get("data"),
@@ -624,3 +640,31 @@ def _tentar_multivenda(
             logger.debug(f"✅ Multi-venda: {len(combinacao)} vendas → 1 recebimento, NSU={rec.get('nsu')}")
     
     return conciliados, pendentes
+
+
+def _buscar_combinacao_otima(
+    candidatas: List[Dict],
+    valor_rec: Decimal,
+    tol_centavos: Decimal
+) -> Optional[List[Dict]]:
+    """
+    Encontra o conjunto de vendas cuja soma bate com o recebimento
+    dentro da tolerância (subset-sum em centavos inteiros, com orçamento).
+    """
+    alvo = valor_em_centavos(valor_rec)
+    if not alvo or alvo <= 0:
+        return None
+    
+    vendas_validas = []
+    valores = []
+    for v in candidatas[:MAX_CANDIDATAS_DEFAULT]:
+        centavos = valor_em_centavos(_to_decimal(v.get("valor")))
+        if centavos is None or centavos <= 0:
+            continue
+        vendas_validas.append(v)
+        valores.append(centavos)
+    
+    indices = buscar_combinacao(valores, alvo, tolerancia=tolerancia_em_centavos(tol_centavos))
+    if not indices:
+        return None
+    return [vendas_validas[i] for i in indices]
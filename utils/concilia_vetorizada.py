@@ -0,0 +1,477 @@
+# utils/concilia_vetorizada.py
+# Motor vetorizado (NumPy) para utils.concilia.conciliar
+#
+# Converte as entradas UMA vez para arrays colunares (centavos int64, dia
+# ordinal, código de adquirente) e calcula os scores com broadcasting.
+# A saída é idêntica à de conciliar(); se o NumPy não estiver instalado ou
+# algum valor não for múltiplo exato de centavo, delega para conciliar().
+
+from decimal import Decimal
+import logging
+from typing import List, Dict, Any, Optional
+
+from utils.concilia import (
+    conciliar,
+    _to_decimal,
+    _parse_data_br,
+    _criar_pendente_venda,
+    TOLERANCIA_CENTAVOS_DEFAULT,
+    TOLERANCIA_DIAS_DEFAULT,
+)
+from utils.combinacao_valores import valor_em_centavos, buscar_combinacao, MAX_CANDIDATAS_DEFAULT
+
+try:
+    import numpy as np
+    NUMPY_DISPONIVEL = True
+except ImportError:
+    np = None
+    NUMPY_DISPONIVEL = False
+
+logger = logging.getLogger(__name__)
+
+DIA_INVALIDO = -1  # Sem data ou data não parseada → sempre compatível
+
+
+# ==========================================
+# Conversão para colunas
+# ==========================================
+class _Colunas:
+    """Representação colunar de uma lista de vendas ou recebimentos"""
+
+    def __init__(self, registros: List[Dict[str, Any]], cache_datas: Dict, codigos_adq: Dict):
+        n = len(registros)
+        self.decimais = [_to_decimal(r.get("valor")) for r in registros]
+        self.nsus = [str(r.get("nsu") or "").strip() for r in registros]
+
+        centavos = [valor_em_centavos(d) for d in self.decimais]
+        self.exato = all(c is not None for c in centavos)
+        self.centavos = np.array([c or 0 for c in centavos], dtype=np.int64)
+
+        dias = np.full(n, DIA_INVALIDO, dtype=np.int64)
+        for i, r in enumerate(registros):
+            data = r.get("data")
+            if not data:
+                continue
+            if data not in cache_datas:
+                parsed = _parse_data_br(data)
+                cache_datas[data] = parsed.date().toordinal() if parsed else DIA_INVALIDO
+            dias[i] = cache_datas[data]
+        self.dias = dias
+
+        # Código 0 = sem adquirente; demais = string em maiúsculas
+        adq = np.zeros(n, dtype=np.int64)
+        for i, r in enumerate(registros):
+            nome = r.get("adquirente")
+            if nome:
+                adq[i] = codigos_adq.setdefault(nome.upper(), len(codigos_adq) + 1)
+        self.adq = adq
+
+
+def _tabela_score_adquirente(codigos_adq: Dict[str, int]):
+    """Score de adquirente (0 / 0.1 / 0.2) por par de códigos"""
+    nomes = {c: nome for nome, c in codigos_adq.items()}
+    tamanho = len(codigos_adq) + 1
+    tabela = np.zeros((tamanho, tamanho), dtype=np.float64)
+    for a in range(1, tamanho):
+        for b in range(1, tamanho):
+            if a == b:
+                tabela[a, b] = 0.2
+            elif nomes[a] in nomes[b] or nomes[b] in nomes[a]:
+                tabela[a, b] = 0.1
+    return tabela
+
+
+def _scores(cent_v, dias_v, adq_v, cent_r, dias_r, adq_r, tol_c, tol_d, tabela_adq):
+    """
+    Mesmo cálculo de _calcular_score_match, elemento a elemento.
+    A ordem das somas (valor → data → adquirente) é mantida para que o
+    float resultante seja bit a bit igual ao da versão escalar.
+    """
+    diff = np.abs(cent_r - cent_v)
+    score = np.where(diff == 0, 0.5,
+            np.where(diff <= tol_c, 0.4,
+            np.where(diff <= 2 * tol_c, 0.2, 0.0)))
+
+    sem_data = (dias_v == DIA_INVALIDO) | (dias_r == DIA_INVALIDO)
+    dd = np.abs(dias_v - dias_r)
+    score = score + np.where(sem_data | (dd <= tol_d), 0.3,
+                    np.where(dd <= 2 * tol_d, 0.15, 0.0))
+
+    return score + tabela_adq[adq_v, adq_r]
+
+
+# ==========================================
+# Motor principal
+# ==========================================
+def conciliar_vetorizado(
+    vendas: List[Dict[str, Any]],
+    recebimentos: List[Dict[str, Any]],
+    tolerancia_centavos: Decimal = TOLERANCIA_CENTAVOS_DEFAULT,
+    tolerancia_dias: int = TOLERANCIA_DIAS_DEFAULT,
+    permitir_multivenda: bool = True
+) -> Dict[str, Any]:
+    """
+    Mesma interface e mesma saída de utils.concilia.conciliar, com:
+    - parse de valores/datas uma única vez por registro (não por par)
+    - scores da fase NSU calculados de uma vez para todos os pares
+    - candidatas da multivenda por blocos de data (searchsorted) em vez de
+      varrer todas as vendas para cada recebimento
+    """
+    tol_c = valor_em_centavos(tolerancia_centavos)
+    if not NUMPY_DISPONIVEL or tol_c is None:
+        return conciliar(vendas, recebimentos, tolerancia_centavos, tolerancia_dias, permitir_multivenda)
+
+    logger.info(f"🔍 Iniciando conciliação vetorizada: {len(vendas)} vendas, {len(recebimentos)} recebimentos")
+
+    cache_datas: Dict[Any, int] = {}
+    codigos_adq: Dict[str, int] = {}
+    cv = _Colunas(vendas, cache_datas, codigos_adq)
+    cr = _Colunas(recebimentos, cache_datas, codigos_adq)
+
+    if not (cv.exato and cr.exato):
+        logger.debug("Valores fora do padrão de centavos: usando conciliar() escalar")
+        return conciliar(vendas, recebimentos, tolerancia_centavos, tolerancia_dias, permitir_multivenda)
+
+    tabela_adq = _tabela_score_adquirente(codigos_adq)
+
+    # Índice NSU → posições globais dos recebimentos (na ordem original)
+    rec_por_nsu: Dict[str, List[int]] = {}
+    for j, nsu in enumerate(cr.nsus):
+        if nsu:
+            rec_por_nsu.setdefault(nsu, []).append(j)
+
+    chaves_venda = [f"{cv.nsus[i]}:{v.get('data')}:{v.get('valor')}" for i, v in enumerate(vendas)]
+    # A multivenda do original monta a chave com o NSU sem strip
+    chaves_brutas = [f"{v.get('nsu')}:{v.get('data')}:{v.get('valor')}" for v in vendas]
+
+    # ==========================================
+    # FASE 1: scores de todos os pares (venda, recebimento de mesmo NSU)
+    # ==========================================
+    inicio_pares = [0] * (len(vendas) + 1)
+    pares_v, pares_r, pares_local = [], [], []
+    for i, nsu in enumerate(cv.nsus):
+        grupo = rec_por_nsu.get(nsu) if nsu else None
+        if grupo:
+            pares_v.extend([i] * len(grupo))
+            pares_r.extend(grupo)
+            pares_local.extend(range(len(grupo)))
+        inicio_pares[i + 1] = len(pares_r)
+
+    if pares_r:
+        pv = np.array(pares_v, dtype=np.int64)
+        pr = np.array(pares_r, dtype=np.int64)
+        scores_pares = _scores(
+            cv.centavos[pv], cv.dias[pv], cv.adq[pv],
+            cr.centavos[pr], cr.dias[pr], cr.adq[pr],
+            tol_c, tolerancia_dias, tabela_adq
+        ).tolist()
+    else:
+        scores_pares = []
+
+    vendas_conciliadas = set()
+    # Como em conciliar(): na fase 1 guarda a posição do recebimento DENTRO
+    # do grupo do NSU, e as fases seguintes leem o mesmo conjunto.
+    recebimentos_usados = set()
+
+    conciliados = []
+    pendentes_vendas = []
+
+    for i, v in enumerate(vendas):
+        nsu = cv.nsus[i]
+        chave_venda = chaves_venda[i]
+
+        if chave_venda in vendas_conciliadas:
+            continue
+
+        ini, fim = inicio_pares[i], inicio_pares[i + 1]
+        if ini == fim:
+            pendentes_vendas.append(_criar_pendente_venda(v, "SEM_RECEBIMENTO_NSU"))
+            continue
+
+        melhor_score = -1
+        melhor = None
+        for p in range(ini, fim):
+            local = pares_local[p]
+            if local in recebimentos_usados:
+                continue
+            if scores_pares[p] > melhor_score:
+                melhor_score = scores_pares[p]
+                melhor = p
+
+        if melhor is None or melhor_score < 0.5:
+            pendentes_vendas.append(_criar_pendente_venda(v, "SEM_MATCH_CONFIÁVEL"))
+            continue
+
+        j = pares_r[melhor]
+        r = recebimentos[j]
+        recebimentos_usados.add(pares_local[melhor])
+        vendas_conciliadas.add(chave_venda)
+
+        val_v = cv.decimais[i]
+        val_r = cr.decimais[j]
+        diff = val_r - val_v
+
+        status = "OK" if abs(diff) <= tolerancia_centavos else "DIVERGENTE"
+
+        conciliados.append({
+            "nsu": nsu,
+            "valor_venda": str(val_v),
+            "valor_recebido": str(val_r),
+            "diferenca": str(diff),
+            "status": status,
+            "score_match": round(melhor_score, 2),
+            "data_venda": v.get("data"),
+            "data_recebimento": r.get("data"),
+            "bandeira": v.get("bandeira") or r.get("bandeira"),
+            "adquirente": v.get("adquirente") or r.get("adquirente"),
+            "tipo_pagamento": v.get("tipo_pagamento", "cartao"),
+            "fonte_venda": v.get("fonte"),
+            "fonte_recebimento": r.get("fonte"),
+            "descricao_recebimento": r.get("descricao"),
+        })
+
+        if status != "OK":
+            pendentes_vendas.append(_criar_pendente_venda(v, "VALOR_DIFERENTE"))
+
+    # ==========================================
+    # FASE 2: Multi-venda por blocos de data
+    # ==========================================
+    if permitir_multivenda:
+        conciliados.extend(_multivenda_vetorizada(
+            vendas, recebimentos, cv, cr, chaves_brutas,
+            vendas_conciliadas, recebimentos_usados,
+            tol_c, tolerancia_centavos, tolerancia_dias
+        ))
+
+    # ==========================================
+    # Recebimentos sobrantes
+    # ==========================================
+    pendentes_recebimentos = []
+    for idx, r in enumerate(recebimentos):
+        if idx in recebimentos_usados:
+            continue
+        pendentes_recebimentos.append({
+            "nsu": r.get("nsu"),
+            "data": r.get("data"),
+            "valor": str(cr.decimais[idx]),
+            "adquirente": r.get("adquirente"),
+            "descricao": r.get("descricao"),
+            "fonte": r.get("fonte"),
+            "motivo": "RECEBIMENTO_SEM_VENDA_CORRESPONDENTE",
+        })
+
+    # ==========================================
+    # Resumo estatístico
+    # ==========================================
+    total_vendas = sum(cv.decimais)
+    total_recebimentos = sum(cr.decimais)
+    qtd_ok = len([c for c in conciliados if c["status"] == "OK"])
+
+    resumo = {
+        "total_vendas": str(total_vendas),
+        "total_recebimentos": str(total_recebimentos),
+        "diferenca_geral": str(total_recebimentos - total_vendas),
+        "qtd_vendas": len(vendas),
+        "qtd_recebimentos": len(recebimentos),
+        "qtd_conciliados_ok": qtd_ok,
+        "qtd_conciliados_divergentes": len(conciliados) - qtd_ok,
+        "qtd_multivendas_otimizadas": len([c for c in conciliados if c.get("metodo_multivenda") == "otimizado"]),
+        "qtd_pendentes_vendas": len(pendentes_vendas),
+        "qtd_pendentes_recebimentos": len(pendentes_recebimentos),
+        "taxa_conciliacao": round(qtd_ok / max(len(vendas), 1) * 100, 2),
+    }
+
+    logger.info(f"✅ Conciliação vetorizada concluída: {qtd_ok}/{len(vendas)} conciliados ({resumo['taxa_conciliacao']}%)")
+
+    return {
+        "resumo": resumo,
+        "conciliados": conciliados,
+        "pendentes_vendas": pendentes_vendas,
+        "pendentes_recebimentos": pendentes_recebimentos,
+    }
+
+
+def _multivenda_vetorizada(
+    vendas, recebimentos, cv, cr, chaves_venda,
+    vendas_conciliadas, recebimentos_usados,
+    tol_c, tol_centavos, tol_dias
+) -> List[Dict[str, Any]]:
+    """
+    Equivalente a utils.concilia._tentar_multivenda.
+
+    As candidatas de cada recebimento saem de uma fatia das vendas ordenadas
+    por dia (mais as vendas sem data), e a ordem final (valor desc, posição
+    original asc) é a mesma do sort estável da versão escalar.
+    """
+    # Disponibilidade calculada uma vez, antes do laço (como no original)
+    disponivel = np.array([c not in vendas_conciliadas for c in chaves_venda], dtype=bool)
+
+    com_data = np.flatnonzero(cv.dias != DIA_INVALIDO)
+    ordem_dia = com_data[np.argsort(cv.dias[com_data], kind="stable")]
+    dias_ordenados = cv.dias[ordem_dia]
+    sem_data = np.flatnonzero(cv.dias == DIA_INVALIDO)
+    todas = np.arange(len(vendas), dtype=np.int64)
+
+    # Posição de cada venda na ordem (valor desc, posição asc): ordenar as
+    # candidatas vira um sort de inteiros
+    por_rank = np.lexsort((todas, -cv.centavos))
+    rank = np.empty_like(por_rank)
+    rank[por_rank] = todas
+
+    # Como a disponibilidade não muda dentro do laço, recebimentos do mesmo
+    # dia e mesma adquirente têm exatamente as mesmas candidatas: agrupa por
+    # (dia, adquirente), monta as candidatas uma vez por grupo e no fim
+    # devolve os resultados na ordem original dos recebimentos.
+    grupos: Dict[tuple, List[int]] = {}
+    for idx_rec, rec in enumerate(recebimentos):
+        if idx_rec in recebimentos_usados or not rec.get("nsu"):
+            continue
+        chave = (int(cr.dias[idx_rec]), int(cr.adq[idx_rec]))
+        grupos.setdefault(chave, []).append(idx_rec)
+
+    resultados = []
+    for chave, indices_rec in grupos.items():
+        cand, valores = _candidatas_multivenda(
+            chave, cv, disponivel, ordem_dia, dias_ordenados, sem_data, todas,
+            por_rank, rank, tol_dias
+        )
+        if cand.size == 0:
+            continue
+        for idx_rec in indices_rec:
+            item = _multivenda_recebimento(
+                idx_rec, recebimentos[idx_rec], cand, valores, vendas, cv, cr,
+                chaves_venda, vendas_conciliadas, recebimentos_usados, tol_c, tol_centavos
+            )
+            if item:
+                resultados.append((idx_rec, item))
+
+    resultados.sort(key=lambda par: par[0])
+    return [item for _, item in resultados]
+
+
+def _multivenda_recebimento(
+    idx_rec, rec, cand, valores, vendas, cv, cr,
+    chaves_venda, vendas_conciliadas, recebimentos_usados, tol_c, tol_centavos
+) -> Optional[Dict[str, Any]]:
+    """Greedy + combinação exata para um recebimento (corpo do laço original)"""
+    alvo = int(cr.centavos[idx_rec])
+
+    combinacao = _greedy(valores, alvo, tol_c)
+    soma_c = int(valores[combinacao].sum()) if combinacao else 0
+    metodo = "greedy"
+
+    if not combinacao or abs(soma_c - alvo) > tol_c:
+        otima = _combinacao_otima(valores, alvo, tol_c)
+        if otima:
+            combinacao = otima
+            metodo = "otimizado"
+
+    if not combinacao:
+        return None
+
+    escolhidas = [int(cand[p]) for p in combinacao]
+    soma = sum((cv.decimais[i] for i in escolhidas), Decimal("0"))
+    valor_rec = cr.decimais[idx_rec]
+
+    if abs(soma - valor_rec) > tol_centavos:
+        return None
+
+    recebimentos_usados.add(idx_rec)
+    for i in escolhidas:
+        vendas_conciliadas.add(chaves_venda[i])
+
+    return {
+        "nsu": rec.get("nsu"),
+        "valor_venda": str(soma),
+        "valor_recebido": str(valor_rec),
+        "diferenca": str(valor_rec - soma),
+        "status": "OK",
+        "tipo_match": "MULTIVENDA",
+        "metodo_multivenda": metodo,
+        "qtd_vendas": len(escolhidas),
+        "nsus_combinados": [vendas[i].get("nsu") for i in escolhidas],
+        "data_recebimento": rec.get("data"),
+        "adquirente": rec.get("adquirente"),
+        "fonte_recebimento": rec.get("fonte"),
+        "descricao_recebimento": rec.get("descricao"),
+    }
+
+
+def _candidatas_multivenda(chave, cv, disponivel, ordem_dia, dias_ordenados, sem_data, todas,
+                           por_rank, rank, tol_dias):
+    """
+    Vendas candidatas para um recebimento (dia, adquirente), já na ordem
+    (valor desc, posição original asc) do sort estável da versão escalar.
+
+    Returns:
+        (posições das vendas, valores em centavos)
+    """
+    dia_rec, adq_rec = chave
+
+    if dia_rec == DIA_INVALIDO:
+        cand = todas
+    else:
+        lo = np.searchsorted(dias_ordenados, dia_rec - tol_dias, side="left")
+        hi = np.searchsorted(dias_ordenados, dia_rec + tol_dias, side="right")
+        cand = np.concatenate((ordem_dia[lo:hi], sem_data))
+
+    filtro = disponivel[cand]
+    if adq_rec:
+        adq_cand = cv.adq[cand]
+        filtro &= (adq_cand == 0) | (adq_cand == adq_rec)
+    cand = cand[filtro]
+
+    cand = por_rank[np.sort(rank[cand])]
+    return cand, cv.centavos[cand]
+
+
+def _greedy(valores, alvo: int, tol_c: int) -> List[int]:
+    """
+    Greedy do _tentar_multivenda sobre valores já em ordem decrescente.
+    Em vez de testar item a item, salta direto (searchsorted) para o
+    próximo valor que ainda cabe no que falta.
+    """
+    negativos = -valores
+    n = len(valores)
+    soma = 0
+    escolhidas = []
+
+    # Primeiro item: o original testa a parada mesmo se ele não couber
+    if valores[0] <= alvo + tol_c:
+        soma = int(valores[0])
+        escolhidas.append(0)
+    if abs(soma - alvo) <= tol_c:
+        return escolhidas
+
+    pos = 1
+    while pos < n:
+        limite = alvo + tol_c - soma
+        pos += int(np.searchsorted(negativos[pos:], -limite, side="left"))
+        if pos >= n:
+            break
+        soma += int(valores[pos])
+        escolhidas.append(pos)
+        if abs(soma - alvo) <= tol_c:
+            break
+        pos += 1
+
+    return escolhidas
+
+
+def _combinacao_otima(valores, alvo: int, tol_c: int) -> Optional[List[int]]:
+    """Equivalente a utils.concilia._buscar_combinacao_otima, em centavos"""
+    if not alvo or alvo <= 0:
+        return None
+
+    posicoes = []
+    centavos = []
+    for p, c in enumerate(valores[:MAX_CANDIDATAS_DEFAULT].tolist()):
+        if c <= 0:
+            continue
+        posicoes.append(p)
+        centavos.append(c)
+
+    indices = buscar_combinacao(centavos, alvo, tolerancia=tol_c)
+    if not indices:
+        return None
+    return [posicoes[i] for i in indices]
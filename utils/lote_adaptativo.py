@@ -0,0 +1,95 @@
+# utils/lote_adaptativo.py
+# Tamanho de lote guiado pela latência real das idas ao banco
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CONFIGURAÇÕES (sobrescrevíveis por env)
+# ==========================================
+LOTE_INICIAL = int(os.getenv("IMPORT_LOTE_INICIAL", 200))
+LOTE_MINIMO = int(os.getenv("IMPORT_LOTE_MINIMO", 25))
+LOTE_MAXIMO = int(os.getenv("IMPORT_LOTE_MAXIMO", 2000))
+LATENCIA_ALVO = float(os.getenv("IMPORT_LATENCIA_ALVO", 0.5))   # Segundos por ida ao banco
+
+
+class LoteAdaptativo:
+    """
+    Controle de backpressure por latência (AIMD).
+
+    Cada lote gravado informa quanto tempo o banco levou. Acima da latência
+    alvo o lote cai pela metade (banco saturado ou transação longa demais);
+    abaixo de metade do alvo ele cresce de forma aditiva. Assim cada commit
+    fica perto do alvo sem pausas fixas entre lotes.
+    """
+
+    def __init__(self, inicial=None, minimo=None, maximo=None, latencia_alvo=None, nome="lote"):
+        self.minimo = max(1, minimo or LOTE_MINIMO)
+        self.maximo = max(self.minimo, maximo or LOTE_MAXIMO)
+        self.tamanho = min(max(inicial or LOTE_INICIAL, self.minimo), self.maximo)
+        self.passo = max(1, self.tamanho // 2)
+        self.latencia_alvo = latencia_alvo or LATENCIA_ALVO
+        self.nome = nome
+
+        self.lotes = 0
+        self.registros = 0
+        self.tempo_banco = 0.0
+        self.maior_latencia = 0.0
+        self.reducoes = 0
+
+    def registrar(self, latencia, quantidade):
+        """Registra a latência de um lote e ajusta o tamanho do próximo"""
+        self.lotes += 1
+        self.registros += quantidade
+        self.tempo_banco += latencia
+        self.maior_latencia = max(self.maior_latencia, latencia)
+
+        anterior = self.tamanho
+        if latencia > self.latencia_alvo:
+            self.tamanho = max(self.minimo, self.tamanho // 2)
+            self.reducoes += 1
+        elif latencia < self.latencia_alvo / 2 and quantidade >= self.tamanho:
+            self.tamanho = min(self.maximo, self.tamanho + self.passo)
+
+        if self.tamanho != anterior:
+            logger.debug(
+                f"📏 [{self.nome}] latência={latencia:.3f}s → lote {anterior} → {self.tamanho}"
+            )
+
+    @contextmanager
+    def medir(self, quantidade):
+        """Mede o bloco (flush/commit) e registra a latência observada"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(time.perf_counter() - inicio, quantidade)
+
+    def resumo(self):
+        return {
+            "lotes": self.lotes,
+            "registros": self.registros,
+            "tamanho_lote_final": self.tamanho,
+            "reducoes_lote": self.reducoes,
+            "tempo_banco_segundos": round(self.tempo_banco, 3),
+            "maior_latencia_segundos": round(self.maior_latencia, 3),
+        }
+
+
+def em_lotes(iteravel, controle):
+    """
+    Agrupa um iterável em listas do tamanho corrente do controle.
+    O tamanho é relido a cada lote, então segue os ajustes de latência.
+    """
+    lote = []
+    for item in iteravel:
+        lote.append(item)
+        if len(lote) >= controle.tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
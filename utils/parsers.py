@@ -1,5 +1,6 @@
 # utils/parsers.py - VERSÃO FINAL COM CLASSIFICADOR FINANCEIRO INTEGRADO
 
+import codecs
 import csv
 import io
 import re
@@ -125,6 +126,25 @@ def normalize_row(row: dict):
             "categoria": "outros"
         }
     
+    new = _normalizar_campos(row)
+    
+    # ============================================================
+    # ✅ CLASSIFICADOR FINANCEIRO (NOVO MOTOR)
+    # ============================================================
+    from services.classificador_financeiro import classificador
+    
+    descricao, valor, trntype = _entrada_classificacao(new)
+    resultado = classificador.classificar(
+        descricao=descricao,
+        valor=valor,
+        trntype=trntype
+    )
+    
+    return _aplicar_classificacao(new, resultado)
+
+
+def _normalizar_campos(row: dict):
+    """Campos da linha padronizados (valor, data, descrição...), sem classificar"""
     new = {}
     valor_alternativo = None
     
@@ -192,23 +212,21 @@ def normalize_row(row: dict):
     if "tipo_pagamento" not in new or new["tipo_pagamento"] in ("cartao", "outros"):
         new["tipo_pagamento"] = inferir_tipo_pagamento_ofx(new)
     
-    # ============================================================
-    # ✅ CLASSIFICADOR FINANCEIRO (NOVO MOTOR)
-    # ============================================================
-    from services.classificador_financeiro import classificador
-    
+    return new
+
+
+def _entrada_classificacao(new: dict):
+    """(descricao, valor, trntype) que vão para o classificador"""
     descricao_completa = new.get("descricao", "")
     name = new.get("name", "")
     valor = new.get("valor", Decimal("0"))
     trntype = new.get("trntype", "")
+    return f"{descricao_completa} {name}", float(valor), trntype
+
+
+def _aplicar_classificacao(new: dict, resultado: dict):
     tipo_pagamento = new.get("tipo_pagamento", "outros")
     
-    resultado = classificador.classificar(
-        descricao=f"{descricao_completa} {name}",
-        valor=float(valor),
-        trntype=trntype
-    )
-    
     new["categoria"] = resultado["categoria"]
     new["tipo_pagamento"] = resultado["tipo_pagamento"] or tipo_pagamento
     new["score_classificacao"] = resultado["score"]
@@ -221,6 +239,44 @@ def normalize_row(row: dict):
     
     return new
 
+
+# ============================================================
+# NORMALIZAÇÃO EM LOTE
+# ============================================================
+LOTE_CLASSIFICACAO = 500
+
+def normalizar_linhas(linhas, tamanho_lote=LOTE_CLASSIFICACAO):
+    """
+    normalize_row para uma sequência de linhas, classificando de
+    `tamanho_lote` em `tamanho_lote` com classificar_lote: descrições que
+    se repetem no extrato (tarifas, PIX do mesmo pagador...) são analisadas
+    uma vez por lote. Gerador; a memória fica limitada a um lote.
+    """
+    lote = []
+    for row in linhas:
+        lote.append(row)
+        if len(lote) >= tamanho_lote:
+            yield from _normalizar_lote(lote)
+            lote = []
+    if lote:
+        yield from _normalizar_lote(lote)
+
+
+def _normalizar_lote(linhas):
+    from services.classificador_financeiro import classificador
+    
+    registros = [_normalizar_campos(row) if row else None for row in linhas]
+    preenchidos = [new for new in registros if new is not None]
+    resultados = classificador.classificar_lote(
+        _entrada_classificacao(new) for new in preenchidos
+    )
+    for new, resultado in zip(preenchidos, resultados):
+        _aplicar_classificacao(new, resultado)
+    
+    # Linha vazia: mesmo registro padrão de normalize_row
+    return [new if new is not None else normalize_row(row) for new, row in zip(registros, linhas)]
+
+
 # ============================================================
 # INFERIR TIPO PAGAMENTO
 # ============================================================
@@ -269,6 +325,16 @@ def inferir_tipo_pagamento_ofx(registro):
 # ============================================================
 # PARSE CSV
 # ============================================================
+def detectar_delimitador(sample):
+    delimitador = ','
+    if ';' in sample and sample.count(';') > sample.count(','):
+        delimitador = ';'
+    elif '|' in sample and sample.count('|') > sample.count(','):
+        delimitador = '|'
+    elif '\t' in sample:
+        delimitador = '\t'
+    return delimitador
+
 def parse_csv_generic(file_stream, filename=None):
     inicio = time.time()
     logger.info(f"📄 Início parse CSV: {filename}")
@@ -280,21 +346,15 @@ def parse_csv_generic(file_stream, filename=None):
     encoding = detectar_encoding(file_stream)
     try:
         raw = file_stream.read().decode(encoding, errors="replace")
-        sample = raw[:4096]
-        delimitador = ','
-        if ';' in sample and sample.count(';') > sample.count(','):
-            delimitador = ';'
-        elif '|' in sample and sample.count('|') > sample.count(','):
-            delimitador = '|'
-        elif '\t' in sample:
-            delimitador = '\t'
+        delimitador = detectar_delimitador(raw[:4096])
         reader = csv.DictReader(io.StringIO(raw), delimiter=delimitador)
-        registros = []
+        linhas = []
         for i, row in enumerate(reader):
             if i >= MAX_ROWS:
                 break
             if row:
-                registros.append(normalize_row(dict(row)))
+                linhas.append(dict(row))
+        registros = list(normalizar_linhas(linhas))
         tempo = time.time() - inicio
         logger.info(f"✅ Fim parse CSV: {len(registros)} registros em {tempo:.2f}s")
         return registros
@@ -302,50 +362,203 @@ def parse_csv_generic(file_stream, filename=None):
         file_stream.seek(0)
         raw = file_stream.read().decode('latin-1', errors='replace')
         reader = csv.DictReader(io.StringIO(raw))
-        registros = [normalize_row(dict(row)) for i, row in enumerate(reader) if i < MAX_ROWS and row]
+        registros = list(normalizar_linhas(dict(row) for i, row in enumerate(reader) if i < MAX_ROWS and row))
         return registros
     except Exception as e:
         logger.error(f"❌ Erro ao parsear CSV: {str(e)}")
         raise ValueError(f"Erro ao processar CSV: {str(e)}")
 
+# ============================================================
+# PARSE CSV (STREAMING)
+# ============================================================
+TAMANHO_PREFIXO_CSV = 64 * 1024
+
+def iterar_csv_generic(file_stream, filename=None, max_linhas=None):
+    """
+    Versão em streaming de parse_csv_generic: gera uma linha normalizada por vez.
+
+    Encoding e delimitador são detectados em um prefixo do arquivo; o restante
+    é decodificado incrementalmente, então a memória não cresce com o tamanho
+    do arquivo (sem os limites MAX_FILE_SIZE/MAX_ROWS).
+
+    Args:
+        file_stream: Stream binário com seek (FileStorage.stream, open(..., 'rb'))
+        filename: Nome do arquivo (apenas para log)
+        max_linhas: Limite opcional de linhas lidas
+    """
+    return normalizar_linhas(_linhas_csv(file_stream, filename, max_linhas))
+
+
+def _linhas_csv(file_stream, filename, max_linhas):
+    """Linhas do CSV ainda cruas (dict por linha), para iterar_csv_generic"""
+    inicio = time.time()
+    logger.info(f"📄 Início parse CSV (streaming): {filename}")
+
+    encoding = detectar_encoding(file_stream)
+    prefixo = file_stream.read(TAMANHO_PREFIXO_CSV).decode(encoding, errors="replace")
+    delimitador = detectar_delimitador(prefixo[:4096])
+    file_stream.seek(0)
+
+    texto = io.TextIOWrapper(file_stream, encoding=encoding, errors="replace", newline="")
+    total = 0
+    try:
+        reader = csv.DictReader(texto, delimiter=delimitador)
+        for i, row in enumerate(reader):
+            if max_linhas is not None and i >= max_linhas:
+                break
+            if row:
+                total += 1
+                yield dict(row)
+    except csv.Error as e:
+        logger.error(f"❌ Erro ao parsear CSV (linha {total + 1}): {str(e)}")
+        raise ValueError(f"Erro ao processar CSV: {str(e)}")
+    finally:
+        # Solta o stream original: fechar o wrapper fecharia o arquivo do chamador
+        try:
+            texto.detach()
+        except ValueError:
+            pass
+
+    tempo = time.time() - inicio
+    logger.info(f"✅ Fim parse CSV (streaming): {total} registros em {tempo:.2f}s")
+
 # ============================================================
 # PARSE EXCEL
 # ============================================================
-def parse_excel_generic(file_stream, filename=None):
+LINHAS_BUSCA_CABECALHO = 20
+
+# Nomes de coluna reconhecidos por normalize_row (usados para achar o cabeçalho)
+COLUNAS_CONHECIDAS = frozenset((
+    "valor", "amount", "valor_bruto", "vlr", "price", "value",
+    "entrada", "creditado", "credito", "valor_liquido", "vlr_liq", "valor_liq", "lancado", "liquid_value",
+    "data", "date", "dt", "transaction_date", "data_venda", "data_pagamento",
+    "descricao", "desc", "memo", "historico", "detalhe", "description", "note",
+    "name", "pagador", "beneficiario", "favorecido", "trntype", "tipo_transacao",
+    "nsu", "id", "transaction_id", "codigo", "fitid",
+    "adquirente", "merchant", "estabelecimento", "bandeira", "card", "brand",
+    "tipo_pagamento", "forma_pagamento", "payment_method", "payment_type", "produto",
+))
+_COLUNA_PROVAVEL = re.compile(r"valor|liq|credit|amount|data|date")
+# Só dígitos e pontuação de número/data/moeda: "1.234,56", "01/02/2024", "R$ 10"
+_TEXTO_NUMERICO = re.compile(r"[\d\s.,:/\-+%$R()]+")
+MIN_TEXTO_CABECALHO = 0.8   # Fração mínima de células de texto para uma linha ser cabeçalho
+
+
+def _eh_texto_cabecalho(v) -> bool:
+    return isinstance(v, str) and not _TEXTO_NUMERICO.fullmatch(v.strip())
+
+
+def _pontuar_cabecalho(valores) -> int:
+    """
+    Quanto uma linha parece cabeçalho: nomes conhecidos valem 2, parecidos valem 1.
+
+    Só pontua se quase todas as células preenchidas forem texto (não números
+    nem datas): uma linha de dados com uma célula "credito" não passa à
+    frente de um cabeçalho com nomes que não reconhecemos.
+    """
+    preenchidas = [v for v in valores if v is not None and (not isinstance(v, str) or v.strip())]
+    textos = [v for v in preenchidas if _eh_texto_cabecalho(v)]
+    if not textos or len(textos) < MIN_TEXTO_CABECALHO * len(preenchidas):
+        return 0
+
+    pontos = 0
+    for v in textos:
+        k = v.strip().lower()
+        if k in COLUNAS_CONHECIDAS:
+            pontos += 2
+        elif k and not any(c.isdigit() for c in k) and _COLUNA_PROVAVEL.search(k):
+            pontos += 1
+    return pontos
+
+
+def iterar_excel_generic(file_stream, filename=None, max_linhas=None,
+                         linhas_cabecalho=LINHAS_BUSCA_CABECALHO):
+    """
+    Versão em streaming do parser Excel: gera uma linha normalizada por vez.
+
+    Usa o modo read_only do openpyxl com iter_rows(values_only=True), sem
+    materializar as células. O cabeçalho é a linha de maior pontuação entre as
+    primeiras `linhas_cabecalho` (planilhas de adquirente costumam ter título
+    e filtros antes); se nenhuma parecer cabeçalho, vale a primeira não vazia.
+
+    Args:
+        file_stream: Stream binário com seek
+        filename: Nome do arquivo (apenas para log)
+        max_linhas: Limite opcional de linhas de dados
+        linhas_cabecalho: Quantas linhas iniciais examinar em busca do cabeçalho
+    """
+    return normalizar_linhas(_linhas_excel(file_stream, filename, max_linhas, linhas_cabecalho))
+
+
+def _linhas_excel(file_stream, filename, max_linhas, linhas_cabecalho):
+    """Linhas da planilha ainda cruas (dict por linha), para iterar_excel_generic"""
     inicio = time.time()
-    logger.info(f"📊 Início parse Excel: {filename}")
-    file_stream.seek(0, 2)
-    size = file_stream.tell()
+    logger.info(f"📊 Início parse Excel (streaming): {filename}")
     file_stream.seek(0)
-    if size > MAX_FILE_SIZE:
-        raise ValueError(f"Arquivo Excel excede {MAX_FILE_SIZE/1024/1024}MB")
+    workbook = load_workbook(filename=file_stream, data_only=True, keep_links=False, read_only=True)
+    total = 0
     try:
-        workbook = load_workbook(
-            filename=io.BytesIO(file_stream.read()),
-            data_only=True, keep_links=False, read_only=True
-        )
         sheet = workbook.active
         if not sheet:
-            return []
-        rows = list(sheet.rows)
-        if not rows:
-            return []
-        headers = [str(c.value).strip() if c.value is not None else "" for c in rows[0]]
+            return
+        linhas = sheet.iter_rows(values_only=True)
+
+        # Examina só as primeiras linhas (buffer limitado) para achar o cabeçalho
+        iniciais = []
+        for valores in linhas:
+            iniciais.append(valores)
+            if len(iniciais) >= linhas_cabecalho:
+                break
+        if not iniciais:
+            return
+
+        pontuacoes = [_pontuar_cabecalho(v) for v in iniciais]
+        if max(pontuacoes) > 0:
+            idx_cabecalho = pontuacoes.index(max(pontuacoes))
+        else:
+            idx_cabecalho = next(
+                (i for i, v in enumerate(iniciais) if any(c is not None for c in v)), 0
+            )
+        headers = [str(c).strip() if c is not None else "" for c in iniciais[idx_cabecalho]]
         if not any(headers):
-            return []
-        registros = []
-        for i, row in enumerate(rows[1:], start=1):
-            if i > MAX_ROWS:
+            return
+        if idx_cabecalho:
+            logger.info(f"📋 Cabeçalho Excel detectado na linha {idx_cabecalho + 1}")
+
+        restantes = iniciais[idx_cabecalho + 1:]
+        del iniciais
+
+        def _linhas_dados():
+            yield from restantes
+            yield from linhas
+
+        for i, valores in enumerate(_linhas_dados()):
+            if max_linhas is not None and i >= max_linhas:
                 break
             row_dict = {}
-            for j, cell in enumerate(row):
-                if j < len(headers) and headers[j]:
-                    val = cell.value
-                    if val is not None:
-                        row_dict[headers[j]] = val
+            for j, val in enumerate(valores):
+                if j < len(headers) and headers[j] and val is not None:
+                    row_dict[headers[j]] = val
             if row_dict:
-                registros.append(normalize_row(row_dict))
+                total += 1
+                yield row_dict
+    finally:
         workbook.close()
+
+    tempo = time.time() - inicio
+    logger.info(f"✅ Fim parse Excel (streaming): {total} registros em {tempo:.2f}s")
+
+
+def parse_excel_generic(file_stream, filename=None):
+    inicio = time.time()
+    logger.info(f"📊 Início parse Excel: {filename}")
+    file_stream.seek(0, 2)
+    size = file_stream.tell()
+    file_stream.seek(0)
+    if size > MAX_FILE_SIZE:
+        raise ValueError(f"Arquivo Excel excede {MAX_FILE_SIZE/1024/1024}MB")
+    try:
+        registros = list(iterar_excel_generic(file_stream, filename, max_linhas=MAX_ROWS))
         tempo = time.time() - inicio
         logger.info(f"✅ Fim parse Excel: {len(registros)} registros em {tempo:.2f}s")
         return registros
@@ -374,6 +587,60 @@ def _extrair_tag_ofx(bloco: str, tag: str) -> str:
     return bloco[start_idx:end_idx].strip()
 
 
+TAGS_TRANSACAO_OFX = ("DTPOSTED", "TRNAMT", "MEMO", "NAME", "FITID", "TRNTYPE", "CHECKNUM", "REFNUM")
+
+
+def _montar_registro_ofx(campos: dict):
+    """Monta o registro de uma transação a partir das tags extraídas (None se inválida)"""
+    dtposted = campos.get("DTPOSTED", "")
+    trnamt = campos.get("TRNAMT", "")
+    memo = campos.get("MEMO", "")
+    name = campos.get("NAME", "")
+    
+    if not trnamt:
+        return None
+    
+    data = None
+    if dtposted:
+        dtposted_clean = dtposted.split('[')[0] if '[' in dtposted else dtposted
+        aaaammdd = dtposted_clean[:8]
+        # Equivalente a strptime("%Y%m%d"), sem o custo do _strptime por transação
+        if len(aaaammdd) == 8 and aaaammdd.isdigit():
+            try:
+                data = date(int(aaaammdd[:4]), int(aaaammdd[4:6]), int(aaaammdd[6:8]))
+            except ValueError:
+                pass
+    
+    try:
+        valor_str = trnamt
+        if ',' in valor_str and '.' in valor_str:
+            valor_str = valor_str.replace('.', '').replace(',', '.')
+        elif ',' in valor_str:
+            valor_str = valor_str.replace(',', '.')
+        valor = Decimal(valor_str)
+    except (InvalidOperation, ValueError):
+        return None
+    
+    descricao_parts = []
+    if memo:
+        descricao_parts.append(memo)
+    if name and name != memo:
+        descricao_parts.append(name)
+    descricao = " - ".join(descricao_parts) if descricao_parts else ""
+    
+    return {
+        "data": data,
+        "valor": valor,
+        "descricao": descricao,
+        "name": name,
+        "trntype": campos.get("TRNTYPE", ""),
+        "id": campos.get("FITID") or None,
+        "checknum": campos.get("CHECKNUM") or None,
+        "refnum": campos.get("REFNUM") or None,
+        "tipo_ofx": None
+    }
+
+
 def parse_ofx_generic(file_stream, filename=None):
     inicio_total = time.time()
     logger.info(f"🏦 Início parse OFX: {filename}")
@@ -412,60 +679,115 @@ def parse_ofx_generic(file_stream, filename=None):
         else:
             end_pos = len(content)
         bloco = content[start_pos:end_pos]
-        
-        dtposted = _extrair_tag_ofx(bloco, "DTPOSTED")
-        trnamt = _extrair_tag_ofx(bloco, "TRNAMT")
-        memo = _extrair_tag_ofx(bloco, "MEMO")
-        name = _extrair_tag_ofx(bloco, "NAME")
-        fitid = _extrair_tag_ofx(bloco, "FITID")
-        trntype = _extrair_tag_ofx(bloco, "TRNTYPE")
-        checknum = _extrair_tag_ofx(bloco, "CHECKNUM")
-        refnum = _extrair_tag_ofx(bloco, "REFNUM")
-        
-        if not trnamt:
-            continue
-        
-        data = None
-        if dtposted:
-            dtposted_clean = dtposted.split('[')[0] if '[' in dtposted else dtposted
-            if len(dtposted_clean) >= 8:
-                try:
-                    data = datetime.strptime(dtposted_clean[:8], "%Y%m%d").date()
-                except ValueError:
-                    pass
-        
-        try:
-            valor_str = trnamt
-            if ',' in valor_str and '.' in valor_str:
-                valor_str = valor_str.replace('.', '').replace(',', '.')
-            elif ',' in valor_str:
-                valor_str = valor_str.replace(',', '.')
-            valor = Decimal(valor_str)
-        except (InvalidOperation, ValueError):
-            continue
-        
-        descricao_parts = []
-        if memo:
-            descricao_parts.append(memo)
-        if name and name != memo:
-            descricao_parts.append(name)
-        descricao = " - ".join(descricao_parts) if descricao_parts else ""
-        
-        registros.append({
-            "data": data,
-            "valor": valor,
-            "descricao": descricao,
-            "name": name,
-            "trntype": trntype,
-            "id": fitid or None,
-            "checknum": checknum or None,
-            "refnum": refnum or None,
-            "tipo_ofx": None
-        })
+        campos = {tag: _extrair_tag_ofx(bloco, tag) for tag in TAGS_TRANSACAO_OFX}
+        registro = _montar_registro_ofx(campos)
+        if registro:
+            registros.append(registro)
     
     tempo_total = time.time() - inicio_total
     logger.info(f"✅ OFX parseado: {len(registros)} registros em {tempo_total:.2f}s")
-    return [normalize_row(r) for r in registros]
+    return list(normalizar_linhas(registros))
+
+# ============================================================
+# PARSER OFX (STREAMING)
+# ============================================================
+TAMANHO_CHUNK_OFX = 64 * 1024
+
+_OFX_ABRE_TRANSACAO = re.compile(r'<STMTTRN>', re.IGNORECASE)
+# Fim do bloco: fechamento explícito, início da próxima transação (SGML sem
+# fechamento) ou fim da lista de transações
+_OFX_FIM_TRANSACAO = re.compile(r'</STMTTRN>|<STMTTRN>|</BANKTRANLIST>', re.IGNORECASE)
+_OFX_TAGS_TRANSACAO = re.compile(
+    r'<(' + '|'.join(TAGS_TRANSACAO_OFX) + r')>([^<]*)', re.IGNORECASE
+)
+
+
+def _extrair_campos_ofx(bloco: str) -> dict:
+    """Extrai todas as tags da transação em uma única passada (primeira ocorrência vale)"""
+    campos = {}
+    for m in _OFX_TAGS_TRANSACAO.finditer(bloco):
+        campos.setdefault(m.group(1).upper(), m.group(2).strip())
+    return campos
+
+
+def iterar_ofx_generic(file_stream, filename=None, tamanho_chunk=TAMANHO_CHUNK_OFX):
+    """
+    Versão em streaming de parse_ofx_generic.
+
+    Lê o arquivo em chunks com decodificação incremental e gera um registro
+    normalizado assim que cada <STMTTRN> fecha. As tags são localizadas com
+    regex case-insensitive, sem cópias em maiúsculas do arquivo ou do bloco.
+
+    Args:
+        file_stream: Stream binário com seek
+        filename: Nome do arquivo (apenas para log)
+        tamanho_chunk: Bytes lidos por vez
+    """
+    return normalizar_linhas(_transacoes_ofx(file_stream, filename, tamanho_chunk))
+
+
+def _transacoes_ofx(file_stream, filename, tamanho_chunk):
+    """Transações do OFX ainda cruas (registro por <STMTTRN>), para iterar_ofx_generic"""
+    inicio_total = time.time()
+    logger.info(f"🏦 Início parse OFX (streaming): {filename}")
+
+    encoding = detectar_encoding(file_stream)
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    buffer = ""
+    inicio_bloco = None  # Offset (no buffer) do conteúdo da transação aberta
+    total = 0
+    fim_arquivo = False
+
+    while not fim_arquivo:
+        chunk = file_stream.read(tamanho_chunk)
+        fim_arquivo = not chunk
+        buffer += decoder.decode(chunk or b"", final=fim_arquivo)
+        pos = 0
+
+        while True:
+            if inicio_bloco is None:
+                m = _OFX_ABRE_TRANSACAO.search(buffer, pos)
+                if not m:
+                    # Mantém o final do buffer: a tag pode estar partida entre chunks
+                    pos = max(pos, len(buffer) - len('<STMTTRN>'))
+                    break
+                inicio_bloco = m.end()
+                pos = m.end()
+                continue
+
+            m = _OFX_FIM_TRANSACAO.search(buffer, inicio_bloco)
+            if not m:
+                if fim_arquivo:
+                    m_fim = len(buffer)
+                else:
+                    pos = inicio_bloco
+                    break
+            else:
+                m_fim = m.start()
+
+            registro = _montar_registro_ofx(_extrair_campos_ofx(buffer[inicio_bloco:m_fim]))
+            if registro:
+                total += 1
+                yield registro
+
+            if m and m.group(0).upper() == '<STMTTRN>':
+                inicio_bloco = m.end()
+                pos = m.end()
+            else:
+                inicio_bloco = None
+                pos = m.end() if m else len(buffer)
+
+        # Descarta o que já foi consumido (uma cópia por chunk, não por transação)
+        if inicio_bloco is not None:
+            inicio_bloco -= pos
+        buffer = buffer[pos:]
+
+    tempo_total = time.time() - inicio_total
+    logger.info(f"✅ OFX parseado (streaming): {total} registros em {tempo_total:.2f}s")
 
 # ============================================================
 # EXTRAIR DADOS DA CONTA
@@ -502,74 +824,6 @@ def extrair_dados_conta_ofx(content: str) -> dict:
         dados["nome"] = "Conta Extraída do OFX"
     return dados
 
-# ============================================================
-# DIVIDIR OFX
-# ============================================================
-def dividir_ofx_em_partes(content: str, max_transacoes: int = 30) -> list:
-    content_upper = content.upper()
-    banktranlist_start = content_upper.find('<BANKTRANLIST>')
-    if banktranlist_start == -1:
-        return [content]
-    banktranlist_end = content_upper.find('</BANKTRANLIST>')
-    if banktranlist_end == -1:
-        return [content]
-    header = content[:banktranlist_start + len('<BANKTRANLIST>')]
-    footer = content[banktranlist_end:]
-    bloco_transacoes = content[banktranlist_start + len('<BANKTRANLIST>'):banktranlist_end]
-    bloco_upper = bloco_transacoes.upper()
-    
-    posicoes_inicio = []
-    search_start = 0
-    while True:
-        pos = bloco_upper.find('<STMTTRN>', search_start)
-        if pos == -1:
-            break
-        posicoes_inicio.append(pos)
-        search_start = pos + 1
-    
-    total_transacoes = len(posicoes_inicio)
-    if total_transacoes == 0 or total_transacoes <= max_transacoes:
-        return [content]
-    
-    transacoes = []
-    for i, pos_inicio in enumerate(posicoes_inicio):
-        if i + 1 < len(posicoes_inicio):
-            pos_fim = posicoes_inicio[i + 1]
-        else:
-            pos_fim = len(bloco_transacoes)
-        transacoes.append(bloco_transacoes[pos_inicio:pos_fim].strip())
-    
-    partes = []
-    num_partes = (total_transacoes + max_transacoes - 1) // max_transacoes
-    for i in range(num_partes):
-        inicio_idx = i * max_transacoes
-        fim_idx = min((i + 1) * max_transacoes, total_transacoes)
-        ofx_parte = header + '\n' + '\n'.join(transacoes[inicio_idx:fim_idx]) + '\n' + footer
-        partes.append(ofx_parte)
-    
-    logger.info(f"✅ OFX dividido: {total_transacoes} transações em {len(partes)} partes")
-    return partes
-
-# ============================================================
-# DIVIDIR CSV
-# ============================================================
-def dividir_csv_em_partes(content: str, max_linhas: int = 100) -> list:
-    lines = content.split('\n')
-    if len(lines) <= max_linhas + 1:
-        return [content]
-    header = lines[0]
-    data_lines = [line for line in lines[1:] if line.strip()]
-    total_linhas = len(data_lines)
-    partes = []
-    num_partes = (total_linhas + max_linhas - 1) // max_linhas
-    for i in range(num_partes):
-        inicio_idx = i * max_linhas
-        fim_idx = min((i + 1) * max_linhas, total_linhas)
-        csv_parte = header + '\n' + '\n'.join(data_lines[inicio_idx:fim_idx])
-        partes.append(csv_parte)
-    logger.info(f"✅ CSV dividido: {total_linhas} linhas em {len(partes)} partes")
-    return partes
-
 # ============================================================
 # FLOW CSV
 # ============================================================
@@ -0,0 +1,135 @@
+# utils/telemetria_importacao.py
+# Telemetria amostrada do pipeline de importação (resumo por lote, 1 em N linhas)
+
+import logging
+import os
+import threading
+import time
+
+# ==========================================
+# CONFIGURAÇÕES (sobrescrevíveis por env)
+# ==========================================
+# completo  → toda linha é logada (diagnóstico)
+# amostrado → 1 linha a cada IMPORT_LOG_AMOSTRA (padrão)
+# resumo    → só resumos de lote/etapa e erros
+MODO_LOG = os.getenv("IMPORT_LOG_MODO", "amostrado").strip().lower()
+AMOSTRA_A_CADA = int(os.getenv("IMPORT_LOG_AMOSTRA", 1000))
+MAX_ERROS_DETALHADOS = int(os.getenv("IMPORT_LOG_MAX_ERROS", 50))   # Dumps completos por etapa
+
+MODOS_LOG = ("completo", "amostrado", "resumo")
+
+_contexto = threading.local()
+
+
+def definir_sinal_de_vida(callback):
+    """
+    Registra, para a thread atual, um callback chamado a cada lote()
+    (ex.: renovar o heartbeat do job de importação durante etapas longas).
+    None remove o callback.
+    """
+    _contexto.sinal_de_vida = callback
+
+
+class TelemetriaImportacao:
+    """
+    Controla o volume de log de uma etapa da importação.
+
+    - amostrar(): conta a linha e diz se ela deve ser logada
+    - erro(): sempre loga, com o registro completo, até MAX_ERROS_DETALHADOS
+    - lote(): uma linha de resumo por lote, com a vazão acumulada (e o
+      sinal de vida da thread, se houver)
+    - finalizar(): resumo da etapa (também devolvido como dict)
+
+    A formatação da mensagem fica no chamador, dentro do `if amostrar()`,
+    então linhas não amostradas não pagam f-string nem repr de dicts.
+    """
+
+    def __init__(self, etapa, logger=None, modo=None, amostra=None, max_erros=None):
+        self.etapa = etapa
+        self.logger = logger or logging.getLogger(__name__)
+        modo = modo or MODO_LOG
+        self.modo = modo if modo in MODOS_LOG else "amostrado"
+        self.amostra = max(1, amostra or AMOSTRA_A_CADA)
+        self.max_erros = MAX_ERROS_DETALHADOS if max_erros is None else max_erros
+
+        self.linhas = 0
+        self.amostradas = 0
+        self.erros = 0
+        self.erros_suprimidos = 0
+        self.lotes = 0
+        self._inicio = time.perf_counter()
+
+    def amostrar(self):
+        """Conta uma linha; True se ela deve ser logada"""
+        self.linhas += 1
+        if self.modo == "completo":
+            logar = True
+        elif self.modo == "resumo":
+            logar = False
+        else:
+            logar = (self.linhas - 1) % self.amostra == 0
+        if logar:
+            self.amostradas += 1
+        return logar
+
+    def erro(self, mensagem, registro=None, nivel=logging.ERROR, exc_info=False):
+        """Erro de linha: dump completo do registro até o limite da etapa"""
+        self.erros += 1
+        if self.erros <= self.max_erros:
+            if registro is not None:
+                mensagem = f"{mensagem} | registro={registro!r}"
+            self.logger.log(nivel, mensagem, exc_info=exc_info)
+            return
+
+        self.erros_suprimidos += 1
+        if self.erros_suprimidos == 1:
+            self.logger.warning(
+                f"⚠️ [{self.etapa}] Limite de {self.max_erros} erros detalhados atingido; "
+                f"os demais serão apenas contados"
+            )
+
+    def lote(self, mensagem):
+        """Resumo de um lote, com a vazão acumulada da etapa"""
+        self.lotes += 1
+        decorrido = time.perf_counter() - self._inicio
+        vazao = self.linhas / decorrido if decorrido > 0 else 0
+        self.logger.info(f"{mensagem} | {self.linhas} linhas, {vazao:,.0f} linhas/s")
+
+        sinal_de_vida = getattr(_contexto, "sinal_de_vida", None)
+        if sinal_de_vida is not None:
+            sinal_de_vida()
+
+    def resumo(self):
+        decorrido = time.perf_counter() - self._inicio
+        return {
+            "etapa": self.etapa,
+            "modo": self.modo,
+            "linhas": self.linhas,
+            "amostradas": self.amostradas,
+            "erros": self.erros,
+            "erros_suprimidos": self.erros_suprimidos,
+            "lotes": self.lotes,
+            "tempo_segundos": round(decorrido, 3),
+            "linhas_por_segundo": round(self.linhas / decorrido, 1) if decorrido > 0 else None,
+        }
+
+    def finalizar(self):
+        """Loga e devolve o resumo da etapa"""
+        resumo = self.resumo()
+        self.logger.info(
+            f"📊 [{self.etapa}] {resumo['linhas']} linhas, {resumo['amostradas']} amostradas, "
+            f"{resumo['erros']} erros ({resumo['erros_suprimidos']} sem detalhe), "
+            f"{resumo['lotes']} lotes em {resumo['tempo_segundos']:.2f}s"
+        )
+        return resumo
+
+
+def resumir_resultado(resultado):
+    """Resultado de parse sem a lista de registros (só a contagem e o primeiro)"""
+    if not isinstance(resultado, dict) or "registros" not in resultado:
+        return resultado
+    registros = resultado.get("registros") or []
+    resumo = {k: v for k, v in resultado.items() if k != "registros"}
+    resumo["registros"] = f"<{len(registros)} registros>"
+    resumo["primeiro_registro"] = registros[0] if registros else None
+    return resumo